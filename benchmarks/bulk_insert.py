@@ -0,0 +1,102 @@
+"""Measure rows per second of bulk inserts by batch size.
+
+A fake Documents API (no requests are sent to Rockset) acknowledges each
+batch after `latency` seconds plus a per-document cost, like the service
+does. Rows are inserted through SQLAlchemy with `Table.insert()` and
+executemany, which the dialect writes in batches of `bulk_batch_size` with
+up to `bulk_workers` batches in flight.
+
+    python benchmarks/bulk_insert.py [rows] [latency_ms] [workers]
+"""
+
+import io
+import json
+import re
+import sys
+import time
+
+import sqlalchemy as sa
+import urllib3
+
+BATCH_SIZES = [1, 10, 100, 1000, 5000]
+
+# Time the fake takes to accept each document of a batch, in seconds.
+PER_DOCUMENT = 20e-6
+
+_DOCUMENTS = re.compile(r"/ws/([^/]+)/collections/([^/]+)/docs$")
+
+
+class DocumentsPoolManager(object):
+    """Stands in for the client's urllib3 pool; answers Documents API
+    requests after `latency` seconds plus `PER_DOCUMENT` per document."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+
+    def request(self, method, url, body=None, preload_content=True, **kwargs):
+        self.requests += 1
+        collection = _DOCUMENTS.search(url.split("?", 1)[0]).group(2)
+        documents = json.loads(body)["data"]
+        time.sleep(self.latency + PER_DOCUMENT * len(documents))
+        response = {
+            "data": [
+                {"_id": doc.get("_id"), "_collection": collection, "status": "ADDED"}
+                for doc in documents
+            ],
+            "last_offset": "f1:0:{}".format(self.requests),
+        }
+        return urllib3.HTTPResponse(
+            body=io.BytesIO(json.dumps(response).encode()),
+            headers={"Content-Type": "application/json"},
+            status=200,
+            preload_content=preload_content,
+        )
+
+    def clear(self):
+        pass
+
+
+def run(rows, latency, batch_size, workers):
+    engine = sa.create_engine(
+        "rockset://benchmark@api.usw2a1.rockset.com"
+        "?bulk_batch_size={}&bulk_workers={}".format(batch_size, workers)
+    )
+    table = sa.Table(
+        "events",
+        sa.MetaData(),
+        sa.Column("_id", sa.String),
+        sa.Column("n", sa.Integer),
+        sa.Column("name", sa.String),
+        schema="commons",
+    )
+    values = [
+        {"_id": "doc-{}".format(i), "n": i, "name": "name-{}".format(i)}
+        for i in range(rows)
+    ]
+    with engine.connect() as conn:
+        pool_manager = DocumentsPoolManager(latency)
+        client = conn.connection.dbapi_connection._client
+        client.api_client.rest_client.pool_manager = pool_manager
+        start = time.perf_counter()
+        conn.execute(table.insert(), values)
+        elapsed = time.perf_counter() - start
+    return elapsed, pool_manager.requests
+
+
+def main(rows=20000, latency_ms=20, workers=4):
+    latency = latency_ms / 1e3
+    print("{} rows, {} ms per request, {} workers".format(rows, latency_ms, workers))
+    for batch_size in BATCH_SIZES:
+        # Keep the slow, small batches to a few seconds.
+        n = min(rows, batch_size * workers * 50)
+        elapsed, requests = run(n, latency, batch_size, workers)
+        print(
+            "batch {:>5}  {:>12,.0f} rows/s  ({} requests)".format(
+                batch_size, n / elapsed, requests
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
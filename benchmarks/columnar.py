@@ -0,0 +1,113 @@
+"""Compare columnar fetches with fetchall() + DataFrame construction.
+
+Builds a synthetic query response in memory (no requests are sent to Rockset)
+and reports the time and peak memory of turning it into a pandas DataFrame.
+
+    python benchmarks/columnar.py [rows]
+
+Requires numpy, pyarrow and pandas.
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import rockset
+
+import rockset_sqlalchemy
+
+COLUMN_TYPES = {
+    "_id": "string",
+    "_event_time": "timestamp",
+    "user_id": "int",
+    "score": "float",
+    "active": "bool",
+    "country": "string",
+    "signup_date": "date",
+}
+
+
+def make_response(rows):
+    rng = random.Random(0)
+    results = [
+        {
+            "_id": "doc-{}".format(i),
+            "_event_time": "2024-01-{:02d}T12:34:56.{:06d}Z".format(
+                i % 28 + 1, i % 10**6
+            ),
+            "user_id": rng.randrange(10**6),
+            "score": rng.random(),
+            "active": rng.random() < 0.5,
+            "country": rng.choice(["US", "DE", "IN", "BR"]),
+            "signup_date": "2023-{:02d}-{:02d}".format(i % 12 + 1, i % 28 + 1),
+        }
+        for i in range(rows)
+    ]
+    return rockset.models.QueryResponse(
+        results=results,
+        column_fields=[
+            rockset.models.QueryFieldType(name=name, type=type_)
+            for name, type_ in COLUMN_TYPES.items()
+        ],
+    )
+
+
+def via_fetchall(cursor):
+    rows = cursor.fetchall()
+    return pd.DataFrame.from_records(rows, columns=[d[0] for d in cursor.description])
+
+
+def via_numpy(cursor):
+    return pd.DataFrame(cursor.fetch_numpy())
+
+
+def via_arrow(cursor):
+    return cursor.fetch_arrow_table().to_pandas()
+
+
+def measure(connection, response, build):
+    cursor = connection.cursor()
+    cursor._set_response(response)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    frame = build(cursor)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(frame) == len(response.results)
+    return elapsed, peak
+
+
+def main(rows=200000):
+    connection = rockset_sqlalchemy.connect(
+        "https://api.usw2a1.rockset.com", "benchmark"
+    )
+    response = make_response(rows)
+    print("{} rows, {} columns".format(rows, len(COLUMN_TYPES)))
+    builds = [
+        ("fetchall + DataFrame", via_fetchall),
+        ("fetch_numpy", via_numpy),
+        ("fetch_arrow_table", via_arrow),
+    ]
+    # Warm up, so that no measurement includes one-time imports.
+    for _, build in builds:
+        cursor = connection.cursor()
+        cursor._set_response(make_response(10))
+        build(cursor)
+    for name, build in builds:
+        # Time without tracemalloc, which slows allocation down.
+        cursor = connection.cursor()
+        cursor._set_response(response)
+        start = time.perf_counter()
+        build(cursor)
+        elapsed = time.perf_counter() - start
+        _, peak = measure(connection, response, build)
+        print("{:<22} {:>8.3f}s {:>10.1f} MiB peak".format(name, elapsed, peak / 2**20))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
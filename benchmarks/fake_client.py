@@ -0,0 +1,201 @@
+"""An in-process stand-in for Rockset that replays recorded responses.
+
+Benchmarks install a `ReplayPoolManager` as the urllib3 pool of a
+connection's RocksetClient, so requests go through the client's whole HTTP
+layer (request serialization, response handling and deserialization) without
+leaving the process. The response builders below reproduce the shapes of
+recorded query, DESCRIBE and listing responses with deterministic data.
+"""
+
+import io
+import json
+import random
+
+import urllib3
+
+NOT_FOUND = b'{"message": "Not found", "type": "NOTFOUND"}'
+
+
+class ReplayPoolManager(object):
+    """Stands in for the client's urllib3 pool and replays recorded bodies.
+
+    `responses` is either the body returned for every request, or a list of
+    `(method, path, match, body)` routes: a request is answered with the body
+    of the first route whose method matches, whose path ends the request's
+    URL path and whose `match`, if not None, is part of the request body
+    (e.g. the text of a query). Other requests get a 404.
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = 0
+
+    def request(self, method, url, body=None, preload_content=True, **kwargs):
+        self.requests += 1
+        status, response = 200, self._find(method, url, body)
+        if response is None:
+            status, response = 404, NOT_FOUND
+        return urllib3.HTTPResponse(
+            body=io.BytesIO(response),
+            headers={"Content-Type": "application/json"},
+            status=status,
+            preload_content=preload_content,
+        )
+
+    def _find(self, method, url, body):
+        if isinstance(self.responses, bytes):
+            return self.responses
+        path = url.split("?", 1)[0]
+        for route_method, route_path, match, response in self.responses:
+            if (
+                route_method == method
+                and path.endswith(route_path)
+                and (match is None or (body is not None and match in body))
+            ):
+                return response
+        return None
+
+    def clear(self):
+        pass
+
+
+def install(connection, responses):
+    """Answer the requests of a DB-API connection (and of every connection
+    sharing its client) with `responses`; returns the pool manager."""
+    pool_manager = ReplayPoolManager(responses)
+    connection._client.api_client.rest_client.pool_manager = pool_manager
+    return pool_manager
+
+
+def narrow_results(rows):
+    rng = random.Random(0)
+    return [
+        {
+            "_id": "doc-{}".format(i),
+            "user_id": rng.randrange(10**6),
+            "score": rng.random(),
+            "country": rng.choice(["US", "DE", "IN", "BR"]),
+        }
+        for i in range(rows)
+    ]
+
+
+def wide_results(rows, columns=100):
+    rng = random.Random(0)
+    results = []
+    for i in range(rows):
+        doc = {"_id": "doc-{}".format(i)}
+        for c in range(columns):
+            if c % 3 == 0:
+                doc["int_{}".format(c)] = rng.randrange(10**6)
+            elif c % 3 == 1:
+                doc["float_{}".format(c)] = rng.random()
+            else:
+                doc["string_{}".format(c)] = "value-{}".format(rng.randrange(1000))
+        results.append(doc)
+    return results
+
+
+def nested_results(rows):
+    rng = random.Random(0)
+    return [
+        {
+            "_id": "doc-{}".format(i),
+            "_event_time": "2024-01-{:02d}T12:34:56.{:06d}Z".format(
+                i % 28 + 1, i % 10**6
+            ),
+            "user": {
+                "id": rng.randrange(10**6),
+                "name": "user-{}".format(i),
+                "address": {"city": rng.choice(["Berlin", "Pune"]), "zip": "10115"},
+            },
+            "tags": ["tag-{}".format(t) for t in range(i % 5)],
+            "events": [
+                {"type": rng.choice(["click", "view"]), "value": rng.random()}
+                for _ in range(3)
+            ],
+        }
+        for i in range(rows)
+    ]
+
+
+# Result shapes by name; each builder takes the number of rows.
+SHAPES = {
+    "narrow": narrow_results,
+    "wide": wide_results,
+    "nested": nested_results,
+}
+
+_FIELD_TYPES = [
+    (bool, "bool"),
+    (int, "int"),
+    (float, "float"),
+    (str, "string"),
+    (dict, "object"),
+    (list, "array"),
+]
+
+
+def _field_type(value):
+    for python_type, field_type in _FIELD_TYPES:
+        if isinstance(value, python_type):
+            return field_type
+    return "null"
+
+
+def query_response(results):
+    """Return the body of a query response with `results`."""
+    first = results[0] if results else {}
+    return json.dumps(
+        {
+            "query_id": "benchmark",
+            "collections": ["commons.benchmark"],
+            "column_fields": [
+                {"name": name, "type": _field_type(value)}
+                for name, value in first.items()
+            ],
+            "results": results,
+            "results_total_doc_count": len(results),
+            "stats": {"elapsed_time_ms": 1, "throttled_time_micros": 0},
+        }
+    ).encode()
+
+
+def describe_response(results, total=1000):
+    """Return the body of a DESCRIBE response for a collection whose
+    documents look like `results[0]`, including nested field paths."""
+    rows = []
+
+    def describe(path, value):
+        rows.append(
+            {
+                "field": path,
+                "type": _field_type(value),
+                "occurrences": total,
+                "total": total,
+            }
+        )
+        if isinstance(value, dict):
+            for name, child in value.items():
+                describe(path + [name], child)
+
+    for name, value in results[0].items():
+        describe([name], value)
+    return query_response(rows)
+
+
+def collections_response(workspace, names):
+    """Return the body of a listing of the collections of a workspace."""
+    return json.dumps(
+        {
+            "data": [
+                {
+                    "name": name,
+                    "workspace": workspace,
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "status": "READY",
+                }
+                for name in names
+            ]
+        }
+    ).encode()
@@ -0,0 +1,69 @@
+"""Compare large IN lists sent as one array parameter and as one parameter
+per value.
+
+Replays a recorded response through the client's HTTP layer (no requests are
+sent to Rockset) and times executing `SELECT ... WHERE n IN :values` through
+SQLAlchemy. The dialect compiles the IN list to `ARRAY_CONTAINS(:values, n)`
+with one array parameter; "expanded" compiles it the generic way, to
+`n IN (:values_1, :values_2, ...)` with one typed parameter per value. Only
+the client's time is measured; Rockset also parses fewer parameters.
+
+    python benchmarks/in_lists.py [values] [queries]
+"""
+
+import sys
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.sql import compiler
+
+from rockset_sqlalchemy.sqlalchemy.compiler import RocksetCompiler
+
+import fake_client
+
+
+class ExpandingCompiler(RocksetCompiler):
+    def visit_in_op_binary(self, binary, operator, **kw):
+        return self._generate_generic_binary(
+            binary, compiler.OPERATORS[operator], **kw
+        )
+
+    def visit_not_in_op_binary(self, binary, operator, **kw):
+        return compiler.SQLCompiler.visit_not_in_op_binary(
+            self, binary, operator, **kw
+        )
+
+
+def run(statement_compiler, values, queries):
+    engine = sa.create_engine(
+        "rockset://benchmark@api.usw2a1.rockset.com?json_decoder=json"
+    )
+    engine.dialect.statement_compiler = statement_compiler
+    table = sa.Table("events", sa.MetaData(), sa.Column("n", sa.Integer))
+    body = fake_client.query_response([{"n": 1}])
+    with engine.connect() as conn:
+        fake_client.install(conn.connection.dbapi_connection, body)
+        for _ in range(queries // 10 + 1):
+            conn.execute(sa.select(table).where(table.c.n.in_(values))).fetchall()
+        start = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(sa.select(table).where(table.c.n.in_(values))).fetchall()
+        return (time.perf_counter() - start) / queries
+
+
+def main(values=10000, queries=50):
+    in_list = list(range(values))
+    print("IN lists of {} values".format(values))
+    for name, statement_compiler in [
+        ("array", RocksetCompiler),
+        ("expanded", ExpandingCompiler),
+    ]:
+        print(
+            "{:<9} {:>8.2f} ms/query".format(
+                name, run(statement_compiler, in_list, queries) * 1e3
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""Compare JSON decoders for query responses.
+
+Replays a large recorded-style query response through the client's HTTP
+layer (no requests are sent to Rockset) and times `cursor.execute()` +
+`fetchall()` with the default model deserialization and with each installed
+`json_decoder`.
+
+    python benchmarks/json_decoding.py [rows]
+"""
+
+import json
+import random
+import sys
+import time
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.decoding import get_decoder
+
+import fake_client
+
+
+def make_response_body(rows):
+    rng = random.Random(0)
+    results = [
+        {
+            "_id": "doc-{}".format(i),
+            "_event_time": "2024-01-01T12:34:56.{:06d}Z".format(i % 10**6),
+            "user_id": rng.randrange(10**6),
+            "score": rng.random(),
+            "tags": [rng.choice(["a", "b", "c"]) for _ in range(3)],
+            "address": {"country": rng.choice(["US", "DE", "IN"]), "zip": i % 99999},
+        }
+        for i in range(rows)
+    ]
+    return json.dumps(
+        {
+            "query_id": "benchmark",
+            "collections": ["commons.events"],
+            "column_fields": [],
+            "results": results,
+            "results_total_doc_count": rows,
+            "stats": {"elapsed_time_ms": 10, "throttled_time_micros": 0},
+        }
+    ).encode()
+
+
+def run(body, json_decoder, repeat=3):
+    """Return the best execute() and fetchall() times and the row count."""
+    connection = rockset_sqlalchemy.connect(
+        "https://api.usw2a1.rockset.com", "benchmark", json_decoder=json_decoder
+    )
+    fake_client.install(connection, body)
+    best_execute = best_fetch = float("inf")
+    for _ in range(repeat):
+        cursor = connection.cursor()
+        start = time.perf_counter()
+        cursor.execute("SELECT * FROM commons.events")
+        executed = time.perf_counter()
+        rows = cursor.fetchall()
+        fetched = time.perf_counter()
+        best_execute = min(best_execute, executed - start)
+        best_fetch = min(best_fetch, fetched - executed)
+    return best_execute, best_fetch, len(rows)
+
+
+def main(rows=100000):
+    body = make_response_body(rows)
+    print("{} rows, {:.1f} MiB response".format(rows, len(body) / 2**20))
+    for json_decoder in [None, "json", "orjson", "msgspec"]:
+        try:
+            get_decoder(json_decoder or "json")
+        except ImportError:
+            print("{:<10} not installed".format(json_decoder))
+            continue
+        execute, fetch, count = run(body, json_decoder)
+        assert count == rows
+        print(
+            "{:<10} execute {:>7.3f}s  fetchall {:>7.3f}s".format(
+                json_decoder or "models", execute, fetch
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
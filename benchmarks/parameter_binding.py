@@ -0,0 +1,89 @@
+"""Measure the per-query overhead of sending a parameterized query.
+
+Replays a small recorded response through the client's HTTP layer (no
+requests are sent to Rockset) and times the same parameterized statement
+sent through the rockset request models and through `Cursor.execute()`,
+which binds parameters with cached signatures and posts plain dicts.
+
+    python benchmarks/parameter_binding.py [queries]
+"""
+
+import datetime
+import sys
+import time
+
+import rockset
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.binding import bind_parameters
+
+import fake_client
+
+BODY = (
+    b'{"query_id": "benchmark", "results": [{"n": 1}],'
+    b' "column_fields": [{"name": "n", "type": "int"}],'
+    b' "results_total_doc_count": 1}'
+)
+
+SQL = (
+    "SELECT COUNT(*) AS n FROM commons.events WHERE user_id = :user_id"
+    " AND country = :country AND score > :score AND active = :active"
+    " AND _event_time > :since"
+)
+
+PARAMETERS = {
+    "user_id": 123456,
+    "country": "US",
+    "score": 0.5,
+    "active": True,
+    "since": datetime.datetime(2024, 1, 1, 12, 0, 0),
+}
+
+
+def with_models(connection):
+    request = rockset.models.QueryRequestSql(
+        query=SQL,
+        parameters=[
+            rockset.models.QueryParameter(**parameter)
+            for parameter in bind_parameters(PARAMETERS)
+        ],
+    )
+    connection._client.Queries.query(sql=request)
+
+
+def with_cursor(connection):
+    cursor = connection.cursor()
+    cursor.execute(SQL, PARAMETERS)
+    cursor.fetchall()
+
+
+def run(fn, connection, queries):
+    for _ in range(queries // 10):
+        fn(connection)
+    start = time.perf_counter()
+    for _ in range(queries):
+        fn(connection)
+    return (time.perf_counter() - start) / queries
+
+
+def main(queries=2000):
+    for json_decoder in [None, "json"]:
+        connection = rockset_sqlalchemy.connect(
+            "https://api.usw2a1.rockset.com",
+            "benchmark",
+            json_decoder=json_decoder,
+            cache_all_queries=False,
+        )
+        fake_client.install(connection, BODY)
+        for name, fn in [("models", with_models), ("cursor", with_cursor)]:
+            if name == "models" and json_decoder is not None:
+                continue
+            print(
+                "{:<8} json_decoder={:<6} {:>7.1f} us/query".format(
+                    name, str(json_decoder), run(fn, connection, queries) * 1e6
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
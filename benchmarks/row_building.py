@@ -0,0 +1,71 @@
+"""Measure how fast a cursor turns result documents into row tuples.
+
+Builds a synthetic query response in memory (no requests are sent to
+Rockset) and reports the rows per second of `fetchall()`, `fetchmany()` and
+`fetchone()` over it.
+
+    python benchmarks/row_building.py [rows] [columns]
+"""
+
+import sys
+import time
+
+import rockset
+
+import rockset_sqlalchemy
+
+
+def make_response(rows, columns):
+    names = ["c{}".format(c) for c in range(columns)]
+    results = [{name: i * c for c, name in enumerate(names)} for i in range(rows)]
+    return rockset.models.QueryResponse(
+        results=results,
+        column_fields=[
+            rockset.models.QueryFieldType(name=name, type="int") for name in names
+        ],
+    )
+
+
+def via_fetchall(cursor):
+    return len(cursor.fetchall())
+
+
+def via_fetchmany(cursor):
+    count = 0
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            return count
+        count += len(rows)
+
+
+def via_fetchone(cursor):
+    count = 0
+    while cursor.fetchone() is not None:
+        count += 1
+    return count
+
+
+def main(rows=200000, columns=10):
+    connection = rockset_sqlalchemy.connect(
+        "https://api.usw2a1.rockset.com", "benchmark"
+    )
+    response = make_response(rows, columns)
+    print("{} rows, {} columns".format(rows, columns))
+    for name, fetch in [
+        ("fetchall", via_fetchall),
+        ("fetchmany", via_fetchmany),
+        ("fetchone", via_fetchone),
+    ]:
+        best = float("inf")
+        for _ in range(3):
+            cursor = connection.cursor()
+            cursor._set_response(response)
+            start = time.perf_counter()
+            assert fetch(cursor) == rows
+            best = min(best, time.perf_counter() - start)
+        print("{:<10} {:>12,.0f} rows/s".format(name, rows / best))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
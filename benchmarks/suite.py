@@ -0,0 +1,306 @@
+"""Benchmark suite for the hot paths of the driver and the dialect.
+
+Every benchmark runs against recorded responses replayed in-process by
+`fake_client` (no requests are sent to Rockset): executing queries and
+fetching their results with `fetchone`, `fetchmany` and `fetchall` for
+narrow, wide, nested and large (1M rows) results, `Cursor.description`,
+parameter binding, large IN lists, compiling JSON operators and reflecting
+a workspace.
+
+    python benchmarks/suite.py [--filter TEXT] [--repeat N]
+                               [--save FILE] [--compare FILE] [--threshold PCT]
+
+`--save` stores the results as JSON, e.g. as the baseline of a release, and
+`--compare` reports the change of each benchmark against stored results,
+exiting with status 1 if any is slower by more than `--threshold` percent
+(default 10). Compare results from the same machine only.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import timeit
+
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.binding import bind_parameters
+from rockset_sqlalchemy.sqlalchemy import RocksetDialect
+
+import fake_client
+
+API_SERVER = "https://api.usw2a1.rockset.com"
+
+# Rows of each result shape; `large` is the narrow shape with 1M rows.
+SHAPE_ROWS = {"narrow": 10000, "wide": 1000, "nested": 10000}
+LARGE_ROWS = 1000000
+
+PARAMETERS = {
+    "user_id": 123456,
+    "country": "US",
+    "score": 0.5,
+    "active": True,
+    "since": datetime.datetime(2024, 1, 1, 12, 0, 0),
+    "tags": ["a", "b"],
+}
+
+PARAMETERS_SQL = (
+    "SELECT COUNT(*) AS n FROM commons.events WHERE user_id = :user_id"
+    " AND country = :country AND score > :score AND active = :active"
+    " AND _event_time > :since AND ARRAY_CONTAINS(:tags, tag)"
+)
+
+# Values of the IN list of the IN list benchmark.
+IN_LIST_VALUES = 1000
+
+# Collections of the workspace reflected by the reflection benchmark.
+REFLECTED_COLLECTIONS = 20
+
+# (name, setup) pairs; `setup()` prepares a benchmark and returns the
+# function to time.
+BENCHMARKS = []
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+
+    return register
+
+
+def connect(responses, **kwargs):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, "benchmark", cache_all_queries=False, **kwargs
+    )
+    fake_client.install(connection, responses)
+    return connection
+
+
+def shape_body(shape):
+    if shape == "large":
+        return fake_client.query_response(fake_client.narrow_results(LARGE_ROWS))
+    return fake_client.query_response(
+        fake_client.SHAPES[shape](SHAPE_ROWS[shape])
+    )
+
+
+def fetchall(shape, **kwargs):
+    def setup():
+        cursor = connect(shape_body(shape), **kwargs).cursor()
+
+        def run():
+            cursor.execute("SELECT * FROM commons.benchmark")
+            cursor.fetchall()
+
+        return run
+
+    return setup
+
+
+for _shape in ["narrow", "wide", "nested"]:
+    benchmark("fetchall[{}]".format(_shape))(fetchall(_shape))
+    benchmark("fetchall[{},json]".format(_shape))(fetchall(_shape, json_decoder="json"))
+benchmark("fetchall[large,json]")(fetchall("large", json_decoder="json"))
+
+
+@benchmark("fetchone[narrow,json]")
+def fetchone():
+    cursor = connect(shape_body("narrow"), json_decoder="json").cursor()
+
+    def run():
+        cursor.execute("SELECT * FROM commons.benchmark")
+        while cursor.fetchone() is not None:
+            pass
+
+    return run
+
+
+@benchmark("fetchmany[narrow,json]")
+def fetchmany():
+    cursor = connect(shape_body("narrow"), json_decoder="json").cursor()
+
+    def run():
+        cursor.execute("SELECT * FROM commons.benchmark")
+        while cursor.fetchmany(1000):
+            pass
+
+    return run
+
+
+@benchmark("description[wide]")
+def description():
+    cursor = connect(shape_body("wide"), json_decoder="json").cursor()
+    cursor.execute("SELECT * FROM commons.benchmark")
+    return lambda: cursor.description
+
+
+@benchmark("bind_parameters")
+def binding():
+    return lambda: bind_parameters(PARAMETERS)
+
+
+@benchmark("execute[parameters]")
+def execute_parameters():
+    cursor = connect(
+        fake_client.query_response([{"n": 1}]), json_decoder="json"
+    ).cursor()
+
+    def run():
+        cursor.execute(PARAMETERS_SQL, PARAMETERS)
+        cursor.fetchall()
+
+    return run
+
+
+@benchmark("execute[in_list]")
+def execute_in_list():
+    engine = sa.create_engine(
+        "rockset://benchmark@api.usw2a1.rockset.com?json_decoder=json"
+    )
+    table = sa.Table("events", sa.MetaData(), sa.Column("n", sa.Integer))
+    values = list(range(IN_LIST_VALUES))
+    conn = engine.connect()
+    fake_client.install(
+        conn.connection.dbapi_connection, fake_client.query_response([{"n": 1}])
+    )
+    return lambda: conn.execute(sa.select(table).where(table.c.n.in_(values))).all()
+
+
+@benchmark("compile[json_operators]")
+def compile_json_operators():
+    table = sa.Table(
+        "events",
+        sa.MetaData(),
+        sa.Column("_id", sa.String),
+        sa.Column("user", sa.JSON),
+        sa.Column("events", sa.JSON),
+    )
+    statement = (
+        sa.select(
+            table.c._id,
+            table.c.user["address"]["city"],
+            table.c.user[("address", "zip")],
+            table.c.events.op("->>")(0),
+        )
+        .where(table.c.user["name"].as_string() == "user-1")
+        .where(table.c.user.op("#>")(sa.literal(["address", "city"])) == "Berlin")
+    )
+    dialect = RocksetDialect()
+    return lambda: str(statement.compile(dialect=dialect))
+
+
+@benchmark("reflect[workspace]")
+def reflect():
+    names = ["events_{:02d}".format(i) for i in range(REFLECTED_COLLECTIONS)]
+    engine = sa.create_engine(
+        "rockset://benchmark@api.usw2a1.rockset.com?json_decoder=json"
+    )
+    responses = [
+        (
+            "GET",
+            "/ws/commons/collections",
+            None,
+            fake_client.collections_response("commons", names),
+        ),
+        ("GET", "/ws/commons/views", None, b'{"data": []}'),
+        (
+            "POST",
+            "/queries",
+            "DESCRIBE",
+            fake_client.describe_response(fake_client.nested_results(1)),
+        ),
+    ]
+    with engine.connect() as conn:
+        fake_client.install(conn.connection.dbapi_connection, responses)
+
+    def run():
+        metadata = sa.MetaData()
+        metadata.reflect(engine, schema="commons")
+        assert len(metadata.tables) == REFLECTED_COLLECTIONS
+
+    return run
+
+
+def measure(setup, repeat):
+    """Return the best time of one call, in seconds."""
+    timer = timeit.Timer(setup())
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def format_seconds(seconds):
+    for unit, scale in [("s", 1), ("ms", 1e3), ("us", 1e6)]:
+        if seconds * scale >= 1:
+            return "{:.3f} {}".format(seconds * scale, unit)
+    return "{:.3f} ns".format(seconds * 1e9)
+
+
+def compare(results, baseline, threshold):
+    """Print the change of each result against `baseline`; returns the
+    names of the benchmarks that are slower by more than `threshold`%."""
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print("{:<28} {:>12}  (new)".format(name, format_seconds(seconds)))
+            continue
+        change = (seconds - before) / before * 100
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            "{:<28} {:>12} -> {:>12}  {:+6.1f}%{}".format(
+                name,
+                format_seconds(before),
+                format_seconds(seconds),
+                change,
+                "  REGRESSION" if regressed else "",
+            )
+        )
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="only run benchmarks whose name has TEXT")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="FILE", help="store the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare to stored results")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(setup, args.repeat)
+        if not args.compare:
+            print("{:<28} {:>12}".format(name, format_seconds(results[name])))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "sqlalchemy": sa.__version__,
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+"""Compare query throughput under throttling with and without adaptive
+concurrency.
+
+A fake virtual instance (no requests are sent to Rockset) answers up to
+`capacity` concurrent queries and throttles the rest with a 429 and a
+`Retry-After` header. Worker threads run queries against it through
+connections with retries only, and with retries and an adaptive
+concurrency limiter.
+
+    python benchmarks/throttling.py [threads] [queries_per_thread] [capacity]
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+
+import urllib3
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.throttling import limiter_stats
+
+BODY = json.dumps(
+    {
+        "query_id": "benchmark",
+        "results": [{"n": 1}],
+        "column_fields": [{"name": "n", "type": "int"}],
+        "results_total_doc_count": 1,
+    }
+).encode()
+
+THROTTLED = b'{"message": "Rate limit exceeded", "type": "RATELIMITEXCEEDED"}'
+
+
+class ThrottlingPoolManager(object):
+    """Stands in for the client's urllib3 pool; serves `capacity` requests at
+    a time, each taking `latency` seconds, and throttles the others."""
+
+    def __init__(self, capacity, latency=0.01):
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, preload_content=True, **kwargs):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            throttled = self.in_flight > self.capacity
+            self.throttled += throttled
+        try:
+            if throttled:
+                return urllib3.HTTPResponse(
+                    body=io.BytesIO(THROTTLED),
+                    headers={"Content-Type": "application/json", "Retry-After": "0.05"},
+                    status=429,
+                    preload_content=preload_content,
+                )
+            time.sleep(self.latency)
+            return urllib3.HTTPResponse(
+                body=io.BytesIO(BODY),
+                headers={"Content-Type": "application/json"},
+                status=200,
+                preload_content=preload_content,
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def clear(self):
+        pass
+
+
+def run(threads, queries, capacity, **connect_args):
+    connection = rockset_sqlalchemy.connect(
+        "https://api.usw2a1.rockset.com", "benchmark", **connect_args
+    )
+    pool = ThrottlingPoolManager(capacity)
+    connection._client.api_client.rest_client.pool_manager = pool
+    failures = []
+
+    def work():
+        cursor = connection.cursor()
+        for _ in range(queries):
+            try:
+                cursor.execute("SELECT 1 AS n")
+                cursor.fetchall()
+            except rockset_sqlalchemy.Error as e:
+                failures.append(e)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, len(failures), pool.requests, pool.throttled
+
+
+def main(threads=32, queries=20, capacity=4):
+    print(
+        "{} threads x {} queries, capacity {} concurrent queries".format(
+            threads, queries, capacity
+        )
+    )
+    for name, connect_args in [
+        ("retries", {"virtual_instance": "retries"}),
+        (
+            "adaptive",
+            {
+                "virtual_instance": "adaptive",
+                "adaptive_concurrency": True,
+                "concurrency_limit": threads,
+            },
+        ),
+    ]:
+        elapsed, failures, requests, throttled = run(
+            threads, queries, capacity, **connect_args
+        )
+        print(
+            "{:<9} {:>6.2f}s  {:>6.0f} queries/s  {:>4} failed  {:>5} requests"
+            "  {:>5} throttled".format(
+                name,
+                elapsed,
+                (threads * queries - failures) / elapsed,
+                failures,
+                requests,
+                throttled,
+            )
+        )
+    for key, stats in limiter_stats().items():
+        print("limiter {}: {}".format(key, stats))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
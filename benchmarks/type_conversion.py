@@ -0,0 +1,93 @@
+"""Compare per-value and batched conversion of datetime-heavy results.
+
+Replays a recorded-style response through the client's HTTP layer (no
+requests are sent to Rockset) and times fetching it through SQLAlchemy:
+
+- strings: no conversion, values stay Rockset's wire format
+- per-value: the types' result processors parse each value
+- batched: the cursor parses each typed column per fetch batch
+  (``convert_types``, the dialect default)
+
+    python benchmarks/type_conversion.py [rows]
+"""
+
+import json
+import sys
+import time
+
+import sqlalchemy as sa
+
+from rockset_sqlalchemy.sqlalchemy import types
+
+import fake_client
+
+COLUMNS = [
+    ("_id", "string", types.String),
+    ("_event_time", "timestamp", types.Timestamp),
+    ("created", "datetime", types.DateTime),
+    ("day", "date", types.Date),
+    ("at", "time", types.Time),
+    ("duration", "microsecond_interval", types.MicrosecondInterval),
+]
+
+
+def make_response_body(rows):
+    results = [
+        {
+            "_id": "doc-{}".format(i),
+            "_event_time": "2024-01-{:02d}T12:34:56.{:06d}Z".format(
+                i % 28 + 1, i % 10**6
+            ),
+            "created": "2023-06-{:02d}T01:02:03.{:06d}".format(i % 28 + 1, i % 10**6),
+            "day": "2023-{:02d}-{:02d}".format(i % 12 + 1, i % 28 + 1),
+            "at": "{:02d}:{:02d}:00.000000".format(i % 24, i % 60),
+            "duration": i * 1000,
+        }
+        for i in range(rows)
+    ]
+    return json.dumps(
+        {
+            "query_id": "benchmark",
+            "column_fields": [{"name": n, "type": t} for n, t, _ in COLUMNS],
+            "results": results,
+            "results_total_doc_count": rows,
+        }
+    ).encode()
+
+
+def run(body, convert_types, typed, repeat=3):
+    engine = sa.create_engine(
+        "rockset://benchmark@api.usw2a1.rockset.com"
+        "?json_decoder=json&convert_types={}".format(convert_types)
+    )
+    table = sa.Table(
+        "events",
+        sa.MetaData(),
+        *[sa.Column(name, type_) for name, _, type_ in COLUMNS],
+    )
+    statement = sa.select(table) if typed else sa.text("SELECT * FROM events")
+    best = float("inf")
+    with engine.connect() as conn:
+        fake_client.install(conn.connection, body)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = conn.execute(statement).fetchall()
+            best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main(rows=100000):
+    body = make_response_body(rows)
+    print("{} rows, {} columns".format(rows, len(COLUMNS)))
+    for name, convert_types, typed in [
+        ("strings", False, False),
+        ("per-value", False, True),
+        ("batched", True, True),
+    ]:
+        elapsed, result = run(body, convert_types, typed)
+        assert len(result) == rows
+        print("{:<10} {:>8.3f}s  {!r}".format(name, elapsed, result[1][1]))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
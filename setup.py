@@ -15,13 +15,23 @@ setup(
     entry_points={
         "sqlalchemy.dialects": [
             "rockset_sqlalchemy = rockset_sqlalchemy.sqlalchemy:RocksetDialect",
-            "rockset = rockset_sqlalchemy.sqlalchemy:RocksetDialect"
+            "rockset = rockset_sqlalchemy.sqlalchemy:RocksetDialect",
+            "rockset.async = rockset_sqlalchemy.sqlalchemy:AsyncAdaptedRocksetDialect"
+        ],
+        "console_scripts": [
+            "rockset-sqlalchemy-metadata-cache = rockset_sqlalchemy.sqlalchemy.metadata_cache:main"
         ]
     },
     install_requires=[
         "rockset>=1.0.0",
         "sqlalchemy>=1.4.0"
     ],
+    extras_require={
+        "async": ["aiohttp", "sqlalchemy[asyncio]>=1.4.0"],
+        "numpy": ["numpy"],
+        "arrow": ["pyarrow"],
+        "fast-json": ["orjson"]
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: Apache Software License',
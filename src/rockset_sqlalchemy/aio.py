@@ -0,0 +1,355 @@
+"""Asyncio DB-API driver for Rockset.
+
+Queries are sent with aiohttp, so many queries can run concurrently on one
+event loop. The API mirrors :mod:`rockset_sqlalchemy`, except that
+``connect``, ``execute``, the ``fetch*`` methods and ``close`` are coroutines::
+
+    conn = await rockset_sqlalchemy.aio.connect(api_server, api_key)
+    cursor = conn.cursor()
+    await cursor.execute("SELECT :x AS x", {"x": 1})
+    rows = await cursor.fetchall()
+
+aiohttp is an optional dependency: ``pip install rockset-sqlalchemy[async]``.
+"""
+
+import asyncio
+
+import aiohttp
+
+from .binding import bind_parameters
+from .cache import ResultCache
+from .cursor import DEFAULT_PAGE_SIZE, BaseCursor
+from .decoding import Response, get_decoder
+from .exceptions import Error, NotSupportedError, ProgrammingError, TransportError
+
+__all__ = ["connect", "AsyncConnection", "AsyncCursor", "Error"]
+
+apilevel = "2.0"
+threadsafety = 1
+paramstyle = "named"
+
+
+class AsyncRocksetClient(object):
+    """Minimal non-blocking client for the Rockset query endpoints."""
+
+    def __init__(self, api_server, api_key, json_decoder="auto"):
+        if "://" not in api_server:
+            api_server = "https://{}".format(api_server)
+        self._api_server = api_server.rstrip("/")
+        self._headers = {
+            "Authorization": "ApiKey {}".format(api_key),
+            "Content-Type": "application/json",
+        }
+        self._session = None
+        self._decode = get_decoder(json_decoder)
+
+    def _get_session(self):
+        # The session must be created from within the running event loop.
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers=self._headers)
+        return self._session
+
+    async def _request(self, method, path, **kwargs):
+        try:
+            async with self._get_session().request(
+                method, self._api_server + path, **kwargs
+            ) as resp:
+                body = await resp.read()
+                if resp.status >= 400:
+                    raise Error.map_http_error(resp.status, body.decode())
+                return Response(self._decode(body))
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e))
+
+    async def query(self, query, vi=None, query_params={}, max_initial_results=None):
+        body = {
+            "sql": {
+                "query": query,
+                "parameters": bind_parameters(query_params),
+            }
+        }
+        if max_initial_results is not None:
+            body["max_initial_results"] = max_initial_results
+        path = (
+            "/v1/orgs/self/virtualinstances/{}/queries".format(vi)
+            if vi
+            else "/v1/orgs/self/queries"
+        )
+        return await self._request("POST", path, json=body)
+
+    async def execute_query_lambda(
+        self,
+        workspace,
+        name,
+        version=None,
+        tag=None,
+        vi=None,
+        query_params={},
+        max_initial_results=None,
+    ):
+        body = {"parameters": bind_parameters(query_params)}
+        if vi:
+            body["virtual_instance_id"] = vi
+        if max_initial_results is not None:
+            body["max_initial_results"] = max_initial_results
+        path = "/v1/orgs/self/ws/{}/lambdas/{}/{}".format(
+            workspace,
+            name,
+            (
+                "versions/{}".format(version)
+                if version is not None
+                else "tags/{}".format(tag or "latest")
+            ),
+        )
+        return await self._request("POST", path, json=body)
+
+    async def get_query_results(self, query_id, cursor, docs):
+        return await self._request(
+            "GET",
+            "/v1/orgs/self/queries/{}/pages".format(query_id),
+            params={"cursor": cursor, "docs": docs},
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncCursor(BaseCursor):
+    def __init__(self, connection, stream_results=None, page_size=None):
+        super().__init__(connection, stream_results=stream_results, page_size=page_size)
+
+    async def execute(self, sql, parameters=None):
+        self._check_cursor_opened()
+        parameters = self._prepare_parameters(sql, parameters)
+
+        response = await self._connection._client.query(
+            sql,
+            self._connection.vi,
+            query_params=parameters,
+            max_initial_results=self.page_size if self.stream_results else None,
+        )
+        self._set_response(response)
+
+    async def execute_lambda(
+        self, name, parameters=None, version=None, tag=None, workspace="commons"
+    ):
+        self._check_cursor_opened()
+        parameters = self._prepare_parameters(
+            "-- query lambda {}.{}".format(workspace, name), parameters
+        )
+        response = await self._connection._client.execute_query_lambda(
+            workspace,
+            name,
+            version=version,
+            tag=tag,
+            vi=self._connection.vi,
+            query_params=parameters,
+            max_initial_results=self.page_size if self.stream_results else None,
+        )
+        self._set_response(response)
+
+    async def callproc(self, procname, parameters=None):
+        workspace, name, version = BaseCursor._parse_procname(procname)
+        await self.execute_lambda(
+            name, parameters, version=version, workspace=workspace
+        )
+        return parameters
+
+    async def executemany(self, sql, all_parameters):
+        """Execute `sql` once per parameter set.
+
+        Up to `connection.executemany_workers` read-only queries are in flight
+        at once; other statements (e.g. INSERT) run one at a time, in order.
+        The cursor is left with the result of the last parameter set.
+        """
+        self._check_cursor_opened()
+        all_parameters = [
+            self._prepare_parameters(sql, parameters) for parameters in all_parameters
+        ]
+        if not all_parameters:
+            return
+
+        client, vi = self._connection._client, self._connection.vi
+        semaphore = asyncio.Semaphore(
+            self._connection.executemany_workers if ResultCache.is_cacheable(sql) else 1
+        )
+
+        async def run(parameters):
+            async with semaphore:
+                return await client.query(sql, vi, query_params=parameters)
+
+        responses = await asyncio.gather(*[run(p) for p in all_parameters])
+        self._set_response(responses[-1])
+
+    async def _fill_page(self):
+        while (
+            self._results is not None
+            and self._pos >= len(self._results)
+            and self._next_cursor is not None
+        ):
+            page = await self._connection._client.get_query_results(
+                self._query_id, self._next_cursor, self.page_size
+            )
+            self._results = page.results
+            self._pos = 0
+            self._next_cursor = BaseCursor._next_page_cursor(page)
+
+    # BaseCursor only reads the page that is loaded; the coroutines below load
+    # the next page with `_fill_page` before reading it.
+
+    async def fetchone(self):
+        self._check_cursor_opened()
+        await self._fill_page()
+        return super().fetchone()
+
+    async def fetchmany(self, size=None):
+        self._check_cursor_opened()
+        if size is None:
+            size = self.arraysize
+
+        rows = []
+        while len(rows) < size:
+            await self._fill_page()
+            batch = super().fetchmany(size - len(rows))
+            if not batch:
+                break
+            rows.extend(batch)
+        return rows
+
+    async def fetchall(self):
+        self._check_cursor_opened()
+        rows = []
+        while True:
+            await self._fill_page()
+            batch = super().fetchall()
+            if not batch:
+                return rows
+            rows.extend(batch)
+
+    async def fetch_numpy(self):
+        self._check_cursor_opened()
+        await self._load_remaining_pages()
+        return super().fetch_numpy()
+
+    async def fetch_arrow_table(self):
+        self._check_cursor_opened()
+        await self._load_remaining_pages()
+        return super().fetch_arrow_table()
+
+    async def _load_remaining_pages(self):
+        # Joins the unread rows of all remaining pages into one page.
+        while self._results is not None and self._next_cursor is not None:
+            page = await self._connection._client.get_query_results(
+                self._query_id, self._next_cursor, self.page_size
+            )
+            self._results = self._results[self._pos :] + page.results
+            self._pos = 0
+            self._next_cursor = BaseCursor._next_page_cursor(page)
+
+    def add_documents(self, workspace, collection, documents):
+        raise NotSupportedError(
+            "The Documents API is not supported by the asyncio driver"
+        )
+
+    def poll(self):
+        raise NotSupportedError(
+            "Asynchronous (polled) queries are not supported by the asyncio driver"
+        )
+
+    def cancel(self):
+        raise NotSupportedError(
+            "Asynchronous (polled) queries are not supported by the asyncio driver"
+        )
+
+    def __iter__(self):
+        raise TypeError("AsyncCursor does not support iteration, use `async for`")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        row = await self.fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    async def close(self):
+        # Closing does no I/O; this is a coroutine for symmetry with execute.
+        super().close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncConnection(object):
+    def __init__(
+        self,
+        api_server,
+        api_key,
+        virtual_instance=None,
+        debug_sql=False,
+        stream_results=False,
+        page_size=DEFAULT_PAGE_SIZE,
+        validate_on_connect=False,
+        executemany_workers=8,
+        json_decoder="auto",
+        convert_types=False,
+    ):
+        self._closed = False
+        self._client = AsyncRocksetClient(api_server, api_key, json_decoder)
+        self.api_server = api_server
+        self.vi = virtual_instance
+        self.debug_sql = debug_sql
+        self.stream_results = stream_results
+        self.page_size = page_size
+        self.executemany_workers = executemany_workers
+        self.convert_types = convert_types
+        self._validate_on_connect = validate_on_connect
+
+    async def ping(self):
+        """Run a trivial query to check connectivity to Rockset.
+
+        Raises an `Error` if Rockset cannot be reached or rejects the request.
+        """
+        if self._closed:
+            raise ProgrammingError("Connection closed")
+        await self._client.query("SELECT 1", vi=self.vi)
+
+    def cursor(self, stream_results=None, page_size=None):
+        if not self._closed:
+            return AsyncCursor(self, stream_results=stream_results, page_size=page_size)
+        raise ProgrammingError("Connection closed")
+
+    async def close(self):
+        self._closed = True
+        await self._client.close()
+
+    async def rollback(self):
+        # Transactions are not supported in Rockset.
+        pass
+
+    async def commit(self):
+        # Transactions are not supported in Rockset.
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+async def connect(*args, **kwargs):
+    conn = AsyncConnection(*args, **kwargs)
+    if conn._validate_on_connect:
+        try:
+            await conn.ping()
+        except Exception:
+            await conn.close()
+            raise
+    return conn
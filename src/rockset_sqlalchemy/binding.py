@@ -0,0 +1,79 @@
+"""Binding of query parameters to Rockset's typed parameter format.
+
+Each Python type maps to a Rockset type and a function that serializes its
+values. The mapping for a statement's parameter names and types (its
+signature) is resolved once and cached, so executing the same statement again
+only serializes the values.
+"""
+
+import datetime
+import json
+from functools import lru_cache
+
+
+def _bool(value):
+    return "true" if value else "false"
+
+
+def _identity(value):
+    return value
+
+
+def _json(value):
+    return json.dumps(value, default=str)
+
+
+def _datetime(value):
+    # Rockset datetimes have no time zone; aware datetimes are sent in UTC.
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _null(value):
+    return "null"
+
+
+# Python type -> (Rockset type, serializer). Subclasses of these types use the
+# entry of their nearest base class.
+binders = {
+    bool: ("bool", _bool),
+    int: ("int", str),
+    float: ("float", repr),
+    str: ("string", _identity),
+    datetime.datetime: ("datetime", _datetime),
+    datetime.date: ("date", datetime.date.isoformat),
+    datetime.time: ("time", datetime.time.isoformat),
+    dict: ("object", _json),
+    list: ("array", _json),
+    tuple: ("array", _json),
+    type(None): ("null", _null),
+}
+
+
+def _binder(value_type):
+    for base in value_type.__mro__:
+        if base in binders:
+            return binders[base]
+    raise TypeError(
+        "Parameter value of type {} is not supported by Rockset".format(value_type)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _signature(names, types):
+    return tuple(
+        (name,) + _binder(value_type) for name, value_type in zip(names, types)
+    )
+
+
+def bind_parameters(parameters):
+    """Return the Rockset query parameters for a dict of named parameters."""
+    if not parameters:
+        return []
+    values = parameters.values()
+    signature = _signature(tuple(parameters), tuple(map(type, values)))
+    return [
+        {"name": name, "type": rockset_type, "value": serialize(value)}
+        for (name, rockset_type, serialize), value in zip(signature, values)
+    ]
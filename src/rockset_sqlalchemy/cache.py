@@ -0,0 +1,135 @@
+from collections import OrderedDict
+import json
+import re
+import sys
+import threading
+import time
+
+# Only read-only statements are cached.
+_CACHEABLE_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+class CachedResult(object):
+    """A result set stored as row tuples rather than response documents.
+
+    `column_types` are the Rockset types of the result's columns and
+    `converted_types` those of the columns the cursor converted, so a cached
+    result is described like the result it was built from.
+    """
+
+    __slots__ = (
+        "columns",
+        "rows",
+        "rowcount",
+        "first_doc",
+        "column_types",
+        "converted_types",
+        "size",
+        "expires_at",
+    )
+
+    def __init__(
+        self,
+        columns,
+        rows,
+        rowcount,
+        first_doc,
+        column_types=None,
+        converted_types=None,
+    ):
+        self.columns = columns
+        self.rows = rows
+        self.rowcount = rowcount
+        self.first_doc = first_doc
+        self.column_types = column_types
+        self.converted_types = converted_types
+        self.size = _estimate_size(rows)
+        self.expires_at = None
+
+
+def _estimate_size(rows):
+    # Shallow size of the rows and their values. Nested arrays and objects are
+    # only counted at their top level, so this is an approximation.
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache(object):
+    """Thread-safe LRU cache of query results with a time-to-live.
+
+    Entries expire `ttl` seconds after they are stored. The least recently
+    used entries are evicted once there are more than `max_entries` entries or
+    their estimated size exceeds `max_bytes`.
+    """
+
+    def __init__(self, ttl=60, max_entries=1000, max_bytes=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_cacheable(sql):
+        return _CACHEABLE_RE.match(sql) is not None
+
+    @staticmethod
+    def make_key(vi, sql, parameters):
+        return (vi, sql, json.dumps(parameters, sort_keys=True, default=str))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if self.max_bytes is not None and entry.size > self.max_bytes:
+            return
+        entry.expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,51 @@
+import os
+import socket
+import threading
+
+from rockset import RocksetClient
+from rockset.configuration import Configuration
+from urllib3.connection import HTTPConnection
+
+# Process-wide RocksetClients, keyed by everything that configures their HTTP
+# transport. Each client owns a thread-safe urllib3 pool, so connections that
+# talk to the same API server with the same key share sockets and TLS sessions.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_server, api_key, pool_maxsize=None, keepalive=False, retries=None):
+    """Return the shared RocksetClient for these settings, creating it if needed.
+
+    `pool_maxsize` is the number of HTTP connections kept open to the API
+    server, `keepalive` enables TCP keep-alive on them and `retries` overrides
+    urllib3's retry count for failed requests.
+    """
+    # Include the pid so a forked worker never reuses its parent's sockets.
+    key = (os.getpid(), api_server, api_key, pool_maxsize, keepalive, retries)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _create_client(
+                api_server, api_key, pool_maxsize, keepalive, retries
+            )
+        return client
+
+
+def _create_client(api_server, api_key, pool_maxsize, keepalive, retries):
+    config = Configuration(host=api_server, api_key=api_key, retries=retries)
+    if pool_maxsize is not None:
+        config.connection_pool_maxsize = pool_maxsize
+    if keepalive:
+        config.socket_options = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+    return RocksetClient(host=api_server, api_key=api_key, config=config)
+
+
+def clear_clients():
+    """Drop all shared clients, closing their HTTP connections."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.api_client.rest_client.pool_manager.clear()
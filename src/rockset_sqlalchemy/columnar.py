@@ -0,0 +1,89 @@
+"""Conversion of query results to numpy arrays and Arrow tables.
+
+numpy and pyarrow are optional dependencies, imported on first use.
+"""
+
+import importlib
+import json
+
+
+def _require(module, extra):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            "{} is required for columnar results; install it with "
+            "`pip install rockset-sqlalchemy[{}]`".format(module, extra)
+        ) from e
+
+
+def to_numpy(columns, types):
+    """Convert `{name: [values]}` to `{name: numpy array}`.
+
+    `types` maps column names to Rockset type names, which select the dtype
+    of each array (see `numpy_dtype_map`).
+    """
+    np = _require("numpy", "numpy")
+    from .sqlalchemy.types import numpy_dtype_map
+
+    return {
+        name: _numpy_array(np, values, numpy_dtype_map.get(types.get(name)))
+        for name, values in columns.items()
+    }
+
+
+def _numpy_array(np, values, dtype):
+    if dtype in ("int64", "bool") and None in values:
+        # Like pandas, use NaN for missing integers; booleans have no
+        # missing value, so they stay Python objects.
+        dtype = "float64" if dtype == "int64" else None
+    if dtype is not None:
+        if dtype.startswith("datetime64"):
+            # numpy has no time zones and parses UTC timestamps much more
+            # slowly (with a warning) when they keep their "Z" suffix.
+            values = [
+                v[:-1] if isinstance(v, str) and v.endswith("Z") else v for v in values
+            ]
+        try:
+            return np.array(values, dtype=dtype)
+        except (TypeError, ValueError):
+            pass
+    # Assign into an empty array so that lists stay elements of a 1-d array.
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def to_arrow_table(columns, types):
+    """Convert `{name: [values]}` to a `pyarrow.Table`.
+
+    `types` maps column names to Rockset type names, which select the Arrow
+    type of each column (see `arrow_type_map`).
+    """
+    pa = _require("pyarrow", "arrow")
+    from .sqlalchemy.types import arrow_type_map
+
+    return pa.table(
+        {
+            name: _arrow_array(pa, values, arrow_type_map.get(types.get(name)))
+            for name, values in columns.items()
+        }
+    )
+
+
+def _arrow_array(pa, values, make_type):
+    if make_type is not None:
+        arrow_type = make_type(pa)
+        try:
+            if pa.types.is_temporal(arrow_type):
+                return pa.array(values, type=pa.string()).cast(arrow_type)
+            return pa.array(values, type=arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Values of mixed types; keep the JSON text of each one.
+        return pa.array(
+            [None if v is None else json.dumps(v, default=str) for v in values]
+        )
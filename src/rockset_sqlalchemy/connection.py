@@ -1,24 +1,154 @@
-from rockset import RocksetClient
-
-from .cursor import Cursor
+from .client import get_client
+from .cursor import DEFAULT_PAGE_SIZE, Cursor
+from .decoding import get_decoder
 from .exceptions import ProgrammingError
+from .throttling import RetryPolicy, get_limiter
 
 
 class Connection(object):
-    def __init__(self, api_server, api_key, virtual_instance=None, debug_sql=False):
+    def __init__(
+        self,
+        api_server,
+        api_key,
+        virtual_instance=None,
+        debug_sql=False,
+        stream_results=False,
+        page_size=DEFAULT_PAGE_SIZE,
+        prefetch_pages=0,
+        prefetch_max_rows=None,
+        validate_on_connect=False,
+        pool_maxsize=None,
+        pool_keepalive=False,
+        http_retries=None,
+        result_cache=None,
+        cache_all_queries=True,
+        executemany_workers=8,
+        bulk_batch_size=1000,
+        bulk_workers=4,
+        bulk_wait_for_visibility=False,
+        json_decoder=None,
+        convert_types=False,
+        prepared_statements=None,
+        async_queries=False,
+        instrumentation=None,
+        max_retries=3,
+        retry_backoff=0.1,
+        retry_max_backoff=10.0,
+        adaptive_concurrency=False,
+        concurrency_limit=16,
+        max_concurrency=256,
+        router=None,
+    ):
         self._closed = False
-        self._client = RocksetClient(host=api_server, api_key=api_key)
+        # Clients are shared by all connections with the same settings, so
+        # opening a connection does not open a new HTTP connection pool.
+        self._client = get_client(
+            api_server,
+            api_key,
+            pool_maxsize=pool_maxsize,
+            keepalive=pool_keepalive,
+            retries=http_retries,
+        )
+        self.api_server = api_server
         self.vi = virtual_instance
         self.debug_sql = debug_sql
-        # Used for testing connectivity to Rockset.
+        # Defaults for cursors created from this connection. Streaming cursors
+        # fetch `page_size` documents per request instead of the whole result.
+        self.stream_results = stream_results
+        self.page_size = page_size
+        # Streaming cursors can fetch up to `prefetch_pages` pages ahead on a
+        # background thread, holding at most about `prefetch_max_rows` rows.
+        self.prefetch_pages = prefetch_pages
+        self.prefetch_max_rows = prefetch_max_rows
+        # An optional ResultCache, usually shared by all connections of an
+        # engine. If `cache_all_queries` is False, only cursors that set
+        # `use_result_cache` are served from it.
+        self.result_cache = result_cache
+        self.cache_all_queries = cache_all_queries
+        # Maximum number of parameter sets Cursor.executemany runs at once.
+        self.executemany_workers = executemany_workers
+        # Options for writes through the Documents API (Cursor.add_documents).
+        self.bulk_batch_size = bulk_batch_size
+        self.bulk_workers = bulk_workers
+        self.bulk_wait_for_visibility = bulk_wait_for_visibility
+        # If set ("auto", "orjson", "msgspec", "json" or a function), query
+        # responses are decoded from the raw response body with it instead of
+        # being deserialized into rockset model objects.
+        self.json_decoder = None if json_decoder is None else get_decoder(json_decoder)
+        # Whether cursors convert dates, times, timestamps and intervals of
+        # typed result columns from Rockset's wire formats to Python types.
+        self.convert_types = convert_types
+        # An optional PreparedStatements, usually shared by all connections of
+        # an engine, that runs recurring statements as query lambdas.
+        self.prepared_statements = prepared_statements
+        # Default for cursors: run queries asynchronously, polling for their
+        # results instead of holding a request open until they finish.
+        self.async_queries = async_queries
+        # An optional Instrumentation, usually shared by all connections of
+        # an engine, that records the timings and statistics of each query.
+        self.instrumentation = instrumentation
+        # Read-only queries throttled by Rockset (or failing with a 502, 503
+        # or 504) are retried up to `max_retries` times with exponential
+        # backoff, starting at `retry_backoff` seconds.
+        self.retry_policy = (
+            RetryPolicy(max_retries, retry_backoff, retry_max_backoff)
+            if max_retries
+            else None
+        )
+        # With `adaptive_concurrency`, the requests of all connections of the
+        # process to this virtual instance share a ConcurrencyLimiter, which
+        # starts at `concurrency_limit` requests in flight and adapts to
+        # throttling, up to `max_concurrency`.
+        self._limiter_args = (
+            {"initial_limit": concurrency_limit, "max_limit": max_concurrency}
+            if adaptive_concurrency
+            else None
+        )
+        self.limiter = self.get_limiter(virtual_instance)
+        # An optional VirtualInstanceRouter, usually shared by all connections
+        # of an engine, that spreads queries across several virtual instances
+        # instead of sending them all to `virtual_instance`.
+        self.router = router
+        if validate_on_connect:
+            self.ping()
+
+    def get_limiter(self, vi):
+        """Return the ConcurrencyLimiter for requests to the virtual instance
+        `vi`, or None without adaptive concurrency."""
+        if self._limiter_args is None:
+            return None
+        return get_limiter(self.api_server, vi, **self._limiter_args)
+
+    def ping(self):
+        """Run a trivial query to check connectivity to Rockset.
+
+        Raises an `Error` if Rockset cannot be reached or rejects the request.
+        """
+        if self._closed:
+            raise ProgrammingError("Connection closed")
         Cursor.execute_query(self._client, "SELECT 1", vi=self.vi)
 
-    def cursor(self):
+    def cursor(
+        self,
+        stream_results=None,
+        page_size=None,
+        prefetch_pages=None,
+        prefetch_max_rows=None,
+        async_query=None,
+    ):
         if not self._closed:
-            return Cursor(self)
+            return Cursor(
+                self,
+                stream_results=stream_results,
+                page_size=page_size,
+                prefetch_pages=prefetch_pages,
+                prefetch_max_rows=prefetch_max_rows,
+                async_query=async_query,
+            )
         raise ProgrammingError("Connection closed")
 
     def close(self):
+        # Only drop this connection's reference; the shared client stays open.
         self._client = None
         self._closed = True
 
@@ -0,0 +1,146 @@
+"""Conversion of Rockset wire formats to Python types.
+
+Rockset returns dates, times and timestamps as ISO 8601 strings and
+microsecond intervals as integers. Older responses wrap such values as
+``{"__rockset_type": ..., "value": ...}``. Values that are already converted,
+or None, are returned unchanged.
+"""
+
+import datetime
+from functools import lru_cache
+from operator import itemgetter
+import sys
+
+_TYPE_META = "__rockset_type"
+
+# Values of date columns repeat a lot, so their parses are memoized.
+_date_from_string = lru_cache(maxsize=4096)(datetime.date.fromisoformat)
+_datetime_from_string = datetime.datetime.fromisoformat
+_time_from_string = datetime.time.fromisoformat
+
+
+def _unwrap(value):
+    if isinstance(value, dict) and _TYPE_META in value:
+        return value["value"]
+    return value
+
+
+def parse_date(value):
+    value = _unwrap(value)
+    if isinstance(value, str):
+        return _date_from_string(value)
+    return value
+
+
+def parse_datetime(value):
+    value = _unwrap(value)
+    if isinstance(value, str):
+        return _datetime_from_string(value)
+    return value
+
+
+def parse_time(value):
+    value = _unwrap(value)
+    if isinstance(value, str):
+        return _time_from_string(value)
+    return value
+
+
+def _as_utc(parsed):
+    if parsed.tzinfo is datetime.timezone.utc:
+        return parsed
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def parse_timestamp(value):
+    """Parse a timestamp into an aware datetime in UTC."""
+    value = _unwrap(value)
+    if isinstance(value, str):
+        if value.endswith("Z"):
+            value = value[:-1]
+        return _as_utc(_datetime_from_string(value))
+    return value
+
+
+def parse_microsecond_interval(value):
+    value = _unwrap(value)
+    if isinstance(value, int):
+        return datetime.timedelta(microseconds=value)
+    return value
+
+
+# Parsers keyed by Rockset type name, like `type_map`.
+parsers = {
+    "date": parse_date,
+    "datetime": parse_datetime,
+    "time": parse_time,
+    "timestamp": parse_timestamp,
+    "microsecond_interval": parse_microsecond_interval,
+}
+
+
+def _parse_utc_timestamp(value):
+    return _as_utc(_datetime_from_string(value))
+
+
+# Python 3.11+ parses the "Z" suffix in C; older versions need it stripped.
+_timestamp_from_string = (
+    _parse_utc_timestamp if sys.version_info >= (3, 11) else parse_timestamp
+)
+
+
+def _interval_from_int(value):
+    return datetime.timedelta(microseconds=value)
+
+
+def _column_converter(wire_type, from_wire, parse):
+    # Values in the plain wire format go straight to the C parser; anything
+    # else (None, wrapped values) takes the slower generic path.
+    def convert(values):
+        return [from_wire(v) if type(v) is wire_type else parse(v) for v in values]
+
+    return convert
+
+
+_column_converters = {
+    "date": _column_converter(str, _date_from_string, parse_date),
+    "datetime": _column_converter(str, _datetime_from_string, parse_datetime),
+    "time": _column_converter(str, _time_from_string, parse_time),
+    "timestamp": _column_converter(str, _timestamp_from_string, parse_timestamp),
+    "microsecond_interval": _column_converter(
+        int, _interval_from_int, parse_microsecond_interval
+    ),
+}
+
+
+def column_converters(columns, column_types):
+    """Return `[(index, converter)]` for the columns that need converting.
+
+    A converter converts a whole column (a sequence of values) at once.
+    """
+    return [
+        (i, _column_converters[column_types[name]])
+        for i, name in enumerate(columns)
+        if column_types.get(name) in _column_converters
+    ]
+
+
+def documents_to_rows(docs, columns, converters):
+    """Project a batch of documents onto `columns` as converted row tuples.
+
+    Builds each column once and zips the columns into rows, so every row
+    tuple is only created once.
+    """
+    if not docs:
+        return []
+    values = []
+    for name in columns:
+        try:
+            values.append(list(map(itemgetter(name), docs)))
+        except KeyError:
+            values.append([doc.get(name) for doc in docs])
+    for i, convert in converters:
+        values[i] = convert(values[i])
+    return list(zip(*values))
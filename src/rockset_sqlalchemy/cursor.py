@@ -1,21 +1,77 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, date
+from operator import itemgetter
 import json
+import threading
+import time
 
 import rockset
+import urllib3
 
-from .exceptions import Error, ProgrammingError
+from . import columnar
+from .binding import bind_parameters
+from .cache import CachedResult, ResultCache
+from .conversion import column_converters, documents_to_rows
+from .decoding import decode_response
+from .documents import add_documents
+from .prepared import PreparedStatements
+from .exceptions import Error, OperationalError, ProgrammingError, TransportError
+from .instrumentation import QueryEvent
+from .routing import is_unavailable
+from .throttling import call_with_retries
 
+# Rockset caps `max_initial_results` and page sizes at 100,000 documents.
+DEFAULT_PAGE_SIZE = 10000
 
-class Cursor(object):
-    def __init__(self, connection):
+_REQUEST_HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+
+# Seconds between status checks while waiting for an asynchronous query. The
+# interval doubles after each check, up to the maximum.
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+
+class BaseCursor(object):
+    """Reads query results: builds and converts rows, describes columns and
+    pages through a result.
+
+    Shared by `Cursor` and the asyncio driver's `AsyncCursor`. It sends no
+    requests; subclasses run queries and load the pages after the first one
+    (`_load_next_page`).
+    """
+
+    def __init__(self, connection, stream_results=None, page_size=None):
         self._connection = connection
         self._closed = False
-        self.arraysize = 1
-        self._response = None
-        self._response_iter = None
+        # Default batch size for fetchmany(). Rows are converted in bulk, so
+        # larger batches amortize the per-call overhead.
+        self.arraysize = 1000
+        # When streaming, results are requested from Rockset one page at a
+        # time and pages are dropped once they have been consumed.
+        self.stream_results = (
+            connection.stream_results if stream_results is None else stream_results
+        )
+        self.page_size = page_size or connection.page_size
+        self._results = None
+        self._pos = 0
+        self._query_id = None
+        self._next_cursor = None
+        self._first_doc = None
+        self._rowcount = -1
+        self._columns = None
+        self._column_types = None
+        self._row_builder = None
+        self._converters = None
+        # Rockset types of the columns converted by the cursor.
+        self._converted_types = None
+        # The QueryEvent of the current query, if the connection is
+        # instrumented.
+        self._event = None
 
     @staticmethod
-    def __convert_to_rockset_type(v):
+    def _convert_to_rockset_type(v):
         if isinstance(v, bool):
             return "bool"
         elif isinstance(v, int):
@@ -38,41 +94,21 @@ class Cursor(object):
         )
 
     @staticmethod
-    def execute_query(client, query, vi=None, query_params={}):
-        request = rockset.models.QueryRequestSql(
-            query=query,
-            parameters=[
-                rockset.models.QueryParameter(
-                    name=param,
-                    value=str(val),
-                    type=Cursor.__convert_to_rockset_type(val),
-                )
-                for param, val in query_params.items()
-            ],
-        )
-        try:
-            return (
-                client.VirtualInstances.query_virtual_instance(
-                    virtual_instance_id=vi, sql=request
+    def _parse_procname(procname):
+        """Split `[workspace.]name[:version]` into its three parts."""
+        name, _, version = procname.partition(":")
+        workspace, _, name = name.rpartition(".")
+        return workspace or "commons", name, version or None
+
+    def _prepare_parameters(self, sql, parameters):
+        if parameters and not isinstance(parameters, dict):
+            raise ProgrammingError(
+                "Unsupported type for query parameters: expected `dict`, found {}".format(
+                    type(parameters)
                 )
-                if vi
-                else client.Queries.query(sql=request)
             )
-        except rockset.exceptions.RocksetException as e:
-            raise Error.map_rockset_exception(e)
 
-    def execute(self, sql, parameters=None):
-        self.__check_cursor_opened()
-
-        # Serialize all list parameters to strings.
-        new_params = {}
-        if parameters:
-            for k, v in parameters.items():
-                if isinstance(v, list):
-                    new_params[k] = json.dumps(v)
-                else:
-                    new_params[k] = v
-        parameters = new_params
+        parameters = parameters or {}
 
         if self._connection.debug_sql:
             print("+++++++++++++++++++++++++++++")
@@ -80,90 +116,247 @@ class Cursor(object):
             print(f"\nParameters:\n{parameters}")
             print("+++++++++++++++++++++++++++++")
 
-        if parameters and not isinstance(parameters, dict):
-            raise ProgrammingError(
-                "Unsupported type for query parameters: expected `dict`, found {}".format(
-                    type(parameters)
-                )
-            )
+        return parameters
+
+    def _set_response(self, response, paged=False):
+        """Start reading the result of a query from its first page.
 
-        self._response = Cursor.execute_query(
-            self._connection._client, sql, self._connection.vi, query_params=parameters
+        `paged` marks a page read from the query results endpoint, which
+        has no `column_fields`.
+        """
+        results = response.results
+        self._results = results
+        self._pos = 0
+        if not paged:
+            self._query_id = getattr(response, "query_id", None)
+        # Results fetched by page (those of asynchronous queries) are read a
+        # page at a time, like streamed results.
+        self._next_cursor = (
+            BaseCursor._next_page_cursor(response)
+            if self.stream_results or paged
+            else None
+        )
+        self._first_doc = results[0] if results else None
+        self._rowcount = getattr(response, "results_total_doc_count", None)
+        if self._rowcount is None:
+            self._rowcount = len(results)
+        self._columns = BaseCursor._response_to_columns(response, ordered=paged)
+        column_types = BaseCursor._response_to_column_types(response)
+        if paged and not column_types:
+            # Result pages have no column fields; keep the types reported by
+            # the query's first response.
+            column_types = self._column_types or {}
+        self._column_types = column_types
+        self._row_builder = BaseCursor._make_row_builder(self._columns)
+        # If the connection converts types, dates, times and intervals are
+        # parsed a column at a time, for each batch of fetched rows.
+        self._converters = (
+            column_converters(self._columns, self._column_types)
+            if self._connection.convert_types
+            else None
         )
-        self._response_iter = iter(self._response.results)
+        self._converted_types = {
+            self._columns[i]: self._column_types[self._columns[i]]
+            for i, _ in self._converters or ()
+        }
 
-    def executemany(self, sql, all_parameters):
-        for parameters in all_parameters:
-            self.execute(sql, parameters)
+    @staticmethod
+    def _next_page_cursor(response):
+        pagination = getattr(response, "pagination", None)
+        if not pagination:
+            return None
+        return getattr(pagination, "next_cursor", None)
 
-    def fetchone(self):
-        self.__check_cursor_opened()
+    def _load_next_page(self):
+        """Replace the exhausted page with the next one.
 
-        try:
-            next_doc = next(self._response_iter)
-        except StopIteration:
-            return None
-        except rockset.exceptions.RocksetException as e:
-            raise Error.map_rockset_exception(e)
+        Returns False when there are no more pages. Only the rows of the
+        current page are loaded here; subclasses request further pages.
+        """
+        return False
 
-        if not next_doc:
+    def fetchone(self):
+        self._check_cursor_opened()
+        if self._results is None:
             return None
+        while self._pos >= len(self._results):
+            if not self._load_next_page():
+                return None
 
-        result = []
+        next_doc = self._results[self._pos]
+        self._pos += 1
+        return self._build_rows([next_doc])[0]
 
-        column_fields = getattr(self._response, "column_fields", None)
-        for field in self._response_to_column_fields(column_fields):
-            name = field["name"]
-            if name in next_doc:
-                result.append(next_doc[name])
-            else:
-                result.append(None)
-
-        return tuple(result)
+    def _build_rows(self, docs):
+        event = self._event
+        if event is not None:
+            started = time.perf_counter()
+        if self._converters:
+            rows = documents_to_rows(docs, self._columns, self._converters)
+        else:
+            rows = list(map(self._row_builder, docs))
+        if event is not None:
+            event.add_time("build", time.perf_counter() - started)
+            event.rows += len(rows)
+        return rows
 
-    def _response_to_column_fields(self, column_fields):
-        # find the data type of each column by looking at
-        # the result set.
+    @staticmethod
+    def _response_to_columns(response, ordered=False):
+        # Resolve the ordered list of column names once per result set.
+        column_fields = getattr(response, "column_fields", None)
         if column_fields:
-            columns = [cf["name"] for cf in column_fields]
+            return [cf["name"] for cf in column_fields]
+
+        # Result pages have no column fields, but their documents list the
+        # fields in the order of the query's projection.
+        if ordered and response.results:
+            return list(response.results[0])
+
+        # we only look at the first document because
+        # is sqlalchemy is typically used for relational
+        # tables with no sparse fields
+        if response.results:
+            return sorted(response.results[0])
+        return []
+
+    @staticmethod
+    def _response_to_column_types(response):
+        column_fields = getattr(response, "column_fields", None) or ()
+        return {cf["name"]: cf.get("type") for cf in column_fields if cf.get("type")}
+
+    @staticmethod
+    def _make_row_builder(columns):
+        """Return a function that projects a document onto `columns` as a tuple.
+
+        Missing fields are returned as None.
+        """
+        if not columns:
+            return lambda doc: ()
+
+        getter = itemgetter(*columns)
+        if len(columns) == 1:
+
+            def build_row(doc):
+                try:
+                    return (getter(doc),)
+                except KeyError:
+                    return (None,)
+
+        else:
 
-        schema = rockset.Document()
-        if self._response.results and len(self._response.results) > 0:
-            # we only look at the first document because
-            # is sqlalchemy is typically used for relational
-            # tables with no sparse fields
-            schema.update(self._response.results[0])
+            def build_row(doc):
+                try:
+                    return getter(doc)
+                except KeyError:
+                    return tuple(map(doc.get, columns))
 
-        return schema.fields(columns=columns)
+        return build_row
 
     def fetchall(self):
-        docs = []
+        self._check_cursor_opened()
+        if self._results is None:
+            return []
+
+        rows = []
         while True:
-            doc = self.fetchone()
-            if doc is None:
-                break
-            docs.append(doc)
-        return docs
+            start, self._pos = self._pos, len(self._results)
+            rows.extend(self._build_rows(self._results[start:]))
+            if not self._load_next_page():
+                return rows
 
     def fetchmany(self, size=None):
+        self._check_cursor_opened()
+        if self._results is None:
+            return []
         if size is None:
             size = self.arraysize
-        docs = []
-        while len(docs) != size:
-            doc = self.fetchone()
-            if doc is None:
+
+        rows = []
+        while True:
+            start = self._pos
+            self._pos = min(start + size - len(rows), len(self._results))
+            rows.extend(self._build_rows(self._results[start : self._pos]))
+            if len(rows) >= size or not self._load_next_page():
+                return rows
+
+    def fetch_numpy(self):
+        """Fetch the remaining rows as a dict of column name to numpy array.
+
+        Columns are built straight from the result documents, without
+        creating a tuple per row. Requires numpy.
+        """
+        return columnar.to_numpy(*self._fetch_columns())
+
+    def fetch_arrow_table(self):
+        """Fetch the remaining rows as a `pyarrow.Table`. Requires pyarrow."""
+        return columnar.to_arrow_table(*self._fetch_columns())
+
+    def _fetch_columns(self):
+        """Return `({column: [values]}, {column: Rockset type})` for the
+        remaining rows, consuming them."""
+        self._check_cursor_opened()
+        if self._results is None:
+            return {}, {}
+
+        columns = {name: [] for name in self._columns}
+        event = self._event
+        while True:
+            started = time.perf_counter()
+            rows, self._pos = self._results[self._pos :], len(self._results)
+            if self._row_builder is _identity:
+                BaseCursor._extend_columns_from_tuples(columns, rows)
+            else:
+                BaseCursor._extend_columns_from_documents(columns, rows)
+            if event is not None:
+                event.add_time("build", time.perf_counter() - started)
+                event.rows += len(rows)
+            if not self._load_next_page():
                 break
-            docs.append(doc)
-        return docs
+
+        types = dict(self._column_types or {})
+        for name, values in columns.items():
+            if name not in types:
+                types[name] = BaseCursor._infer_column_type(values)
+        return columns, types
+
+    @staticmethod
+    def _extend_columns_from_tuples(columns, rows):
+        # Rows of the result cache, which are already built as tuples.
+        for i, values in enumerate(columns.values()):
+            values.extend([row[i] for row in rows])
+
+    @staticmethod
+    def _extend_columns_from_documents(columns, docs):
+        for name, values in columns.items():
+            try:
+                values.extend(list(map(itemgetter(name), docs)))
+            except KeyError:
+                values.extend([doc.get(name) for doc in docs])
+
+    @staticmethod
+    def _infer_column_type(values):
+        for value in values:
+            if value is not None:
+                try:
+                    return BaseCursor._convert_to_rockset_type(value)
+                except TypeError:
+                    return None
+        return None
 
     @property
     def description(self):
-        if self._response is None:
+        if self._columns is None:
             return None
 
+        first_doc = self._first_doc or {}
+        # Columns converted by the cursor report their Rockset type, which
+        # tells the dialect's result processors to leave them alone.
+        converted = self._converted_types or {}
         desc = []
-        for field_name, field_value in self._response.results[0].items():
-            name, type_ = field_name, Cursor.__convert_to_rockset_type(field_value)
+        for name in self._columns:
+            type_ = converted.get(name) or BaseCursor._convert_to_rockset_type(
+                first_doc.get(name)
+            )
             null_ok = name != "_id" and "__id" not in name
 
             # name, type_code, display_size, internal_size, precision, scale, null_ok
@@ -184,14 +377,19 @@ class Cursor(object):
 
     def close(self):
         self._closed = True
-        self._response = None
+        self._results = None
+        self._next_cursor = None
+        self._first_doc = None
+        self._columns = None
+        self._row_builder = None
 
     @property
     def rowcount(self):
-        self.__check_cursor_opened()
-        return len(self._response.results)
+        # Readable after close, as SQLAlchemy reads it once a DML cursor has
+        # been closed.
+        return self._rowcount
 
-    def __check_cursor_opened(self):
+    def _check_cursor_opened(self):
         if self._connection._closed:
             raise ProgrammingError("Connection is closed")
         if self._closed:
@@ -208,3 +406,817 @@ class Cursor(object):
 
     def setoutputsize(self, size, column=None):
         pass
+
+
+class Cursor(BaseCursor):
+    def __init__(
+        self,
+        connection,
+        stream_results=None,
+        page_size=None,
+        prefetch_pages=None,
+        prefetch_max_rows=None,
+        async_query=None,
+    ):
+        super().__init__(connection, stream_results, page_size)
+        # Number of pages a streaming cursor fetches ahead on a background
+        # thread (0 disables prefetching), and an optional cap on the number
+        # of rows held by those prefetched pages.
+        self.prefetch_pages = (
+            connection.prefetch_pages if prefetch_pages is None else prefetch_pages
+        )
+        self.prefetch_max_rows = prefetch_max_rows or connection.prefetch_max_rows
+        self._prefetcher = None
+        # Whether to serve this cursor's queries from the connection's result
+        # cache, if it has one.
+        self.use_result_cache = connection.cache_all_queries
+        # Whether to run recurring statements through the connection's
+        # prepared statements, if it has them.
+        self.use_prepared_statements = True
+        # Asynchronous queries return a query ID instead of holding the HTTP
+        # request open; results are fetched once `poll()` reports that the
+        # query finished. Rockset waits up to `async_client_timeout_ms` for
+        # the query before returning, so quick queries return results at once.
+        self.async_query = (
+            connection.async_queries if async_query is None else async_query
+        )
+        self.async_client_timeout_ms = None
+        # The name or ID of the virtual instance to run this cursor's queries
+        # on, if the connection routes queries across several of them.
+        self.virtual_instance = None
+        # The concurrency limiter of the virtual instance the current query
+        # ran on; its result pages are fetched under the same limit.
+        self._limiter = connection.limiter
+        self._pending = False
+
+    @staticmethod
+    def execute_query(
+        client,
+        query,
+        vi=None,
+        query_params={},
+        max_initial_results=None,
+        decoder=None,
+        async_options=None,
+        event=None,
+        retry=None,
+        limiter=None,
+    ):
+        """Run a query and return its response.
+
+        With a `decoder`, the response body is decoded with it into plain
+        dicts and lists instead of rockset model objects. With
+        `async_options`, the query runs asynchronously: if it does not finish
+        within `client_timeout_ms`, the response has no results, only the
+        query ID. Phase timings are added to `event`, a QueryEvent, if given.
+        Throttled requests are retried as the RetryPolicy `retry` allows, and
+        each attempt holds a slot of the ConcurrencyLimiter `limiter`.
+        """
+        started = time.perf_counter()
+        body = {"sql": {"query": query, "parameters": bind_parameters(query_params)}}
+        if event is not None:
+            event.add_time("bind", time.perf_counter() - started)
+        if max_initial_results is not None:
+            body["max_initial_results"] = max_initial_results
+        if async_options is not None:
+            body["async"] = True
+            body["async_options"] = async_options
+        if vi:
+            return Cursor._post(
+                client,
+                "/v1/orgs/self/virtualinstances/{virtualInstanceId}/queries",
+                {"virtualInstanceId": vi},
+                body,
+                decoder,
+                event,
+                retry,
+                limiter,
+            )
+        return Cursor._post(
+            client,
+            "/v1/orgs/self/queries",
+            {},
+            body,
+            decoder,
+            event,
+            retry,
+            limiter,
+        )
+
+    @staticmethod
+    def execute_query_lambda(
+        client,
+        workspace,
+        name,
+        version=None,
+        tag=None,
+        vi=None,
+        query_params={},
+        max_initial_results=None,
+        decoder=None,
+        async_options=None,
+        event=None,
+        retry=None,
+        limiter=None,
+    ):
+        """Execute a query lambda by version, or by tag (default "latest")."""
+        started = time.perf_counter()
+        body = {"parameters": bind_parameters(query_params)}
+        if event is not None:
+            event.add_time("bind", time.perf_counter() - started)
+        if vi:
+            body["virtual_instance_id"] = vi
+        if max_initial_results is not None:
+            body["max_initial_results"] = max_initial_results
+        if async_options is not None:
+            body["async"] = True
+            body["async_options"] = async_options
+        path_params = {"workspace": workspace, "queryLambda": name}
+        if version is not None:
+            path = (
+                "/v1/orgs/self/ws/{workspace}/lambdas/{queryLambda}/versions/{version}"
+            )
+            path_params["version"] = str(version)
+        else:
+            path = "/v1/orgs/self/ws/{workspace}/lambdas/{queryLambda}/tags/{tag}"
+            path_params["tag"] = tag or "latest"
+        return Cursor._post(
+            client, path, path_params, body, decoder, event, retry, limiter
+        )
+
+    @staticmethod
+    def _post(
+        client, path, path_params, body, decoder, event=None, retry=None, limiter=None
+    ):
+        # Query requests are sent as plain dicts rather than rockset models:
+        # building and validating the models costs more than the rest of
+        # preparing a request.
+        try:
+            response = call_with_retries(
+                lambda: client.api_client.call_api(
+                    path,
+                    "POST",
+                    path_params=path_params,
+                    header_params=dict(_REQUEST_HEADERS),
+                    body=body,
+                    response_type=(rockset.models.QueryResponse,),
+                    auth_settings=["apikey"],
+                    _return_http_data_only=True,
+                    _preload_content=decoder is None,
+                    _check_type=True,
+                ),
+                retry,
+                limiter,
+                event,
+            )
+            return Cursor._decode(response, decoder, event)
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+
+    @staticmethod
+    def _decode(response, decoder, event=None):
+        if decoder is None:
+            return response
+        if event is None:
+            return decode_response(response, decoder)
+        started = time.perf_counter()
+        event.add_bytes(len(response.data))
+        response = decode_response(response, decoder)
+        event.add_time("decode", time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def fetch_results_page(
+        client,
+        query_id,
+        cursor,
+        page_size,
+        decoder=None,
+        event=None,
+        retry=None,
+        limiter=None,
+    ):
+        """Fetch a page of results; without a `cursor`, the first page."""
+        kwargs = {}
+        if cursor is not None:
+            kwargs["cursor"] = cursor
+        if decoder is not None:
+            kwargs["_preload_content"] = False
+        try:
+            return Cursor._decode(
+                call_with_retries(
+                    lambda: client.Queries.get_query_results(
+                        query_id=query_id, docs=page_size, **kwargs
+                    ),
+                    retry,
+                    limiter,
+                    event,
+                ),
+                decoder,
+                event,
+            )
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+
+    @staticmethod
+    def get_query(client, query_id):
+        """Return the status, errors and stats of a query as a dict."""
+        try:
+            response = client.Queries.get_query(
+                query_id=query_id, _preload_content=False
+            )
+            return decode_response(response, json.loads)["data"]
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+
+    @staticmethod
+    def cancel_query(client, query_id):
+        try:
+            client.Queries.cancel_query(query_id=query_id, _preload_content=False)
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+
+    def execute(self, sql, parameters=None):
+        self._check_cursor_opened()
+        parameters = self._prepare_parameters(sql, parameters)
+
+        with self._instrument(sql, parameters):
+            cache = self._connection.result_cache
+            if (
+                cache is not None
+                and self.use_result_cache
+                and not self.stream_results
+                and not self.async_query
+                and ResultCache.is_cacheable(sql)
+            ):
+                key = ResultCache.make_key(self._connection.vi, sql, parameters)
+                entry = cache.get(key)
+                if entry is None:
+                    self._set_response(self._run_query(sql, parameters))
+                    entry = CachedResult(
+                        self._columns,
+                        self.fetchall(),
+                        self._rowcount,
+                        self._first_doc,
+                        self._column_types,
+                        self._converted_types,
+                    )
+                    cache.put(key, entry)
+                self._set_cached_result(entry)
+                return
+
+            max_initial_results = self.page_size if self.stream_results else None
+            if self.async_query:
+                self._set_response(
+                    self._run_query(
+                        sql, parameters, async_options=self._async_options()
+                    )
+                )
+            else:
+                self._set_response(
+                    self._run_query(
+                        sql, parameters, max_initial_results=max_initial_results
+                    )
+                )
+
+    @contextmanager
+    def _instrument(self, sql, parameters):
+        # Starts the QueryEvent of a query, if the connection is instrumented.
+        # The event is recorded once the result has been consumed, or now if
+        # the query fails.
+        self._finish_query()
+        if self._connection.instrumentation is not None:
+            self._event = QueryEvent(sql, parameters)
+        try:
+            yield
+        except Exception as e:
+            self._finish_query(e)
+            raise
+
+    def _finish_query(self, error=None):
+        event, self._event = self._event, None
+        if event is not None:
+            event.error = error
+            self._connection.instrumentation.record(event)
+
+    def _async_options(self):
+        options = {}
+        if self.async_client_timeout_ms is not None:
+            options["client_timeout_ms"] = self.async_client_timeout_ms
+        if self.stream_results:
+            options["max_initial_results"] = self.page_size
+        return options
+
+    def _run_query(self, sql, parameters, max_initial_results=None, async_options=None):
+        connection = self._connection
+        # Only read-only statements are retried.
+        read_only = ResultCache.is_cacheable(sql)
+        retry = connection.retry_policy if read_only else None
+        prepared = connection.prepared_statements
+        statement = None
+        if (
+            prepared is not None
+            and self.use_prepared_statements
+            and PreparedStatements.is_preparable(sql)
+        ):
+            statement = prepared.get(connection._client, sql)
+
+        def send(vi, limiter):
+            nonlocal statement
+            self._limiter = limiter
+            if statement is not None:
+                try:
+                    return Cursor.execute_query_lambda(
+                        connection._client,
+                        statement.workspace,
+                        statement.name,
+                        version=statement.version,
+                        vi=vi,
+                        query_params=parameters,
+                        max_initial_results=max_initial_results,
+                        decoder=connection.json_decoder,
+                        async_options=async_options,
+                        event=self._event,
+                        retry=retry,
+                        limiter=limiter,
+                    )
+                except ProgrammingError as e:
+                    # The lambda was deleted (404) or cannot run the
+                    # statement; run the SQL text instead.
+                    prepared.discard(statement.key, permanent=e.args[1:2] != (404,))
+                    statement = None
+            return Cursor.execute_query(
+                connection._client,
+                sql,
+                vi,
+                query_params=parameters,
+                max_initial_results=max_initial_results,
+                decoder=connection.json_decoder,
+                async_options=async_options,
+                event=self._event,
+                retry=retry,
+                limiter=limiter,
+            )
+
+        return self._route(send, read_only)
+
+    def _route(self, send, read_only):
+        """Call `send(vi, limiter)` for the virtual instance to run a query on.
+
+        Without a router, queries run on the connection's virtual instance.
+        With one, a read-only query that fails because a virtual instance is
+        unavailable is sent to the next one, unless the cursor is pinned to a
+        `virtual_instance`.
+        """
+        connection = self._connection
+        router = connection.router
+        if router is None:
+            return send(connection.vi, connection.limiter)
+        candidates = router.candidates(self.virtual_instance)
+        for i, vi in enumerate(candidates):
+            router.start(vi)
+            try:
+                response = send(vi, connection.get_limiter(vi))
+            except Error as e:
+                failed = is_unavailable(e)
+                router.finish(vi, failed)
+                if not failed or not read_only or i + 1 == len(candidates):
+                    raise
+            except BaseException:
+                router.finish(vi)
+                raise
+            else:
+                router.finish(vi)
+                return response
+
+    def execute_lambda(
+        self, name, parameters=None, version=None, tag=None, workspace="commons"
+    ):
+        """Execute the query lambda `workspace.name`.
+
+        Query lambdas are SQL statements stored in Rockset, so only the name
+        and the parameters are sent. Runs the given `version`, else the
+        version with the given `tag`, else the latest version.
+        """
+        self._check_cursor_opened()
+        parameters = self._prepare_parameters(
+            "-- query lambda {}.{}".format(workspace, name), parameters
+        )
+        with self._instrument(
+            "-- query lambda {}.{}".format(workspace, name), parameters
+        ):
+            async_options = self._async_options() if self.async_query else None
+
+            def send(vi, limiter):
+                self._limiter = limiter
+                return Cursor.execute_query_lambda(
+                    self._connection._client,
+                    workspace,
+                    name,
+                    version=version,
+                    tag=tag,
+                    vi=vi,
+                    query_params=parameters,
+                    max_initial_results=(
+                        self.page_size
+                        if self.stream_results and async_options is None
+                        else None
+                    ),
+                    decoder=self._connection.json_decoder,
+                    async_options=async_options,
+                    event=self._event,
+                    limiter=limiter,
+                )
+
+            # Query lambdas may write, so they are not failed over.
+            self._set_response(self._route(send, read_only=False))
+
+    def callproc(self, procname, parameters=None):
+        """Execute a query lambda named `[workspace.]name[:version]`.
+
+        Without a version, the latest version is run. Returns `parameters`.
+        """
+        workspace, name, version = Cursor._parse_procname(procname)
+        self.execute_lambda(name, parameters, version=version, workspace=workspace)
+        return parameters
+
+    def _set_response(self, response, paged=False):
+        self._cancel_prefetch()
+        if getattr(response, "results", None) is None and not paged:
+            # An asynchronous query that is still queued or running.
+            self._set_pending(
+                getattr(response, "query_id", None),
+                BaseCursor._response_to_column_types(response),
+            )
+            return
+        self._pending = False
+        super()._set_response(response, paged)
+        if not paged and self._event is not None:
+            self._event.query_id = self._query_id
+            self._event.server_stats = Cursor._server_stats(response)
+
+        if self._next_cursor is not None and self.prefetch_pages > 0:
+            connection = self._connection
+            client, query_id, page_size, decoder, event = (
+                connection._client,
+                self._query_id,
+                self.page_size,
+                connection.json_decoder,
+                self._event,
+            )
+            retry, limiter = connection.retry_policy, self._limiter
+            self._prefetcher = _PagePrefetcher(
+                lambda cursor: Cursor.fetch_results_page(
+                    client, query_id, cursor, page_size, decoder, event, retry, limiter
+                ),
+                self._next_cursor,
+                self.prefetch_pages,
+                self.prefetch_max_rows,
+            )
+            self._next_cursor = None
+
+    @staticmethod
+    def _server_stats(response):
+        stats = getattr(response, "stats", None)
+        if stats is None or isinstance(stats, dict):
+            return stats
+        return stats.to_dict()
+
+    def _set_pending(self, query_id, column_types=None):
+        self._pending = True
+        self._query_id = query_id
+        if self._event is not None:
+            self._event.query_id = query_id
+        self._results = None
+        self._pos = 0
+        self._next_cursor = None
+        self._first_doc = None
+        self._rowcount = -1
+        self._columns = None
+        self._column_types = column_types
+        self._row_builder = None
+        self._converters = None
+        self._converted_types = None
+
+    @property
+    def query_id(self):
+        """The ID of the last query, e.g. of a running asynchronous query."""
+        return self._query_id
+
+    def poll(self):
+        """Check whether the asynchronous query has finished, without waiting.
+
+        Returns False while the query is queued or running and True once its
+        results can be fetched. Raises the query's error if it failed.
+        """
+        self._check_cursor_opened()
+        if not self._pending:
+            return True
+        client, query_id, event = self._connection._client, self._query_id, self._event
+        started = time.perf_counter()
+        info = Cursor.get_query(client, query_id)
+        if event is not None:
+            event.add_time("wait", time.perf_counter() - started)
+            event.server_stats = info.get("stats")
+        status = info.get("status")
+        if status in ("QUEUED", "RUNNING"):
+            return False
+        self._pending = False
+        if status == "CANCELLED":
+            raise OperationalError(
+                "Query {} was cancelled".format(query_id), None, "QUERY_CANCELLED"
+            )
+        if status != "COMPLETED":
+            errors = info.get("query_errors") or [{}]
+            raise Error.map_http_error(
+                errors[0].get("status_code") or 400, json.dumps(errors[0])
+            )
+        page = Cursor.fetch_results_page(
+            client,
+            query_id,
+            None,
+            self.page_size,
+            self._connection.json_decoder,
+            event,
+            self._connection.retry_policy,
+            self._limiter,
+        )
+        self._set_response(page, paged=True)
+        return True
+
+    def cancel(self):
+        """Cancel the running asynchronous query."""
+        self._check_cursor_opened()
+        if not self._pending:
+            return
+        Cursor.cancel_query(self._connection._client, self._query_id)
+        self._pending = False
+
+    def _wait(self):
+        # Waits for a running asynchronous query to finish.
+        interval = POLL_INTERVAL
+        while not self.poll():
+            started = time.perf_counter()
+            time.sleep(interval)
+            if self._event is not None:
+                self._event.add_time("wait", time.perf_counter() - started)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    def _set_cached_result(self, entry):
+        self._cancel_prefetch()
+        self._results = entry.rows
+        self._pos = 0
+        self._query_id = None
+        self._next_cursor = None
+        self._first_doc = entry.first_doc
+        self._rowcount = entry.rowcount
+        if self._event is not None:
+            self._event.cached = True
+        self._columns = entry.columns
+        self._column_types = entry.column_types
+        # Cached rows are already converted tuples.
+        self._row_builder = _identity
+        self._converters = None
+        self._converted_types = entry.converted_types
+
+    def _cancel_prefetch(self):
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+            self._prefetcher = None
+
+    def _load_next_page(self):
+        if self._prefetcher is not None:
+            results = self._prefetcher.next_page()
+            if results is None:
+                self._prefetcher = None
+                self._finish_query()
+                return False
+            self._results = results
+            self._pos = 0
+            return True
+
+        if self._next_cursor is None:
+            self._finish_query()
+            return False
+
+        page = Cursor.fetch_results_page(
+            self._connection._client,
+            self._query_id,
+            self._next_cursor,
+            self.page_size,
+            self._connection.json_decoder,
+            self._event,
+            self._connection.retry_policy,
+            self._limiter,
+        )
+        self._results = page.results
+        self._pos = 0
+        self._next_cursor = Cursor._next_page_cursor(page)
+        return True
+
+    def executemany(self, sql, all_parameters):
+        """Execute `sql` once per parameter set.
+
+        Read-only queries are independent requests, so they run concurrently
+        on up to `connection.executemany_workers` threads. Other statements
+        (e.g. INSERT) run one at a time, in order. The cursor is left with the
+        result of the last parameter set.
+        """
+        self._check_cursor_opened()
+        all_parameters = [
+            self._prepare_parameters(sql, parameters) for parameters in all_parameters
+        ]
+        if not all_parameters:
+            return
+
+        with self._instrument(sql, all_parameters[-1]):
+            started = time.perf_counter()
+            connection = self._connection
+            read_only = ResultCache.is_cacheable(sql)
+            retry = connection.retry_policy if read_only else None
+
+            def run(parameters):
+                # Each parameter set is routed on its own.
+                return self._route(
+                    lambda vi, limiter: Cursor.execute_query(
+                        connection._client,
+                        sql,
+                        vi,
+                        query_params=parameters,
+                        decoder=connection.json_decoder,
+                        retry=retry,
+                        limiter=limiter,
+                    ),
+                    read_only,
+                )
+
+            workers = min(connection.executemany_workers, len(all_parameters))
+            if workers <= 1 or not read_only:
+                responses = list(map(run, all_parameters))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    responses = list(pool.map(run, all_parameters))
+            if self._event is not None:
+                self._event.add_time("http", time.perf_counter() - started)
+            self._set_response(responses[-1])
+
+    def add_documents(self, workspace, collection, documents):
+        """Write `documents` (a list of dicts) through the Documents API.
+
+        This is much faster than INSERT statements for loading data. Batching,
+        parallelism and waiting for visibility follow the connection's
+        `bulk_*` options. Sets `rowcount` to the number of documents written.
+        """
+        self._check_cursor_opened()
+        self._finish_query()
+        self._cancel_prefetch()
+        connection = self._connection
+        self._rowcount = add_documents(
+            connection._client,
+            workspace,
+            collection,
+            documents,
+            batch_size=connection.bulk_batch_size,
+            max_workers=connection.bulk_workers,
+            wait_for_visibility=connection.bulk_wait_for_visibility,
+        )
+        self._results = None
+        self._columns = None
+        self._first_doc = None
+        self._next_cursor = None
+
+    def fetchone(self):
+        if self._pending:
+            self._wait()
+        return super().fetchone()
+
+    def fetchall(self):
+        if self._pending:
+            self._wait()
+        return super().fetchall()
+
+    def fetchmany(self, size=None):
+        if self._pending:
+            self._wait()
+        return super().fetchmany(size)
+
+    def _fetch_columns(self):
+        if self._pending:
+            self._wait()
+        return super()._fetch_columns()
+
+    @property
+    def description(self):
+        """The columns of the result, per PEP 249.
+
+        Blocks until a running asynchronous query has finished, since its
+        columns are only known then; `poll()` checks without waiting.
+        """
+        if self._pending and not self._closed:
+            self._wait()
+        return super().description
+
+    def close(self):
+        self._finish_query()
+        self._cancel_prefetch()
+        self._pending = False
+        super().close()
+
+
+def _identity(row):
+    return row
+
+
+class _PagePrefetcher(object):
+    """Fetches the pages of a streamed result on a background thread.
+
+    At most `depth` pages (and, if set, about `max_rows` rows) are buffered
+    ahead of the consumer. Errors are re-raised from `next_page` once the
+    pages fetched before them have been consumed.
+    """
+
+    def __init__(self, fetch_page, next_cursor, depth, max_rows=None):
+        self._fetch_page = fetch_page
+        self._depth = depth
+        self._max_rows = max_rows
+        self._pages = deque()
+        self._buffered_rows = 0
+        self._error = None
+        self._done = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(next_cursor,),
+            name="rockset-prefetch",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _has_room(self):
+        # Always allow one page so a page larger than `max_rows` cannot stall.
+        if not self._pages:
+            return True
+        if len(self._pages) >= self._depth:
+            return False
+        return self._max_rows is None or self._buffered_rows < self._max_rows
+
+    def _run(self, cursor):
+        try:
+            while cursor is not None:
+                with self._cond:
+                    while not self._cancelled and not self._has_room():
+                        self._cond.wait()
+                    if self._cancelled:
+                        return
+
+                page = self._fetch_page(cursor)
+                cursor = Cursor._next_page_cursor(page)
+
+                with self._cond:
+                    if self._cancelled:
+                        return
+                    self._pages.append(page.results)
+                    self._buffered_rows += len(page.results)
+                    self._cond.notify_all()
+        except Exception as e:
+            with self._cond:
+                self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def next_page(self):
+        """Return the next page of results, or None after the last page."""
+        with self._cond:
+            while not self._pages and not self._done:
+                self._cond.wait()
+            if self._pages:
+                results = self._pages.popleft()
+                self._buffered_rows -= len(results)
+                self._cond.notify_all()
+                return results
+            if self._error is not None and not self._cancelled:
+                raise self._error
+            return None
+
+    def cancel(self):
+        """Stop fetching and drop buffered pages.
+
+        A request that is already in flight is allowed to finish, but its
+        result is discarded.
+        """
+        with self._cond:
+            self._cancelled = True
+            self._pages.clear()
+            self._buffered_rows = 0
+            self._cond.notify_all()
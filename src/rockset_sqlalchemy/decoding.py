@@ -0,0 +1,80 @@
+"""Decoding of raw JSON responses.
+
+By default responses are deserialized into rockset model objects by the
+OpenAPI client. A connection created with a `json_decoder` instead reads the
+raw response body and decodes it with orjson, msgspec or the json module,
+which is much cheaper for large results.
+"""
+
+import json
+
+from .exceptions import ProgrammingError
+
+
+class Response(dict):
+    """Attribute access over a decoded JSON response, like the rockset models."""
+
+    def __getattr__(self, name):
+        try:
+            value = self[name]
+        except KeyError:
+            raise AttributeError(name)
+        return Response(value) if isinstance(value, dict) else value
+
+
+def _orjson():
+    import orjson
+
+    return orjson.loads
+
+
+def _msgspec():
+    import msgspec
+
+    return msgspec.json.Decoder().decode
+
+
+def _json():
+    return json.loads
+
+
+_DECODERS = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _json,
+}
+
+
+def get_decoder(decoder="auto"):
+    """Return a function that decodes a JSON document from bytes.
+
+    `decoder` is a decoder name, a function, or "auto" for the fastest
+    installed decoder.
+    """
+    if callable(decoder):
+        return decoder
+    if decoder == "auto":
+        for factory in (_orjson, _msgspec):
+            try:
+                return factory()
+            except ImportError:
+                pass
+        return _json()
+    try:
+        factory = _DECODERS[decoder]
+    except KeyError:
+        raise ProgrammingError(
+            "Unknown JSON decoder {!r}, expected one of {}".format(
+                decoder, ", ".join(["auto"] + list(_DECODERS))
+            )
+        )
+    return factory()
+
+
+def decode_response(http_response, decoder):
+    """Decode an unread urllib3 response and release its connection."""
+    try:
+        body = http_response.data
+    finally:
+        http_response.release_conn()
+    return Response(decoder(body))
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import rockset
+import urllib3
+
+from .exceptions import DocumentsError, Error, OperationalError, TransportError
+
+
+def add_documents(
+    client,
+    workspace,
+    collection,
+    documents,
+    batch_size=1000,
+    max_workers=4,
+    wait_for_visibility=False,
+    visibility_timeout=60,
+):
+    """Write `documents` to a collection through the Documents API.
+
+    Documents are sent in batches of `batch_size`, with up to `max_workers`
+    batches in flight at once. If `wait_for_visibility` is set, this returns
+    only once the written documents can be queried.
+
+    Returns the number of documents written. Raises `DocumentsError` if any
+    document was rejected; the other documents are still written.
+    """
+    batches = [
+        documents[i : i + batch_size] for i in range(0, len(documents), batch_size)
+    ]
+    if not batches:
+        return 0
+
+    def write(batch):
+        try:
+            return client.Documents.add_documents(
+                workspace=workspace, collection=collection, data=batch
+            )
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+
+    workers = min(max_workers, len(batches))
+    if workers <= 1:
+        responses = [write(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = list(pool.map(write, batches))
+
+    failures = _failures(responses, batch_size)
+    offsets = [
+        response.last_offset
+        for response in responses
+        if getattr(response, "last_offset", None)
+    ]
+
+    if wait_for_visibility and offsets:
+        _wait_for_offsets(client, workspace, collection, offsets, visibility_timeout)
+
+    if failures:
+        raise DocumentsError(
+            "{} of {} documents could not be added to {}.{}: {}".format(
+                len(failures), len(documents), workspace, collection, failures[0][2]
+            ),
+            failures,
+        )
+    return len(documents)
+
+
+def _failures(responses, batch_size):
+    """Return `(index, _id, message)` for each document a batch rejected."""
+    failures = []
+    for batch_index, response in enumerate(responses):
+        for i, status in enumerate(response.data):
+            if status.get("status") == "ERROR":
+                error = status.get("error")
+                failures.append(
+                    (
+                        batch_index * batch_size + i,
+                        status.get("_id"),
+                        getattr(error, "message", None),
+                    )
+                )
+    return failures
+
+
+def _wait_for_offsets(client, workspace, collection, offsets, timeout):
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while True:
+        try:
+            commit = client.Collections.get_collection_offsets(
+                workspace=workspace, collection=collection, name=offsets
+            )
+        except rockset.exceptions.RocksetException as e:
+            raise Error.map_rockset_exception(e)
+        except urllib3.exceptions.HTTPError as e:
+            raise TransportError(str(e))
+        if commit.data.passed:
+            return
+        if time.monotonic() >= deadline:
+            raise OperationalError(
+                "Timed out waiting for documents to become visible in {}.{}".format(
+                    workspace, collection
+                ),
+                None,
+                "TIMEOUT",
+            )
+        time.sleep(delay)
+        delay = min(delay * 2, 2)
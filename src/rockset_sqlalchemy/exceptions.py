@@ -5,10 +5,27 @@ from json import loads
 class Error(rockset.exceptions.RocksetException):
     @classmethod
     def map_rockset_exception(cls, exc):
-        err_body = loads(exc.body)
-        args = [err_body["message"], exc.status, err_body["type"]]
+        # Proxies answer with non-JSON bodies (e.g. an HTML 502 page), and
+        # errors raised before a response was received have no body.
+        body = exc.body
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+        try:
+            err_body = loads(body) if body else {}
+        except ValueError:
+            err_body = {}
+        if not isinstance(err_body, dict):
+            err_body = {}
+        args = [
+            err_body.get("message", body or exc.reason),
+            exc.status,
+            err_body.get("type"),
+        ]
         exc_type = type(exc)
-        if (
+        if exc.status == 429:
+            # Throttled; the rockset client raises these as bad requests.
+            ret = OperationalError(*args)
+        elif (
             exc_type == rockset.exceptions.ApiTypeError
             or exc_type == rockset.exceptions.ApiValueError
             or exc_type == rockset.exceptions.ApiAttributeError
@@ -30,6 +47,24 @@ class Error(rockset.exceptions.RocksetException):
             ret = cls(*args)
         return ret
 
+    @classmethod
+    def map_http_error(cls, status, body):
+        """Map an error response from the Rockset REST API to a DB-API exception."""
+        try:
+            err_body = loads(body)
+        except ValueError:
+            err_body = {}
+        args = [err_body.get("message", body), status, err_body.get("type")]
+        if status in (400, 404):
+            ret = ProgrammingError(*args)
+        elif status in (401, 403, 429):
+            ret = OperationalError(*args)
+        elif status >= 500:
+            ret = InternalError(*args)
+        else:
+            ret = cls(*args)
+        return ret
+
 
 class InterfaceError(Error):
     pass
@@ -61,3 +96,24 @@ class OperationalError(DatabaseError):
 
 class ProgrammingError(DatabaseError):
     pass
+
+
+class TransportError(OperationalError):
+    """Raised when a request could not reach Rockset or its response was
+    lost, e.g. because the connection was refused or reset.
+
+    Unlike errors that Rockset answered with (throttling, failed, cancelled or
+    timed out queries), these mean that the connection should be replaced.
+    """
+
+
+class DocumentsError(DataError):
+    """Raised when Rockset rejects some of the documents in a write.
+
+    `failures` lists an `(index, _id, message)` tuple for every rejected
+    document, where `index` is the document's position in the input.
+    """
+
+    def __init__(self, message, failures):
+        super().__init__(message, None, "DOCUMENTS")
+        self.failures = failures
@@ -0,0 +1,236 @@
+"""Timings and statistics of queries.
+
+A connection with an `Instrumentation` records a `QueryEvent` for each query:
+the client time spent in each phase of the query, the server's statistics
+and the size of the result. Events are recorded once the query's result has
+been consumed, the cursor is closed or re-executed, or the query fails. They
+update a `MetricsRegistry`, are logged if the query was slow, and are passed
+to listeners.
+
+Phases are timed with `time.perf_counter`:
+
+- ``bind``: serializing the parameters.
+- ``queue``: waiting for the connection's concurrency limiter.
+- ``http``: sending the request and receiving the response (and, without a
+  `json_decoder`, deserializing it into rockset models).
+- ``decode``: decoding the response with the connection's `json_decoder`.
+- ``backoff``: waiting to retry throttled requests.
+- ``wait``: waiting for an asynchronous query to finish.
+- ``build``: building rows from the result documents.
+"""
+
+from bisect import bisect_left
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+# Slow queries are logged (at WARNING) to their own logger, so they can be
+# routed separately.
+slow_query_logger = logging.getLogger("rockset_sqlalchemy.slow_query")
+
+# Upper bounds, in seconds, of the buckets of the default histograms.
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class QueryEvent(object):
+    """Timings and statistics of one query."""
+
+    __slots__ = (
+        "sql",
+        "parameters",
+        "query_id",
+        "phases",
+        "server_stats",
+        "rows",
+        "response_bytes",
+        "cached",
+        "retries",
+        "throttled",
+        "error",
+    )
+
+    def __init__(self, sql, parameters):
+        self.sql = sql
+        self.parameters = parameters
+        self.query_id = None
+        # Seconds spent in each phase; see the module documentation.
+        self.phases = {}
+        # The `stats` of the query response, e.g. `elapsed_time_ms` and
+        # `throttled_time_micros`.
+        self.server_stats = None
+        # Rows fetched from the cursor.
+        self.rows = 0
+        # Size of the response bodies; only known with a `json_decoder`.
+        self.response_bytes = None
+        # Whether the result was served from the result cache.
+        self.cached = False
+        # Requests retried, and requests throttled by Rockset.
+        self.retries = 0
+        self.throttled = 0
+        # The exception the query failed with, if any.
+        self.error = None
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_bytes(self, size):
+        self.response_bytes = (self.response_bytes or 0) + size
+
+    @property
+    def elapsed(self):
+        """Client time spent on the query, in seconds."""
+        return sum(self.phases.values())
+
+
+class Histogram(object):
+    """Count, sum, maximum and bucketed distribution of observed values."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        """Return the histogram as a dict; `buckets` are cumulative counts
+        keyed by upper bound, like Prometheus histograms."""
+        buckets, total = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            buckets[bound] = total
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry(object):
+    """Thread-safe, in-process counters and histograms."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            self._observe(name, value)
+
+    def _observe(self, name, value):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def record_query(self, event):
+        # Updates all metrics of a query under one lock acquisition.
+        with self._lock:
+            counters = self._counters
+            counters["queries"] = counters.get("queries", 0) + 1
+            counters["rows"] = counters.get("rows", 0) + event.rows
+            if event.error is not None:
+                counters["errors"] = counters.get("errors", 0) + 1
+            if event.cached:
+                counters["cache_hits"] = counters.get("cache_hits", 0) + 1
+            if event.retries:
+                counters["retries"] = counters.get("retries", 0) + event.retries
+            if event.throttled:
+                counters["throttled"] = counters.get("throttled", 0) + event.throttled
+            self._observe("query_seconds", event.elapsed)
+            for phase, seconds in event.phases.items():
+                self._observe(phase + "_seconds", seconds)
+            stats = event.server_stats or {}
+            if stats.get("elapsed_time_ms") is not None:
+                self._observe("server_elapsed_seconds", stats["elapsed_time_ms"] / 1e3)
+            if stats.get("throttled_time_micros") is not None:
+                self._observe(
+                    "server_throttled_seconds", stats["throttled_time_micros"] / 1e6
+                )
+
+    def snapshot(self):
+        """Return `{"counters": {...}, "histograms": {name: {...}}}`."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {
+                    name: histogram.snapshot()
+                    for name, histogram in self._histograms.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class Instrumentation(object):
+    """Records the `QueryEvent`s of the connections it is passed to.
+
+    Events update `metrics`, are logged to the ``rockset_sqlalchemy.slow_query``
+    logger if the client spent at least `slow_query_threshold` seconds on the
+    query, and are passed to each listener. Listeners are called on the
+    thread that ran the query; exceptions they raise are logged.
+    """
+
+    def __init__(self, slow_query_threshold=None, listeners=(), metrics=None):
+        self.slow_query_threshold = slow_query_threshold
+        self.listeners = list(listeners)
+        self.metrics = MetricsRegistry() if metrics is None else metrics
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def record(self, event):
+        self.metrics.record_query(event)
+        threshold = self.slow_query_threshold
+        if threshold is not None and event.elapsed >= threshold:
+            slow_query_logger.warning(
+                "Slow query %s took %.3fs (%s): %s",
+                event.query_id,
+                event.elapsed,
+                ", ".join(
+                    "{} {:.3f}s".format(phase, seconds)
+                    for phase, seconds in event.phases.items()
+                ),
+                event.sql,
+            )
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Query instrumentation listener failed")
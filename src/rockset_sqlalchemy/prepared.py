@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+import rockset
+
+from .cache import ResultCache
+
+# Query lambdas for prepared statements are named after this prefix and a
+# hash of their SQL text.
+LAMBDA_PREFIX = "sqlalchemy_"
+
+
+class PreparedStatement(object):
+    """A query lambda that runs one SQL statement."""
+
+    __slots__ = ("key", "workspace", "name", "version", "client")
+
+    def __init__(self, key, workspace, name, version, client):
+        self.key = key
+        self.workspace = workspace
+        self.name = name
+        self.version = version
+        # The client that created the lambda, or None if it already existed
+        # (e.g. it was created by another process). Only lambdas created by
+        # this cache are deleted when they are evicted.
+        self.client = client
+
+
+class PreparedStatements(object):
+    """Thread-safe LRU of statements stored as query lambdas.
+
+    Once a read-only statement has been executed `threshold` times it is
+    stored as a query lambda in `workspace`, named after a hash of its SQL
+    text, and later executions send only the lambda's name, version and
+    parameters. Rockset keeps the parsed statement with the lambda.
+
+    At most `max_entries` lambdas are kept; the least recently used ones are
+    deleted from Rockset when more are needed. `clear()` deletes all lambdas
+    this cache created.
+    """
+
+    def __init__(self, workspace="commons", threshold=5, max_entries=100):
+        self.workspace = workspace
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.prepared = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Executions of statements that are not prepared yet, by hash. A
+        # count of None marks a statement that could not be prepared.
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_preparable(sql):
+        return ResultCache.is_cacheable(sql)
+
+    @staticmethod
+    def make_key(sql):
+        return hashlib.sha256(sql.encode()).hexdigest()[:32]
+
+    def get(self, client, sql):
+        """Return the PreparedStatement for `sql`, or None to run it as text.
+
+        Counts an execution of `sql` and creates its query lambda once the
+        statement has been executed `threshold` times.
+        """
+        key = PreparedStatements.make_key(sql)
+        with self._lock:
+            statement = self._entries.get(key)
+            if statement is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return statement
+            count = self._counts.pop(key, 0)
+            if count is not None:
+                count += 1
+            self._counts[key] = count
+            while len(self._counts) > 10 * self.max_entries:
+                self._counts.popitem(last=False)
+            if count is None or count < self.threshold:
+                return None
+
+        try:
+            statement = self._create(client, key, sql)
+        except (rockset.exceptions.RocksetException, ValueError):
+            self.discard(key, permanent=True)
+            return None
+
+        evicted = []
+        with self._lock:
+            self._counts.pop(key, None)
+            self._entries[key] = statement
+            self.prepared += 1
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+                self.evictions += 1
+        for old in evicted:
+            PreparedStatements._delete(old)
+        return statement
+
+    def _create(self, client, key, sql):
+        name = LAMBDA_PREFIX + key
+        try:
+            response = client.QueryLambdas.create_query_lambda(
+                workspace=self.workspace,
+                name=name,
+                sql=rockset.models.QueryLambdaSql(query=sql),
+                description="Prepared statement created by rockset-sqlalchemy",
+            )
+            return PreparedStatement(
+                key, self.workspace, name, response.data.version, client
+            )
+        except rockset.exceptions.ApiException as e:
+            if e.status != 409:
+                raise
+        # The lambda already exists; the name is a hash of the SQL text, so
+        # its latest version runs the same statement.
+        response = client.QueryLambdas.get_query_lambda_tag_version(
+            workspace=self.workspace, query_lambda=name, tag="latest"
+        )
+        return PreparedStatement(
+            key, self.workspace, name, response.data.version.version, None
+        )
+
+    def discard(self, key, permanent=False):
+        """Forget a statement, e.g. after its query lambda failed to run.
+
+        With `permanent`, the statement is run as text from now on.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            if permanent:
+                self._counts[key] = None
+            else:
+                self._counts.pop(key, None)
+
+    @staticmethod
+    def _delete(statement):
+        if statement.client is None:
+            return
+        try:
+            statement.client.QueryLambdas.delete_query_lambda(
+                workspace=statement.workspace, query_lambda=statement.name
+            )
+        except rockset.exceptions.RocksetException:
+            # Best effort: a lambda that cannot be deleted is only left over.
+            pass
+
+    def clear(self):
+        """Forget all statements and delete the query lambdas created for them."""
+        with self._lock:
+            statements = list(self._entries.values())
+            self._entries.clear()
+            self._counts.clear()
+        for statement in statements:
+            PreparedStatements._delete(statement)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "prepared": self.prepared,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,149 @@
+import itertools
+import threading
+import time
+
+from .exceptions import ProgrammingError, TransportError
+
+POLICIES = ("round_robin", "least_outstanding", "failover")
+
+
+def is_unavailable(error):
+    """Whether an `Error` means the virtual instance could not serve the
+    request (it was throttled, failed or could not be reached), rather than
+    that the request was wrong."""
+    status = error.args[1] if len(error.args) > 1 else None
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, TransportError)
+
+
+class _VirtualInstance(object):
+    __slots__ = ("id", "outstanding", "requests", "failures", "unhealthy_until")
+
+    def __init__(self, vi_id):
+        self.id = vi_id
+        self.outstanding = 0
+        self.requests = 0
+        # Consecutive failed requests.
+        self.failures = 0
+        self.unhealthy_until = None
+
+
+class VirtualInstanceRouter(object):
+    """Routes queries across several virtual instances.
+
+    `virtual_instances` maps names to virtual instance IDs (a list of IDs
+    names each one by its ID; None is the organization's default virtual
+    instance). Queries pinned to a name run on that virtual instance. Others
+    are spread according to `policy`:
+
+    - ``round_robin``: each virtual instance in turn.
+    - ``least_outstanding``: the one with the fewest requests in flight.
+    - ``failover``: the first one, in the given order, that is healthy.
+
+    A virtual instance that fails `failure_threshold` requests in a row (see
+    `is_unavailable`) is unhealthy for `cooldown` seconds, and is only used
+    when no virtual instance is healthy. A router is thread-safe and usually
+    shared by all connections of an engine.
+    """
+
+    def __init__(
+        self,
+        virtual_instances,
+        policy="round_robin",
+        failure_threshold=3,
+        cooldown=30.0,
+    ):
+        if policy not in POLICIES:
+            raise ProgrammingError(
+                "Unknown routing policy {!r}, expected one of {}".format(
+                    policy, ", ".join(POLICIES)
+                )
+            )
+        if not isinstance(virtual_instances, dict):
+            virtual_instances = {vi: vi for vi in virtual_instances}
+        if not virtual_instances:
+            raise ProgrammingError("No virtual instances to route queries to")
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._names = dict(virtual_instances)
+        self._instances = {}
+        for vi_id in self._names.values():
+            self._instances.setdefault(vi_id, _VirtualInstance(vi_id))
+        self._order = list(self._instances.values())
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """Return the ID of the virtual instance with this name (or ID)."""
+        if name in self._names:
+            return self._names[name]
+        if name in self._instances:
+            return name
+        raise ProgrammingError("Unknown virtual instance {!r}".format(name))
+
+    def candidates(self, name=None):
+        """Return the IDs of the virtual instances to try, in order.
+
+        A query pinned to `name` only runs on that virtual instance.
+        Otherwise, the virtual instance chosen by the policy comes first and
+        the others follow, healthy ones first, for failing over.
+        """
+        if name is not None:
+            return [self.resolve(name)]
+        with self._lock:
+            now = time.monotonic()
+            instances = self._order
+            if self.policy == "round_robin":
+                start = next(self._next) % len(instances)
+                instances = instances[start:] + instances[:start]
+            elif self.policy == "least_outstanding":
+                # Ties go round robin, so idle instances share the load.
+                start = next(self._next) % len(instances)
+                instances = sorted(
+                    instances[start:] + instances[:start],
+                    key=lambda instance: instance.outstanding,
+                )
+            healthy = [i for i in instances if not self._is_unhealthy(i, now)]
+            unhealthy = [i for i in instances if self._is_unhealthy(i, now)]
+            return [instance.id for instance in healthy + unhealthy]
+
+    @staticmethod
+    def _is_unhealthy(instance, now):
+        return instance.unhealthy_until is not None and instance.unhealthy_until > now
+
+    def start(self, vi_id):
+        """Record a request sent to a virtual instance."""
+        with self._lock:
+            instance = self._instances[vi_id]
+            instance.outstanding += 1
+            instance.requests += 1
+
+    def finish(self, vi_id, failed=False):
+        """Record the end of a request; `failed` if the virtual instance
+        could not serve it."""
+        with self._lock:
+            instance = self._instances[vi_id]
+            instance.outstanding -= 1
+            if not failed:
+                instance.failures = 0
+                instance.unhealthy_until = None
+                return
+            instance.failures += 1
+            if instance.failures >= self.failure_threshold:
+                instance.unhealthy_until = time.monotonic() + self.cooldown
+
+    def stats(self):
+        """Return the state of each virtual instance, keyed by ID."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                instance.id: {
+                    "outstanding": instance.outstanding,
+                    "requests": instance.requests,
+                    "failures": instance.failures,
+                    "healthy": not self._is_unhealthy(instance, now),
+                }
+                for instance in self._order
+            }
@@ -1,3 +1,4 @@
+from .aio import AsyncAdaptedRocksetDialect
 from .dialect import RocksetDialect
 
-__all__ = ["RocksetDialect"]
+__all__ = ["RocksetDialect", "AsyncAdaptedRocksetDialect"]
@@ -0,0 +1,287 @@
+from collections import deque
+import inspect
+
+from sqlalchemy import exc, pool, util
+from sqlalchemy.engine import AdaptedConnection, reflection
+
+try:
+    from sqlalchemy.util.concurrency import await_
+except ImportError:
+    # SQLAlchemy < 2.1
+    from sqlalchemy.util.concurrency import await_only as await_
+
+from ..cursor import BaseCursor
+from ..exceptions import NotSupportedError
+from .dialect import RocksetDialect
+
+
+class AsyncAdapt_rockset_cursor(object):
+    """Synchronous DB-API facade over :class:`rockset_sqlalchemy.aio.AsyncCursor`.
+
+    Results are buffered when the statement is executed; server side cursors
+    fetch each page on demand instead.
+    """
+
+    server_side = False
+
+    def __init__(self, adapt_connection):
+        self._adapt_connection = adapt_connection
+        self._connection = adapt_connection._connection
+        self._cursor = self._connection.cursor(stream_results=self.server_side)
+        self._rows = deque()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def arraysize(self):
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value):
+        self._cursor.arraysize = value
+
+    def execute(self, operation, parameters=None):
+        await_(self._cursor.execute(operation, parameters))
+        if not self.server_side:
+            self._rows = deque(await_(self._cursor.fetchall()))
+
+    def execute_lambda(
+        self, name, parameters=None, version=None, tag=None, workspace="commons"
+    ):
+        await_(
+            self._cursor.execute_lambda(
+                name, parameters, version=version, tag=tag, workspace=workspace
+            )
+        )
+        if not self.server_side:
+            self._rows = deque(await_(self._cursor.fetchall()))
+
+    def callproc(self, procname, parameters=None):
+        parameters = await_(self._cursor.callproc(procname, parameters))
+        if not self.server_side:
+            self._rows = deque(await_(self._cursor.fetchall()))
+        return parameters
+
+    def executemany(self, operation, seq_of_parameters):
+        await_(self._cursor.executemany(operation, seq_of_parameters))
+
+    def setinputsizes(self, *inputsizes):
+        pass
+
+    async def _async_soft_close(self):
+        # Called by SQLAlchemy's asyncio extension once a buffered result has
+        # been executed. Rows are already buffered, so there is nothing to do.
+        pass
+
+    def close(self):
+        # SQLAlchemy may close cursors outside of a greenlet. Closing an
+        # AsyncCursor does no I/O, so call the synchronous implementation.
+        self._rows.clear()
+        BaseCursor.close(self._cursor)
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.popleft()
+
+    def fetchone(self):
+        if self._rows:
+            return self._rows.popleft()
+        return None
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return [self._rows.popleft() for _ in range(min(size, len(self._rows)))]
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+
+class AsyncAdapt_rockset_ss_cursor(AsyncAdapt_rockset_cursor):
+    server_side = True
+
+    def __init__(self, adapt_connection, page_size=None):
+        super().__init__(adapt_connection)
+        if page_size:
+            self._cursor.page_size = page_size
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def fetchone(self):
+        return await_(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        return await_(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return await_(self._cursor.fetchall())
+
+
+class AsyncAdapt_rockset_connection(AdaptedConnection):
+    def __init__(self, dbapi, connection):
+        self.dbapi = dbapi
+        self._connection = connection
+
+    @property
+    def api_server(self):
+        return self._connection.api_server
+
+    def cursor(self, server_side=False, page_size=None):
+        if server_side:
+            return AsyncAdapt_rockset_ss_cursor(self, page_size=page_size)
+        return AsyncAdapt_rockset_cursor(self)
+
+    def ping(self):
+        await_(self._connection.ping())
+
+    def rollback(self):
+        # Transactions are not supported in Rockset.
+        pass
+
+    def commit(self):
+        # Transactions are not supported in Rockset.
+        pass
+
+    def close(self):
+        await_(self._connection.close())
+
+
+class AsyncAdapt_rockset_dbapi(object):
+    def __init__(self, aio):
+        self.aio = aio
+        self.paramstyle = aio.paramstyle
+        self.apilevel = aio.apilevel
+        self.threadsafety = aio.threadsafety
+
+        from rockset_sqlalchemy import exceptions
+
+        for name in (
+            "Error",
+            "InterfaceError",
+            "DatabaseError",
+            "DataError",
+            "IntegrityError",
+            "InternalError",
+            "NotSupportedError",
+            "OperationalError",
+            "ProgrammingError",
+        ):
+            setattr(self, name, getattr(exceptions, name))
+
+    def connect(self, *args, **kwargs):
+        return AsyncAdapt_rockset_connection(
+            self, await_(self.aio.connect(*args, **kwargs))
+        )
+
+
+class AsyncAdaptedRocksetExecutionContext(RocksetDialect.execution_ctx_cls):
+    def create_server_side_cursor(self):
+        return self._dbapi_connection.cursor(
+            server_side=True,
+            page_size=self.execution_options.get("max_row_buffer"),
+        )
+
+
+class AsyncAdaptedRocksetDialect(RocksetDialect):
+    """Rockset dialect for ``create_async_engine("rockset+async://...")``."""
+
+    driver = "async"
+    is_async = True
+    supports_statement_cache = True
+
+    execution_ctx_cls = AsyncAdaptedRocksetExecutionContext
+
+    # Prefetching, the shared urllib3 pool, result caching, prepared
+    # statements, bulk inserts, instrumentation, routing and the other
+    # features of the synchronous driver are not available.
+    result_cache_query_args = {}
+    prepared_statements_query_args = {}
+    router_query_args = {}
+    instrumentation_query_args = {}
+
+    @util.memoized_property
+    def _connection_parameters(self):
+        # The arguments AsyncConnection accepts. aiohttp is only imported once
+        # a rockset+async engine is created.
+        from rockset_sqlalchemy.aio import AsyncConnection
+
+        return frozenset(inspect.signature(AsyncConnection).parameters)
+
+    @util.memoized_property
+    def connect_query_args(self):
+        return {
+            name: parse
+            for name, parse in RocksetDialect.connect_query_args.items()
+            if name in self._connection_parameters
+        }
+
+    def create_connect_args(self, url):
+        # Drop the objects built for the synchronous driver from URL options
+        # (e.g. PreparedStatements for `prepared_statements=true`).
+        args, kwargs = super().create_connect_args(url)
+        return args, {
+            name: value
+            for name, value in kwargs.items()
+            if name in self._connection_parameters
+        }
+
+    @classmethod
+    def dbapi(cls):
+        """Retained for backward compatibility with SQLAlchemy 1.x."""
+        from rockset_sqlalchemy import aio
+
+        return AsyncAdapt_rockset_dbapi(aio)
+
+    @classmethod
+    def import_dbapi(cls):
+        return AsyncAdaptedRocksetDialect.dbapi()
+
+    @classmethod
+    def get_pool_class(cls, url):
+        return pool.AsyncAdaptedQueuePool
+
+    def get_driver_connection(self, connection):
+        return connection._connection
+
+    @reflection.cache
+    def get_columns(self, connection, table_name, schema=None, **kw):
+        # Views are only found through the REST listings, so only the columns
+        # of collections can be reflected.
+        return self._get_table_columns(
+            connection, table_name, schema or RocksetDialect.default_schema_name
+        )
+
+    def has_table(self, connection, table_name, schema=None, **kw):
+        try:
+            self.get_columns(connection, table_name, schema, **kw)
+            return True
+        except exc.NoSuchTableError:
+            return False
+
+    def _get_table_columns(self, connection, table_name, schema):
+        # The metadata cache tells re-created collections apart by the
+        # creation time from the collection listing, which needs the REST
+        # client; describe the collection every time instead.
+        return self._describe_table(connection, table_name, schema)
+
+    def _rest_client(self, connection):
+        # Reflection that only needs queries (e.g. the columns of a table)
+        # works; the REST listings are only implemented by the synchronous
+        # client.
+        raise NotSupportedError(
+            "Listing workspaces, collections, views and query lambdas is not "
+            "supported by rockset+async; use a rockset:// engine"
+        )
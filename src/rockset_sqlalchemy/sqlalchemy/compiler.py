@@ -1,10 +1,21 @@
 import sqlalchemy as sa
 from sqlalchemy import func
-from sqlalchemy.sql import compiler
+from sqlalchemy.sql import compiler, elements, sqltypes
 from sqlalchemy.sql.operators import custom_op, json_getitem_op, json_path_getitem_op
 
 from .types import Array
 
+# Element types of IN lists that are sent as one array parameter. Their values
+# are JSON scalars that compare equal to the column's values; other types
+# (e.g. dates, or types with their own bind processing) are expanded into one
+# parameter per value.
+_ARRAY_ELEMENT_TYPES = (
+    sqltypes.Integer,
+    sqltypes.Float,
+    sqltypes.String,
+    sqltypes.Boolean,
+)
+
 
 class RocksetCompiler(compiler.SQLCompiler):
     def visit_cast(self, cast, **kw):
@@ -23,6 +34,52 @@ class RocksetCompiler(compiler.SQLCompiler):
             return self._element_at(b)
         return super().visit_binary(b, **kw)
 
+    def visit_in_op_binary(self, binary, operator, **kw):
+        array = self._in_array(binary, **kw)
+        if array is None:
+            # SQLCompiler only defines visit_in_op_binary in some versions;
+            # otherwise it renders IN as a generic binary.
+            in_op_binary = getattr(super(), "visit_in_op_binary", None)
+            if in_op_binary is not None:
+                return in_op_binary(binary, operator, **kw)
+            return self._generate_generic_binary(
+                binary, compiler.OPERATORS[operator], **kw
+            )
+        return "ARRAY_CONTAINS({}, {})".format(array, self.process(binary.left, **kw))
+
+    def visit_not_in_op_binary(self, binary, operator, **kw):
+        array = self._in_array(binary, **kw)
+        if array is None:
+            return super().visit_not_in_op_binary(binary, operator, **kw)
+        return "NOT ARRAY_CONTAINS({}, {})".format(
+            array, self.process(binary.left, **kw)
+        )
+
+    def _in_array(self, binary, **kw):
+        # Renders the expanding parameter of `x IN :values` as one array
+        # parameter, or returns None if its values are expanded.
+        right = binary.right
+        if isinstance(right, elements.Grouping):
+            right = right.element
+        if (
+            not isinstance(right, elements.BindParameter)
+            or not right.expanding
+            or kw.get("literal_binds")
+            or isinstance(right.type, (sqltypes.Enum, sqltypes.TypeDecorator))
+            or not issubclass(right.type._type_affinity, _ARRAY_ELEMENT_TYPES)
+        ):
+            return None
+        return self.process(RocksetCompiler._array_parameter(right), **kw)
+
+    @staticmethod
+    def _array_parameter(bind):
+        # A copy of `bind` whose list value is bound as one Rockset array
+        # parameter, bypassing the bind processing of its element type.
+        array = bind._clone()
+        array.expanding = False
+        array.type = Array()
+        return array
+
     def _handle_custom_op(self, b):
         if b.operator.opstring == "->":
             return self._element_at(b)
@@ -36,11 +93,9 @@ class RocksetCompiler(compiler.SQLCompiler):
 
     def _element_at(self, b):
         right = b.right
-        if isinstance(b.right.value, list):
-            # This is a tad hacky, but is required because Rockset does not support list parameters.
-            # Because of this limitation, we pass in list parameters as JSON strings in cursor.py,
-            # and parse the strings back to lists in SQL.
-            right = func.JSON_PARSE(b.right)
+        if isinstance(right, elements.BindParameter) and isinstance(right.value, list):
+            # A path of keys and indexes, bound as an array parameter.
+            right = RocksetCompiler._array_parameter(right)
 
         # Wrap every ELEMENT_AT with a TRY. This is important especially when accessing a nested
         # field in a JSON, because some level of a JSON can be a non-object, which would then lead
@@ -1,10 +1,68 @@
-from sqlalchemy import exc, types, util
+from concurrent import futures
+
+import rockset
+from sqlalchemy import exc, sql, types, util
 from sqlalchemy.engine import default, reflection
 from sqlalchemy.sql import compiler
 
+from ..cache import ResultCache
+from ..cursor import Cursor
+from ..exceptions import OperationalError, ProgrammingError
+from ..instrumentation import Instrumentation
+from ..prepared import PreparedStatements
+from ..routing import VirtualInstanceRouter
 from .compiler import RocksetCompiler
+from .metadata_cache import MetadataCache
 from .types import type_map
 
+# Types that can be widened to a single type that holds all their values.
+_WIDENED_TYPES = {
+    frozenset(["int", "float"]): "float",
+    frozenset(["date", "datetime"]): "datetime",
+}
+
+
+def _merge_field_types(counts):
+    """Pick one Rockset type for a field from `{type: occurrences}`."""
+    field_types = {t: n for t, n in counts.items() if t not in ("null", "undefined")}
+    if not field_types:
+        return "null"
+    if len(field_types) == 1:
+        return next(iter(field_types))
+    widened = _WIDENED_TYPES.get(frozenset(field_types))
+    if widened is not None:
+        return widened
+    # Mixed types; use the most common one.
+    return max(field_types, key=field_types.get)
+
+
+def _json_type(value):
+    """Return the Rockset type of a value decoded from a JSON result."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+def _parse_virtual_instances(value):
+    # "dashboards:id1,batch:id2" -> {"dashboards": "id1", "batch": "id2"}
+    virtual_instances = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if entry:
+            name, _, vi = entry.rpartition(":")
+            virtual_instances[name or vi] = vi
+    return virtual_instances
+
 
 class EverythingSet(object):
     def __contains__(self, _):
@@ -16,6 +74,34 @@ class RocksetIdentifierPreparer(compiler.IdentifierPreparer):
     reserved_words = EverythingSet()
 
 
+class RocksetExecutionContext(default.DefaultExecutionContext):
+    def pre_exec(self):
+        # Per-statement override of the connection's `cache_all_queries`.
+        use_result_cache = self.execution_options.get("rockset_result_cache")
+        if use_result_cache is not None:
+            self.cursor.use_result_cache = use_result_cache
+        # Per-statement opt-out of running the statement as a query lambda.
+        use_prepared_statements = self.execution_options.get("rockset_prepare")
+        if use_prepared_statements is not None:
+            self.cursor.use_prepared_statements = use_prepared_statements
+        # Run the statement asynchronously, polling for its results.
+        async_query = self.execution_options.get("rockset_async")
+        if async_query is not None:
+            self.cursor.async_query = async_query
+        # Run the statement on the named virtual instance of the router.
+        virtual_instance = self.execution_options.get("rockset_vi")
+        if virtual_instance is not None:
+            self.cursor.virtual_instance = virtual_instance
+
+    def create_server_side_cursor(self):
+        # `yield_per` sets `max_row_buffer`; use it as the page size so each
+        # request to Rockset fetches one buffer's worth of rows.
+        return self._dbapi_connection.cursor(
+            stream_results=True,
+            page_size=self.execution_options.get("max_row_buffer"),
+        )
+
+
 class RocksetDialect(default.DefaultDialect):
     name = "rockset"
     driver = "rockset"
@@ -23,6 +109,7 @@ class RocksetDialect(default.DefaultDialect):
     positional = False
     paramstyle = "named"
 
+    execution_ctx_cls = RocksetExecutionContext
     statement_compiler = RocksetCompiler
     type_compiler = compiler.GenericTypeCompiler
     preparer = RocksetIdentifierPreparer
@@ -33,14 +120,123 @@ class RocksetDialect(default.DefaultDialect):
     supports_unicode_binds = True
     supports_sane_rowcount = False
     supports_sane_multi_rowcount = False
+    # Rockset only inserts through INSERT INTO ... SELECT, so executemany()
+    # runs one statement per parameter set (concurrently, see
+    # Cursor.executemany) rather than rendering a multi-row VALUES clause.
+    supports_multivalues_insert = False
+    use_insertmanyvalues = False
     preexecute_autoincrement_sequences = False
     supports_statement_cache = True
+    supports_server_side_cursors = True
 
     supports_default_values = False
     supports_sequences = False
     supports_native_enum = False
     supports_native_boolean = True
 
+    # Connection options that may be passed as URL query parameters, e.g.
+    # rockset://apikey@api.usw2a1.rockset.com/vi?stream_results=true, mapped to
+    # the function used to parse each value.
+    connect_query_args = {
+        "debug_sql": util.asbool,
+        "stream_results": util.asbool,
+        "page_size": int,
+        "prefetch_pages": int,
+        "prefetch_max_rows": int,
+        "validate_on_connect": util.asbool,
+        "pool_maxsize": int,
+        "pool_keepalive": util.asbool,
+        "http_retries": int,
+        "cache_all_queries": util.asbool,
+        "executemany_workers": int,
+        "bulk_batch_size": int,
+        "bulk_workers": int,
+        "bulk_wait_for_visibility": util.asbool,
+        "json_decoder": str,
+        "convert_types": util.asbool,
+        "async_queries": util.asbool,
+        "max_retries": int,
+        "retry_backoff": float,
+        "retry_max_backoff": float,
+        "adaptive_concurrency": util.asbool,
+        "concurrency_limit": int,
+        "max_concurrency": int,
+    }
+
+    # URL query parameters that configure a ResultCache shared by all
+    # connections of the engine, mapped to ResultCache arguments.
+    result_cache_query_args = {
+        "result_cache_ttl": ("ttl", float),
+        "result_cache_max_entries": ("max_entries", int),
+        "result_cache_max_bytes": ("max_bytes", int),
+    }
+
+    # URL query parameters that configure PreparedStatements shared by all
+    # connections of the engine, mapped to PreparedStatements arguments.
+    # `prepared_statements=true` enables them with the default settings.
+    prepared_statements_query_args = {
+        "prepared_statements": ("enabled", util.asbool),
+        "prepared_statements_workspace": ("workspace", str),
+        "prepared_statements_threshold": ("threshold", int),
+        "prepared_statements_max_entries": ("max_entries", int),
+    }
+
+    # URL query parameters that configure a VirtualInstanceRouter shared by
+    # all connections of the engine, mapped to VirtualInstanceRouter
+    # arguments. The router is created by the `virtual_instances` parameter,
+    # a comma-separated list of `name:id` (or bare IDs).
+    router_query_args = {
+        "virtual_instances": ("virtual_instances", _parse_virtual_instances),
+        "routing_policy": ("policy", str),
+        "routing_failure_threshold": ("failure_threshold", int),
+        "routing_cooldown": ("cooldown", float),
+    }
+
+    # URL query parameters that set dialect options, mapped to the function
+    # used to parse each value.
+    dialect_query_args = {
+        "reflection_workers": int,
+        "reflection_timeout": float,
+    }
+
+    # URL query parameters that configure the dialect's MetadataCache, mapped
+    # to MetadataCache arguments. `metadata_cache` is the path of its file.
+    metadata_cache_query_args = {
+        "metadata_cache": ("path", str),
+        "metadata_cache_ttl": ("ttl", float),
+    }
+
+    # URL query parameters that set attributes of the engine's
+    # Instrumentation, which they create if needed.
+    instrumentation_query_args = {
+        "slow_query_threshold": ("slow_query_threshold", float),
+    }
+
+    def __init__(
+        self,
+        bulk_insert=True,
+        metadata_cache=None,
+        reflection_workers=8,
+        reflection_timeout=None,
+        instrumentation=None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        # Send INSERT ... VALUES statements through the Documents API.
+        self.bulk_insert = bulk_insert
+        # An optional MetadataCache (or the path of its file) that keeps
+        # reflected collections and columns on disk across processes.
+        if isinstance(metadata_cache, str):
+            metadata_cache = MetadataCache(metadata_cache)
+        self.metadata_cache = metadata_cache
+        # An optional Instrumentation shared by all connections of the
+        # engine; the `slow_query_threshold` URL query parameter creates one.
+        self.instrumentation = instrumentation
+        # get_multi_columns() describes up to `reflection_workers` collections
+        # at once, waiting at most `reflection_timeout` seconds for each.
+        self.reflection_workers = reflection_workers
+        self.reflection_timeout = reflection_timeout
+
     @classmethod
     def dbapi(cls):
         """Retained for backward compatibility with SQLAlchemy 1.x."""
@@ -57,74 +253,400 @@ class RocksetDialect(default.DefaultDialect):
             "api_server": "https://{}".format(url.host),
             "api_key": url.password or url.username,
             "virtual_instance": url.database,
+            # Parse dates and times of typed columns in batches in the cursor;
+            # the result processors then pass the converted values through.
+            "convert_types": True,
         }
+        options = self._query_options(url.query)
+        kwargs.update(options["connect"])
+        for name, value in options["dialect"].items():
+            setattr(self, name, value)
+        if "path" in options["metadata_cache"]:
+            self.metadata_cache = MetadataCache(**options["metadata_cache"])
+        if options["instrumentation"]:
+            if self.instrumentation is None:
+                self.instrumentation = Instrumentation()
+            for name, value in options["instrumentation"].items():
+                setattr(self.instrumentation, name, value)
+        kwargs.update(self._shared_connect_args(options))
         return ([], kwargs)
 
+    def _query_options(self, query):
+        """Parse URL query parameters into `{group: {argument: value}}`, with
+        a group for each of the `*_query_args` tables above. Unknown
+        parameters are ignored."""
+        tables = {
+            "connect": {
+                name: (name, parse) for name, parse in self.connect_query_args.items()
+            },
+            "dialect": {
+                name: (name, parse) for name, parse in self.dialect_query_args.items()
+            },
+            "result_cache": self.result_cache_query_args,
+            "prepared_statements": self.prepared_statements_query_args,
+            "router": self.router_query_args,
+            "metadata_cache": self.metadata_cache_query_args,
+            "instrumentation": self.instrumentation_query_args,
+        }
+        options = {group: {} for group in tables}
+        for name, value in query.items():
+            for group, query_args in tables.items():
+                if name in query_args:
+                    arg, parse = query_args[name]
+                    options[group][arg] = parse(value)
+        return options
+
+    def _shared_connect_args(self, options):
+        # Objects shared by all connections of the engine.
+        kwargs = {}
+        if options["result_cache"]:
+            kwargs["result_cache"] = ResultCache(**options["result_cache"])
+        prepared_args = dict(options["prepared_statements"])
+        enabled = prepared_args.pop("enabled", None)
+        if enabled or (enabled is None and prepared_args):
+            kwargs["prepared_statements"] = PreparedStatements(**prepared_args)
+        if options["router"].get("virtual_instances"):
+            kwargs["router"] = VirtualInstanceRouter(**options["router"])
+        if self.instrumentation is not None:
+            kwargs["instrumentation"] = self.instrumentation
+        return kwargs
+
+    def _get_default_schema_name(self, connection):
+        # Keeps `default_schema_name` set once the dialect is initialized.
+        return RocksetDialect.default_schema_name
+
+    @staticmethod
+    def _dbapi_connection(connection):
+        # `connection.connection` is the pooled DB-API connection; it proxies
+        # attribute access (e.g. `_client`) to the underlying Connection.
+        return connection.connection
+
+    def _rest_client(self, connection):
+        # The RocksetClient of the connection, for requests sent outside of a
+        # cursor (listing workspaces, collections, views and query lambdas).
+        return self._dbapi_connection(connection)._client
+
     @reflection.cache
     def get_schema_names(self, connection, **kw):
         return [
-            w["name"]
-            for w in connection.connect().connection._client.Workspaces.list()["data"]
+            w["name"] for w in self._rest_client(connection).Workspaces.list()["data"]
         ]
 
     @reflection.cache
     def get_table_names(self, connection, schema=None, **kw):
-        tables = (
-            connection.connect().connection._client.Collections.list()
-            if schema is None
-            else connection.connect().connection._client.Collections.workspace_collections(
-                workspace=schema
-            )
-        )["data"]
+        client = self._rest_client(connection)
+        if schema is None:
+            return [w["name"] for w in client.Collections.list()["data"]]
+        return list(self._get_collections(connection, schema))
 
-        return [w["name"] for w in tables]
+    def _get_collections(self, connection, schema):
+        """Return `{collection: creation time}` for a workspace."""
+        dbapi_connection = self._dbapi_connection(connection)
+        cache = self.metadata_cache
+        if cache is not None:
+            collections = cache.get_collections(dbapi_connection.api_server, schema)
+            if collections is not None:
+                return collections
+
+        tables = self._rest_client(connection).Collections.workspace_collections(
+            workspace=schema
+        )["data"]
+        collections = {w["name"]: w["created_at"] for w in tables}
+        if cache is not None:
+            cache.set_collections(dbapi_connection.api_server, schema, collections)
+        return collections
 
     def _get_table_columns(self, connection, table_name, schema):
-        schema = self.identifier_preparer.quote_identifier(schema)
-        table_name = self.identifier_preparer.quote_identifier(table_name)
+        cache = self.metadata_cache
+        if cache is None:
+            return self._describe_table(connection, table_name, schema)
+
+        # The creation time from the (cached) listing tells apart a collection
+        # that was dropped and re-created from the one whose columns we cached.
+        api_server = self._dbapi_connection(connection).api_server
+        fingerprint = self._get_collections(connection, schema).get(table_name)
+        columns = cache.get_columns(api_server, schema, table_name, fingerprint)
+        if columns is None:
+            try:
+                columns = self._describe_table(connection, table_name, schema)
+            except exc.NoSuchTableError:
+                cache.invalidate(api_server, schema, table_name)
+                raise
+            cache.set_columns(api_server, schema, table_name, columns, fingerprint)
+        return columns
+
+    def _describe_table(self, connection, table_name, schema):
+        quoted_schema = self.identifier_preparer.quote_identifier(schema)
+        quoted_table_name = self.identifier_preparer.quote_identifier(table_name)
 
-        # Get a single row and determine the schema from that.
-        # This assumes the whole collection has a fixed schema of course.
-        q = f"SELECT * FROM {schema}.{table_name} LIMIT 1"
+        # DESCRIBE reports every field path seen in the collection, with one
+        # row per (field, type) pair and how often that pair occurs.
+        q = f"DESCRIBE {quoted_schema}.{quoted_table_name}"
+        cursor = self._dbapi_connection(connection).cursor()
         try:
-            cursor = connection.connect().connection.cursor()
             cursor.execute(q)
-            fields = cursor.description
-            if not fields:
-                # Return a fake schema if the collection is empty.
-                return [("null", "null")]
-            columns = []
-            for field in fields:
-                field_type = field[1]
-                if field_type not in type_map.keys():
-                    raise exc.SQLAlchemyError(
-                        "Query returned unsupported type {} in field {} in table {}.{}".format(
-                            field_type, fields[0], schema, table_name
-                        )
+            names = [d[0] for d in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        except ProgrammingError as e:
+            if len(e.args) > 1 and e.args[1] == 404:
+                raise exc.NoSuchTableError(f"{schema}.{table_name}") from e
+            raise
+        finally:
+            cursor.close()
+
+        # Only top-level fields are columns; nested paths are part of them.
+        field_types = {}
+        field_totals = {}
+        for row in rows:
+            path = row["field"]
+            if len(path) != 1:
+                continue
+            counts = field_types.setdefault(path[0], {})
+            counts[row["type"]] = counts.get(row["type"], 0) + row["occurrences"]
+            field_totals[path[0]] = row["total"]
+
+        if not field_types:
+            # The collection is empty; every collection has an `_id` field.
+            return [{"name": "_id", "type": type_map["string"], "nullable": False}]
+
+        columns = []
+        for name, counts in field_types.items():
+            field_type = _merge_field_types(counts)
+            if field_type not in type_map:
+                util.warn(
+                    "Unsupported type {} in field {} in table {}.{}".format(
+                        field_type, name, schema, table_name
                     )
-                columns.append(
-                    {
-                        "name": field[0],
-                        "type": type_map[field_type],
-                        "nullable": field[6],
-                        "default": None,
-                    }
                 )
-        except Exception as e:
-            # TODO: more graceful handling of exceptions.
-            raise e
+                field_type = "null"
+            nullable = name != "_id" and (
+                "null" in counts
+                or "undefined" in counts
+                or sum(counts.values()) < field_totals[name]
+            )
+            columns.append(
+                {
+                    "name": name,
+                    "type": type_map[field_type],
+                    "nullable": nullable,
+                    "default": None,
+                }
+            )
         return columns
 
     @reflection.cache
     def get_columns(self, connection, table_name, schema=None, **kw):
         if schema is None:
             schema = RocksetDialect.default_schema_name
-        return self._get_table_columns(connection, table_name, schema)
+        try:
+            return self._get_table_columns(connection, table_name, schema)
+        except exc.NoSuchTableError:
+            if table_name not in self.get_view_names(connection, schema, **kw):
+                raise
+        return self._get_view_columns(connection, table_name, schema)
+
+    def _multi_table_names(
+        self, connection, schema=None, filter_names=None, scope=None, kind=None, **kw
+    ):
+        """Return `(schema, collections, views)` for a get_multi_* call, or
+        None if it asks for neither."""
+        from sqlalchemy.engine.reflection import ObjectKind, ObjectScope
+
+        if scope is not None and not scope & ObjectScope.DEFAULT:
+            return None
+        if kind is None:
+            kind = ObjectKind.TABLE
+        if schema is None:
+            schema = RocksetDialect.default_schema_name
+        tables, views = [], []
+        if kind & ObjectKind.TABLE:
+            tables = self.get_table_names(connection, schema=schema, **kw)
+        if kind & ObjectKind.VIEW:
+            views = self.get_view_names(connection, schema=schema, **kw)
+        if filter_names:
+            tables = [n for n in tables if n in filter_names]
+            views = [n for n in views if n in filter_names]
+        if not tables and not views:
+            return None
+        return schema, tables, views
+
+    def get_multi_columns(self, connection, **kw):
+        # Used by SQLAlchemy 2.0's MetaData.reflect() / Inspector; lists the
+        # workspace once and describes its collections concurrently.
+        tables = self._multi_table_names(connection, **kw)
+        if tables is None:
+            return
+        schema, tables, views = tables
+        names = tables + views
+        get_columns = [self._get_table_columns] * len(tables) + [
+            self._get_view_columns
+        ] * len(views)
+        if len(names) <= 1 or self.reflection_workers <= 1:
+            for name, get in zip(names, get_columns):
+                yield (schema, name), get(connection, name, schema)
+            return
+
+        executor = futures.ThreadPoolExecutor(
+            max_workers=min(self.reflection_workers, len(names))
+        )
+        try:
+            pending = [
+                executor.submit(get, connection, name, schema)
+                for name, get in zip(names, get_columns)
+            ]
+            # Collect every result before yielding so that the pool is not
+            # kept busy while the caller processes the columns.
+            results = []
+            for name, future in zip(names, pending):
+                try:
+                    results.append(future.result(timeout=self.reflection_timeout))
+                except futures.TimeoutError:
+                    raise OperationalError(
+                        "Timed out reflecting {}.{} after {}s".format(
+                            schema, name, self.reflection_timeout
+                        )
+                    )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for name, columns in zip(names, results):
+            yield (schema, name), columns
+
+    def get_multi_pk_constraint(self, connection, **kw):
+        tables = self._multi_table_names(connection, **kw)
+        if tables is not None:
+            schema, tables, views = tables
+            for name in tables:
+                yield (schema, name), self.get_pk_constraint(connection, name, schema)
+            for name in views:
+                # A view's rows need not carry the `_id` of a collection.
+                yield (schema, name), {"constrained_columns": [], "name": None}
+
+    def get_multi_foreign_keys(self, connection, **kw):
+        tables = self._multi_table_names(connection, **kw)
+        if tables is not None:
+            schema, tables, views = tables
+            for name in tables + views:
+                yield (schema, name), self.get_foreign_keys(connection, name, schema)
+
+    def get_multi_indexes(self, connection, **kw):
+        tables = self._multi_table_names(connection, **kw)
+        if tables is not None:
+            schema, tables, views = tables
+            for name in tables + views:
+                yield (schema, name), self.get_indexes(connection, name, schema)
 
     @reflection.cache
     def get_view_names(self, connection, schema=None, **kw):
-        # TODO: implement this.
-        return []
+        client = self._rest_client(connection)
+        views = (
+            client.Views.list()
+            if schema is None
+            else client.Views.workspace_views(workspace=schema)
+        )["data"]
+        return [v["name"] for v in views]
+
+    @reflection.cache
+    def get_view_definition(self, connection, view_name, schema=None, **kw):
+        if schema is None:
+            schema = RocksetDialect.default_schema_name
+        client = self._rest_client(connection)
+        try:
+            return client.Views.get(view=view_name, workspace=schema)["data"][
+                "query_sql"
+            ]
+        except rockset.exceptions.NotFoundException as e:
+            raise exc.NoSuchTableError(f"{schema}.{view_name}") from e
+
+    # Number of rows of a view sampled to find its columns.
+    view_sample_size = 100
+
+    def _get_view_columns(self, connection, view_name, schema):
+        # DESCRIBE only covers collections, so the columns of a view come from
+        # the fields of its first rows.
+        quoted_schema = self.identifier_preparer.quote_identifier(schema)
+        quoted_view_name = self.identifier_preparer.quote_identifier(view_name)
+        dbapi_connection = self._dbapi_connection(connection)
+        try:
+            rows = Cursor.execute_query(
+                self._rest_client(connection),
+                f"SELECT * FROM {quoted_schema}.{quoted_view_name} "
+                f"LIMIT {self.view_sample_size}",
+                dbapi_connection.vi,
+            ).results
+        except ProgrammingError as e:
+            if len(e.args) > 1 and e.args[1] == 404:
+                raise exc.NoSuchTableError(f"{schema}.{view_name}") from e
+            raise
+
+        field_types = {}
+        for row in rows:
+            for name, value in row.items():
+                counts = field_types.setdefault(name, {})
+                field_type = _json_type(value)
+                counts[field_type] = counts.get(field_type, 0) + 1
+
+        return [
+            {
+                "name": name,
+                "type": type_map[_merge_field_types(counts)],
+                "nullable": "null" in counts or sum(counts.values()) < len(rows),
+                "default": None,
+            }
+            for name, counts in field_types.items()
+        ]
+
+    @reflection.cache
+    def get_query_lambda_names(self, connection, schema=None, **kw):
+        """Return the names of the query lambdas in a workspace."""
+        client = self._rest_client(connection)
+        lambdas = (
+            client.QueryLambdas.list_all_query_lambdas()
+            if schema is None
+            else client.QueryLambdas.list_query_lambdas_in_workspace(workspace=schema)
+        )["data"]
+        return [q["name"] for q in lambdas]
+
+    def execute_query_lambda(
+        self, connection, name, parameters=None, version=None, tag=None, schema=None
+    ):
+        """Execute a query lambda and return its rows as dictionaries.
+
+        Only the lambda's name and parameters are sent; Rockset runs its
+        stored, already parsed SQL. Runs the given `version`, else the version
+        with the given `tag`, else the latest version.
+        """
+        cursor = self._dbapi_connection(connection).cursor()
+        try:
+            cursor.execute_lambda(
+                name,
+                parameters,
+                version=version,
+                tag=tag,
+                workspace=schema or self.default_schema_name,
+            )
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def submit_query(self, connection, statement, parameters=None):
+        """Start `statement` as an asynchronous query and return its cursor.
+
+        The DB-API cursor returns at once with the running query's
+        `query_id`; `cursor.poll()` checks whether it has finished,
+        `cursor.cancel()` cancels it, and the `fetch*` methods wait for its
+        results. `connection` must stay open until the cursor is closed.
+        """
+        if isinstance(statement, str):
+            statement = sql.text(statement)
+        compiled = statement.compile(dialect=self)
+        cursor = self._dbapi_connection(connection).cursor(async_query=True)
+        try:
+            cursor.execute(str(compiled), compiled.construct_params(parameters))
+        except Exception:
+            cursor.close()
+            raise
+        return cursor
 
     @reflection.cache
     def get_foreign_keys(self, connection, table_name, schema=None, **kw):
@@ -139,12 +661,76 @@ class RocksetDialect(default.DefaultDialect):
     def get_indexes(self, connection, table_name, schema=None, **kw):
         return []
 
-    def has_table(self, connection, table_name, schema=None):
+    def has_table(self, connection, table_name, schema=None, **kw):
+        if schema is None:
+            schema = RocksetDialect.default_schema_name
         try:
             self._get_table_columns(connection, table_name, schema)
             return True
         except exc.NoSuchTableError:
-            return False
+            return table_name in self.get_view_names(connection, schema, **kw)
+
+    def _documents_insert_target(self, context):
+        """Return `(workspace, collection, field names)` for a plain INSERT.
+
+        Such inserts are written through the Documents API instead of being
+        run as SQL. Returns None for any other statement.
+        """
+        if self.is_async or not self.bulk_insert or context is None:
+            return None
+        if not context.isinsert or context.compiled is None:
+            return None
+        stmt = context.compiled.statement
+        if stmt.select is not None or getattr(stmt, "_returning", None):
+            return None
+        # Values given as SQL expressions (e.g. func.now()) are only in the
+        # rendered SQL, not in the parameters.
+        if context.compiled.postfetch:
+            return None
+        table = stmt.table
+        return (
+            table.schema or self.default_schema_name,
+            table.name,
+            {column.key: column.name for column in table.columns},
+        )
+
+    @staticmethod
+    def _to_document(parameters, field_names):
+        return {field_names.get(key, key): value for key, value in parameters.items()}
+
+    def do_execute(self, cursor, statement, parameters, context=None):
+        target = self._documents_insert_target(context)
+        if target is None:
+            return super().do_execute(cursor, statement, parameters, context)
+        workspace, collection, field_names = target
+        cursor.add_documents(
+            workspace, collection, [self._to_document(parameters, field_names)]
+        )
+
+    def do_executemany(self, cursor, statement, parameters, context=None):
+        target = self._documents_insert_target(context)
+        if target is None:
+            return super().do_executemany(cursor, statement, parameters, context)
+        workspace, collection, field_names = target
+        cursor.add_documents(
+            workspace,
+            collection,
+            [self._to_document(p, field_names) for p in parameters],
+        )
+
+    def do_ping(self, dbapi_connection):
+        # Connections are stateless HTTP clients, so a connection is alive if
+        # Rockset is reachable and accepts the API key.
+        dbapi_connection.ping()
+        return True
+
+    def is_disconnect(self, e, connection, cursor):
+        from rockset_sqlalchemy.exceptions import TransportError
+
+        # A new connection would not fix throttling (429), server errors,
+        # authentication failures or cancelled and timed out queries; only
+        # requests that could not reach Rockset.
+        return isinstance(e, TransportError)
 
     def do_rollback(self, dbapi_connection):
         # Transactions are not supported in Rockset.
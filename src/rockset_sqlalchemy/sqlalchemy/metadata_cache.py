@@ -0,0 +1,194 @@
+"""Disk-backed cache of reflected Rockset metadata.
+
+SQLAlchemy's reflection cache only lives as long as one Inspector. This cache
+is a sqlite file, so collection listings and column definitions survive
+restarts and are shared by every process that points at the same file::
+
+    engine = create_engine(
+        "rockset://...?metadata_cache=/var/cache/rockset.sqlite&metadata_cache_ttl=3600"
+    )
+
+It can be warmed or cleared from the command line::
+
+    rockset-sqlalchemy-metadata-cache warm /var/cache/rockset.sqlite "rockset://..." --schema commons
+    rockset-sqlalchemy-metadata-cache clear /var/cache/rockset.sqlite
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+from .types import type_map
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS metadata (
+    api_server TEXT NOT NULL,
+    workspace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fingerprint TEXT,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (api_server, workspace, name, kind)
+)
+"""
+
+_TABLES = "tables"
+_COLUMNS = "columns"
+
+
+class MetadataCache(object):
+    """Reflected metadata keyed by API server, workspace and collection.
+
+    Entries expire `ttl` seconds after they are stored. Column definitions
+    also record the collection's creation time, so a collection that was
+    dropped and re-created is re-reflected once the listing is refreshed.
+    """
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute(_CREATE_TABLE)
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the cache safe to use
+        # from several threads and forked processes.
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _get(self, api_server, workspace, name, kind):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fingerprint, value, stored_at FROM metadata "
+                "WHERE api_server = ? AND workspace = ? AND name = ? AND kind = ?",
+                (api_server, workspace, name, kind),
+            ).fetchone()
+        if row is None or row[2] + self.ttl <= time.time():
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def _set(self, api_server, workspace, name, kind, value, fingerprint=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    api_server,
+                    workspace,
+                    name,
+                    kind,
+                    fingerprint,
+                    json.dumps(value),
+                    time.time(),
+                ),
+            )
+
+    def get_collections(self, api_server, workspace):
+        """Return `{collection: fingerprint}` for a workspace, or None."""
+        return self._get(api_server, workspace, "", _TABLES)[1]
+
+    def set_collections(self, api_server, workspace, collections):
+        """Store `{collection: fingerprint}` for a workspace.
+
+        Cached columns of collections whose fingerprint changed are dropped.
+        """
+        with self._connect() as conn:
+            stale = [
+                (name,)
+                for name, fingerprint in conn.execute(
+                    "SELECT name, fingerprint FROM metadata "
+                    "WHERE api_server = ? AND workspace = ? AND kind = ?",
+                    (api_server, workspace, _COLUMNS),
+                )
+                if name not in collections
+                or (fingerprint is not None and collections[name] != fingerprint)
+            ]
+            conn.executemany(
+                "DELETE FROM metadata WHERE api_server = ? AND workspace = ? "
+                "AND name = ? AND kind = ?",
+                [(api_server, workspace, name, _COLUMNS) for (name,) in stale],
+            )
+        self._set(api_server, workspace, "", _TABLES, collections)
+
+    def get_columns(self, api_server, workspace, collection, fingerprint=None):
+        """Return the cached column definitions of a collection, or None."""
+        cached_fingerprint, columns = self._get(
+            api_server, workspace, collection, _COLUMNS
+        )
+        if columns is None or (
+            fingerprint is not None and fingerprint != cached_fingerprint
+        ):
+            return None
+        return [dict(column, type=type_map[column["type"]]) for column in columns]
+
+    def set_columns(self, api_server, workspace, collection, columns, fingerprint):
+        self._set(
+            api_server,
+            workspace,
+            collection,
+            _COLUMNS,
+            [dict(column, type=column["type"].__visit_name__) for column in columns],
+            fingerprint,
+        )
+
+    def invalidate(self, api_server, workspace, collection=None):
+        """Drop a workspace's listing, or one collection's columns."""
+        with self._connect() as conn:
+            if collection is None:
+                conn.execute(
+                    "DELETE FROM metadata WHERE api_server = ? AND workspace = ?",
+                    (api_server, workspace),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM metadata WHERE api_server = ? AND workspace = ? "
+                    "AND name IN (?, '')",
+                    (api_server, workspace, collection),
+                )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM metadata")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="rockset-sqlalchemy-metadata-cache",
+        description="Warm or clear the Rockset SQLAlchemy metadata cache.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm = subparsers.add_parser("warm", help="reflect workspaces into the cache")
+    warm.add_argument("path", help="cache file")
+    warm.add_argument("url", help="SQLAlchemy URL, e.g. rockset://<api key>@<host>")
+    warm.add_argument(
+        "--schema",
+        action="append",
+        help="workspace to reflect; may be repeated (default: all workspaces)",
+    )
+    warm.add_argument("--ttl", type=float, default=3600)
+
+    clear = subparsers.add_parser("clear", help="empty the cache")
+    clear.add_argument("path", help="cache file")
+
+    args = parser.parse_args(argv)
+    if args.command == "clear":
+        MetadataCache(args.path).clear()
+        return 0
+
+    from sqlalchemy import create_engine, inspect
+
+    engine = create_engine(args.url, metadata_cache=MetadataCache(args.path, args.ttl))
+    inspector = inspect(engine)
+    schemas = args.schema or inspector.get_schema_names()
+    for schema in schemas:
+        inspector.get_multi_columns(schema=schema)
+        print("cached workspace {}".format(schema), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import rockset
 from sqlalchemy import types
 
+from .. import conversion
+
 
 class BaseType:
     __visit_name__ = None
@@ -9,6 +11,20 @@ class BaseType:
         return self.__visit_name__
 
 
+class WireFormatType(BaseType):
+    """A type whose values Rockset returns in a wire format, such as ISO 8601
+    strings, that is parsed into a Python type."""
+
+    parse = None
+
+    def result_processor(self, dialect, coltype):
+        if coltype == self.__visit_name__:
+            # The cursor has already converted the column (see the
+            # `convert_types` connection option).
+            return None
+        return self.parse
+
+
 class NullType(BaseType, types.NullType):
     __visit_name__ = rockset.document.DATATYPE_NULL
     hashable = True
@@ -42,24 +58,33 @@ class Object(NullType):
     __visit_name__ = rockset.document.DATATYPE_OBJECT
 
 
-class Date(BaseType, types.DATE):
+class Date(WireFormatType, types.DATE):
     __visit_name__ = rockset.document.DATATYPE_DATE
+    parse = staticmethod(conversion.parse_date)
 
 
-class DateTime(BaseType, types.DATETIME):
+class DateTime(WireFormatType, types.DATETIME):
     __visit_name__ = rockset.document.DATATYPE_DATETIME
+    parse = staticmethod(conversion.parse_datetime)
 
 
-class Time(BaseType, types.TIME):
+class Time(WireFormatType, types.TIME):
     __visit_name__ = rockset.document.DATATYPE_TIME
+    parse = staticmethod(conversion.parse_time)
 
 
-class Timestamp(BaseType, types.String):
+class Timestamp(WireFormatType, types.DATETIME):
     __visit_name__ = rockset.document.DATATYPE_TIMESTAMP
+    parse = staticmethod(conversion.parse_timestamp)
+
+    def __init__(self, timezone=True):
+        # Rockset timestamps are instants, returned as datetimes in UTC.
+        super().__init__(timezone=timezone)
 
 
-class MicrosecondInterval(BaseType, types.Interval):
+class MicrosecondInterval(WireFormatType, types.Interval):
     __visit_name__ = rockset.document.DATATYPE_MICROSECOND_INTERVAL
+    parse = staticmethod(conversion.parse_microsecond_interval)
 
     def bind_processor(self, dialect):
         def process(value):
@@ -67,12 +92,6 @@ class MicrosecondInterval(BaseType, types.Interval):
 
         return process
 
-    def result_processor(self, dialect, coltype):
-        def process(value):
-            return value
-
-        return process
-
 
 class MonthInterval(Object):
     __visit_name__ = rockset.document.DATATYPE_MONTH_INTERVAL
@@ -99,3 +118,26 @@ type_map = {
     "month_interval": MonthInterval,
     "geography": Geography,
 }
+
+# Column types used by Cursor.fetch_numpy() and Cursor.fetch_arrow_table(),
+# keyed like `type_map`. Columns of other types hold Python objects (numpy) or
+# an inferred type (Arrow). Dates and times are parsed from Rockset's ISO 8601
+# strings.
+numpy_dtype_map = {
+    "int": "int64",
+    "float": "float64",
+    "bool": "bool",
+    "date": "datetime64[D]",
+    "datetime": "datetime64[us]",
+    "timestamp": "datetime64[us]",
+}
+
+arrow_type_map = {
+    "int": lambda pa: pa.int64(),
+    "float": lambda pa: pa.float64(),
+    "bool": lambda pa: pa.bool_(),
+    "string": lambda pa: pa.string(),
+    "date": lambda pa: pa.date32(),
+    "datetime": lambda pa: pa.timestamp("us"),
+    "timestamp": lambda pa: pa.timestamp("us", tz="UTC"),
+}
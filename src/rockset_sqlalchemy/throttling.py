@@ -0,0 +1,211 @@
+"""Retries and adaptive concurrency control for throttled requests.
+
+Rockset answers 429 (and, when overloaded, 503) to requests beyond a virtual
+instance's capacity. Read-only requests that fail this way are retried with
+exponential backoff and jitter, waiting at least as long as the response's
+`Retry-After` header asks, up to the retry policy's maximum backoff.
+
+An optional `ConcurrencyLimiter`, shared by all connections of a process to
+the same API server and virtual instance, caps the number of requests in
+flight. Its limit is adapted AIMD-style: it grows by one for each limit's
+worth of successful requests and is multiplied by `backoff_ratio` when a
+request is throttled.
+"""
+
+from email.utils import parsedate_to_datetime
+import datetime
+import os
+import random
+import threading
+import time
+import warnings
+
+import rockset
+
+# Statuses of throttled requests.
+THROTTLED_STATUSES = frozenset([429, 503])
+
+
+class RetryPolicy(object):
+    """Retry throttled and unavailable requests with exponential backoff.
+
+    Retry `n` waits for a random time between 0 and
+    `min(max_backoff, initial_backoff * 2 ** n)` seconds ("full jitter"), or
+    for the `Retry-After` of the response if that is longer. No retry waits
+    longer than `max_backoff`, whatever the server asks for.
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        initial_backoff=0.1,
+        max_backoff=10.0,
+        retry_statuses=(429, 502, 503, 504),
+    ):
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def should_retry(self, status, attempt):
+        return attempt < self.max_retries and status in self.retry_statuses
+
+    def backoff(self, attempt, retry_after=None):
+        delay = random.uniform(
+            0, min(self.max_backoff, self.initial_backoff * 2**attempt)
+        )
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+def retry_after(headers):
+    """Return the seconds to wait from a `Retry-After` header, or None."""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class ConcurrencyLimiter(object):
+    """Caps concurrent requests at a limit adapted to throttling (AIMD).
+
+    The limit starts at `initial_limit` and stays between `min_limit` and
+    `max_limit`. Only requests sent since the last decrease can decrease it
+    again, so a burst of throttled requests counts as one signal.
+    """
+
+    def __init__(self, initial_limit=16, min_limit=1, max_limit=256, backoff_ratio=0.5):
+        self.initial_limit = initial_limit
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self._decreases = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a slot; returns a token to pass to `release`."""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                self.waits += 1
+                while self.in_flight >= int(self.limit):
+                    self._cond.wait()
+            self.in_flight += 1
+            return self._decreases
+
+    def release(self, token, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            self.requests += 1
+            if throttled:
+                self.throttled += 1
+                if token == self._decreases:
+                    self._decreases += 1
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waits": self.waits,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(api_server, vi, **kwargs):
+    """Return the process-wide ConcurrencyLimiter for an API server and
+    virtual instance, creating it with `kwargs` if needed.
+
+    Warns if the existing limiter was created with other settings, which
+    are then ignored: requests to a virtual instance share one limit.
+    """
+    key = (os.getpid(), api_server, vi)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = ConcurrencyLimiter(**kwargs)
+            return limiter
+    ignored = {
+        name: value for name, value in kwargs.items() if getattr(limiter, name) != value
+    }
+    if ignored:
+        warnings.warn(
+            "The concurrency limiter of {} (virtual instance {}) already exists "
+            "with other settings; ignoring {}".format(
+                api_server,
+                vi,
+                ", ".join("{}={}".format(n, v) for n, v in sorted(ignored.items())),
+            ),
+            stacklevel=2,
+        )
+    return limiter
+
+
+def limiter_stats():
+    """Return the stats of each limiter, keyed by `(api_server, vi)`."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    pid = os.getpid()
+    return {
+        key[1:]: limiter.stats() for key, limiter in limiters.items() if key[0] == pid
+    }
+
+
+def call_with_retries(request, retry=None, limiter=None, event=None):
+    """Call `request()`, retrying it as `retry` allows.
+
+    Each attempt holds a slot of `limiter`, if given. The time spent waiting
+    for a slot, in requests and backing off, and the numbers of retries and
+    throttled attempts, are added to `event`, a QueryEvent, if given.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            started = time.perf_counter()
+            token = limiter.acquire()
+            if event is not None:
+                event.add_time("queue", time.perf_counter() - started)
+        throttled = False
+        started = time.perf_counter()
+        try:
+            return request()
+        except rockset.exceptions.ApiException as e:
+            throttled = e.status in THROTTLED_STATUSES
+            if throttled and event is not None:
+                event.throttled += 1
+            if retry is None or not retry.should_retry(e.status, attempt):
+                raise
+            delay = retry.backoff(attempt, retry_after(e.headers))
+        finally:
+            if event is not None:
+                event.add_time("http", time.perf_counter() - started)
+            if limiter is not None:
+                limiter.release(token, throttled)
+        attempt += 1
+        if event is not None:
+            event.retries += 1
+            event.add_time("backoff", delay)
+        time.sleep(delay)
@@ -0,0 +1,25 @@
+import pytest
+import sqlalchemy as sa
+
+from rockset_sqlalchemy.client import clear_clients
+
+from .fake_rockset import HOST, FakeRockset, install, new_api_key
+
+
+@pytest.fixture
+def fake():
+    """A FakeRockset answering the requests of connections that use
+    `fake.api_key`. Test modules override this fixture to give it rows or
+    collections."""
+    api_key = new_api_key()
+    fake = install(FakeRockset(), api_key)
+    fake.api_key = api_key
+    yield fake
+    clear_clients()
+
+
+def engine_for(fake, query="", **kwargs):
+    """Return a rockset:// engine whose connections talk to `fake`."""
+    return sa.create_engine(
+        "rockset://{}@{}{}".format(fake.api_key, HOST, query), **kwargs
+    )
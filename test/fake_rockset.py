@@ -0,0 +1,436 @@
+"""An in-memory fake of the Rockset REST API for tests.
+
+`FakeRockset` answers the endpoints the driver uses (queries, result pages,
+collection and view listings, DESCRIBE and the Documents API) from in-memory
+data. `install()` makes it the urllib3 pool of the shared RocksetClient for
+an API key, so connections and engines opened with that key talk to it;
+`make_app()` serves it over HTTP with aiohttp for the asyncio driver.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+
+import urllib3
+
+from rockset_sqlalchemy.client import get_client
+
+API_SERVER = "https://api.usw2a1.rockset.com"
+HOST = "api.usw2a1.rockset.com"
+
+_QUERY = re.compile(r"/v1/orgs/self(?:/virtualinstances/([^/]+))?/queries$")
+_LAMBDA = "/v1/orgs/self/ws/([^/]+)/lambdas/([^/]+)"
+
+# (method, path pattern, name of the FakeRockset method answering it). The
+# method is called with the body (or query fields) and the path's groups.
+_ROUTES = [
+    ("POST", _QUERY.pattern, "_post_query"),
+    ("GET", r"/v1/orgs/self/queries/([^/]+)/pages$", "_get_page"),
+    ("GET", r"/v1/orgs/self/queries/([^/]+)$", "_get_query"),
+    ("DELETE", r"/v1/orgs/self/queries/([^/]+)$", "_cancel_query"),
+    ("POST", r"/v1/orgs/self/ws/([^/]+)/collections/([^/]+)/docs$", "_add_documents"),
+    (
+        "POST",
+        r"/v1/orgs/self/ws/([^/]+)/collections/([^/]+)/offsets/commit$",
+        "_commit_offsets",
+    ),
+    ("GET", r"/v1/orgs/self/ws/([^/]+)/collections$", "_list_collections"),
+    ("GET", r"/v1/orgs/self/(?:ws/([^/]+)/)?views$", "_list_views"),
+    ("GET", r"/v1/orgs/self/ws/([^/]+)/views/([^/]+)$", "_get_view"),
+    ("GET", r"/v1/orgs/self/ws$", "_list_workspaces"),
+    ("POST", r"/v1/orgs/self/ws/([^/]+)/lambdas$", "_create_lambda"),
+    ("GET", r"/v1/orgs/self/(?:ws/([^/]+)/)?lambdas$", "_list_lambdas"),
+    ("GET", _LAMBDA + "/tags/([^/]+)$", "_get_lambda_tag"),
+    ("POST", _LAMBDA + "/(versions|tags)/([^/]+)$", "_execute_lambda"),
+    ("DELETE", _LAMBDA + "$", "_delete_lambda"),
+]
+_ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in _ROUTES]
+
+_NOT_FOUND = json.dumps({"message": "Not found", "type": "NOTFOUND"})
+
+
+def _field_type(value):
+    for python_type, field_type in [
+        (bool, "bool"),
+        (int, "int"),
+        (float, "float"),
+        (str, "string"),
+        (dict, "object"),
+        (list, "array"),
+    ]:
+        if isinstance(value, python_type):
+            return field_type
+    return "null"
+
+
+class FakeRockset(object):
+    """Stands in for a RocksetClient's urllib3 pool.
+
+    Every query returns `rows`, or what `query_handler(sql, body)` returns if
+    it is set and does not return None. Results are paginated as Rockset
+    does when a query sets `max_initial_results`. `collections` maps
+    workspaces to `{collection: sample document}`; DESCRIBE describes the
+    sample document. `views` maps workspaces to `{view: SQL}`. Query lambdas
+    created through the API are kept in `lambdas`. Failures queued with
+    `fail()` and `disconnect()` are served first.
+
+    Asynchronous queries are reported as RUNNING by the first
+    `running_polls` status checks, then as `async_status`; with
+    `running_polls` at 0 they return their results at once.
+    """
+
+    def __init__(self, rows=(), collections=None, latency=0.0):
+        self.rows = list(rows)
+        self.collections = collections or {}
+        self.views = {}
+        self.latency = latency
+        self.query_handler = None
+        # Rockset types reported for result columns, by name, instead of the
+        # types of the first row's values.
+        self.column_types = {}
+        # Creation times of collections, by name; the default otherwise.
+        self.created_at = {}
+        # Document IDs the Documents API rejects.
+        self.reject_ids = set()
+        self.documents = []
+        # Whether written documents are reported as visible to queries.
+        self.offsets_visible = True
+        # `{(workspace, name): {"sql": ..., "version": ...}}`.
+        self.lambdas = {}
+        self.running_polls = 0
+        self.async_status = "COMPLETED"
+        # (method, path, body or query fields) of each request.
+        self.requests = []
+        self._errors = []
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def fail(self, status, times=1, body=None, headers=None, path=None):
+        """Answer the next `times` requests with an error response; only
+        requests whose path contains `path`, if given."""
+        if body is None:
+            body = json.dumps({"message": "Injected error", "type": "INTERNALERROR"})
+        with self._lock:
+            self._errors.extend([(path, (status, body, headers or {}))] * times)
+
+    def disconnect(self, times=1, path=None):
+        """Fail the next `times` requests as if Rockset could not be reached."""
+        error = urllib3.exceptions.ProtocolError("Connection aborted.")
+        with self._lock:
+            self._errors.extend([(path, error)] * times)
+
+    def queries(self):
+        """Return the SQL text of each query request."""
+        return [
+            body["sql"]["query"]
+            for method, path, body in self.requests
+            if _QUERY.search(path) and method == "POST"
+        ]
+
+    def request(self, method, url, body=None, fields=None, preload_content=True, **kw):
+        path = url.split("?", 1)[0]
+        status, response, headers = self.handle(method, path, body, fields)
+        headers = dict(headers, **{"Content-Type": "application/json"})
+        return urllib3.HTTPResponse(
+            body=response.encode() if isinstance(response, str) else response,
+            headers=headers,
+            status=status,
+            preload_content=preload_content,
+        )
+
+    def clear(self):
+        pass
+
+    def handle(self, method, path, body=None, fields=None):
+        """Return `(status, body, headers)` for a request."""
+        if isinstance(body, (bytes, str)) and body:
+            body = json.loads(body)
+        with self._lock:
+            self.requests.append((method, path, body if body is not None else fields))
+            error = self._pop_error(path)
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(error, Exception):
+            raise error
+        if error is not None:
+            return error
+        for route_method, pattern, name in _ROUTES:
+            match = pattern.search(path)
+            if match and method == route_method:
+                if body is None:
+                    body = dict(fields or ())
+                result = getattr(self, name)(body, *match.groups())
+                status, response = (
+                    result if isinstance(result, tuple) else (200, result)
+                )
+                return status, json.dumps(response), {}
+        return 404, _NOT_FOUND, {}
+
+    def _pop_error(self, path):
+        for i, (error_path, error) in enumerate(self._errors):
+            if error_path is None or error_path in path:
+                del self._errors[i]
+                return error
+        return None
+
+    def _post_query(self, body, vi=None):
+        return self._run(body["sql"]["query"], body)
+
+    def _run(self, sql, body):
+        rows = None
+        if sql.startswith("DESCRIBE"):
+            rows = self._describe(sql)
+            if rows is None:
+                return 404, {"message": "Collection not found", "type": "NOTFOUND"}
+        elif self.query_handler is not None:
+            rows = self.query_handler(sql, body)
+        if rows is None:
+            rows = self.rows
+        query_id = uuid.uuid4().hex
+        if body.get("async") and self.running_polls:
+            with self._lock:
+                self._queries[query_id] = {
+                    "rows": rows,
+                    "status": "RUNNING",
+                    "polls": self.running_polls,
+                }
+            return {
+                "query_id": query_id,
+                "status": "RUNNING",
+                "column_fields": self._column_fields(rows),
+            }
+        with self._lock:
+            self._queries[query_id] = {"rows": rows, "status": "COMPLETED"}
+        max_initial_results = body.get("max_initial_results")
+        if body.get("async"):
+            max_initial_results = body["async_options"].get("max_initial_results")
+        response = self._page(query_id, {"docs": max_initial_results})
+        response.update(
+            query_id=query_id,
+            status="COMPLETED",
+            column_fields=self._column_fields(rows),
+            stats={"elapsed_time_ms": 1, "throttled_time_micros": 0},
+        )
+        return response
+
+    def _column_fields(self, rows):
+        first = rows[0] if rows else {}
+        return [
+            {"name": name, "type": self.column_types.get(name, _field_type(value))}
+            for name, value in first.items()
+        ]
+
+    def _get_page(self, fields, query_id):
+        return self._page(query_id, fields)
+
+    def _page(self, query_id, fields):
+        rows = self._queries[query_id]["rows"]
+        start = int(fields.get("cursor") or 0)
+        docs = fields.get("docs")
+        end = len(rows) if docs is None else min(start + int(docs), len(rows))
+        return {
+            "results": rows[start:end],
+            "results_total_doc_count": len(rows),
+            "pagination": {
+                "start_cursor": str(start),
+                "next_cursor": str(end) if end < len(rows) else None,
+                "current_page_doc_count": end - start,
+            },
+        }
+
+    def _get_query(self, fields, query_id):
+        with self._lock:
+            query = self._queries.get(query_id)
+            if query is None:
+                return 404, {"message": "Query not found", "type": "NOTFOUND"}
+            if query["status"] == "RUNNING":
+                if query["polls"]:
+                    query["polls"] -= 1
+                else:
+                    query["status"] = self.async_status
+            info = {
+                "query_id": query_id,
+                "status": query["status"],
+                "stats": {"elapsed_time_ms": 1},
+            }
+        if info["status"] == "FAILED":
+            info["query_errors"] = [
+                {
+                    "type": "QUERY_ERROR",
+                    "message": "Injected failure",
+                    "status_code": 400,
+                }
+            ]
+        return {"data": info}
+
+    def _cancel_query(self, body, query_id):
+        with self._lock:
+            self._queries[query_id]["status"] = "CANCELLED"
+        return {"data": {"query_id": query_id, "status": "CANCELLED"}}
+
+    def _describe(self, sql):
+        workspace, collection = [
+            name.strip('"`') for name in sql.split(None, 1)[1].split(".")
+        ]
+        sample = self.collections.get(workspace, {}).get(collection)
+        if sample is None:
+            return None
+        rows = []
+
+        def describe(path, value):
+            rows.append(
+                {
+                    "field": path,
+                    "type": _field_type(value),
+                    "occurrences": 1,
+                    "total": 1,
+                }
+            )
+            if isinstance(value, dict):
+                for name, child in value.items():
+                    describe(path + [name], child)
+
+        for name, value in sample.items():
+            describe([name], value)
+        return rows
+
+    def _list_collections(self, fields, workspace):
+        return {
+            "data": [
+                {
+                    "name": name,
+                    "workspace": workspace,
+                    "created_at": self.created_at.get(name, "2024-01-01T00:00:00Z"),
+                    "status": "READY",
+                }
+                for name in self.collections.get(workspace, {})
+            ]
+        }
+
+    def _list_views(self, fields, workspace=None):
+        return {
+            "data": [
+                {"name": name, "workspace": ws, "query_sql": sql}
+                for ws, views in self.views.items()
+                if workspace in (None, ws)
+                for name, sql in views.items()
+            ]
+        }
+
+    def _get_view(self, fields, workspace, view):
+        sql = self.views.get(workspace, {}).get(view)
+        if sql is None:
+            return 404, {"message": "View not found", "type": "NOTFOUND"}
+        return {"data": {"name": view, "workspace": workspace, "query_sql": sql}}
+
+    def _list_workspaces(self, fields):
+        names = sorted(set(self.collections) | set(self.views))
+        return {"data": [{"name": name} for name in names]}
+
+    def _add_documents(self, body, workspace, collection):
+        statuses = []
+        with self._lock:
+            for doc in body["data"]:
+                rejected = doc.get("_id") in self.reject_ids
+                if not rejected:
+                    self.documents.append(doc)
+                statuses.append(
+                    {
+                        "_id": doc.get("_id"),
+                        "collection": collection,
+                        "status": "ERROR" if rejected else "ADDED",
+                        "error": {"message": "Rejected"} if rejected else None,
+                    }
+                )
+        return {"data": statuses, "last_offset": "f1:{}".format(len(self.documents))}
+
+    def _commit_offsets(self, body, workspace, collection):
+        return {"data": {"passed": self.offsets_visible, "fence": "f1"}}
+
+    def _create_lambda(self, body, workspace):
+        key = (workspace, body["name"])
+        with self._lock:
+            if key in self.lambdas:
+                return 409, {"message": "Lambda exists", "type": "ALREADYEXISTS"}
+            query_lambda = {"sql": body["sql"]["query"], "version": uuid.uuid4().hex}
+            self.lambdas[key] = query_lambda
+        return {"data": self._lambda_version(key)}
+
+    def _lambda_version(self, key):
+        workspace, name = key
+        version = self.lambdas[key]["version"]
+        return {"name": name, "workspace": workspace, "version": version}
+
+    def _list_lambdas(self, fields, workspace=None):
+        return {
+            "data": [
+                {"name": name, "workspace": ws}
+                for ws, name in self.lambdas
+                if workspace in (None, ws)
+            ]
+        }
+
+    def _get_lambda_tag(self, fields, workspace, name, tag):
+        if (workspace, name) not in self.lambdas:
+            return 404, {"message": "Lambda not found", "type": "NOTFOUND"}
+        version = self._lambda_version((workspace, name))
+        return {"data": {"tag_name": tag, "version": version}}
+
+    def _execute_lambda(self, body, workspace, name, kind, ref):
+        query_lambda = self.lambdas.get((workspace, name))
+        if query_lambda is None or (
+            kind == "versions" and ref != query_lambda["version"]
+        ):
+            return 404, {"message": "Lambda not found", "type": "NOTFOUND"}
+        sql = query_lambda["sql"]
+        return self._run(
+            sql,
+            dict(body, sql={"query": sql, "parameters": body.get("parameters", [])}),
+        )
+
+    def _delete_lambda(self, body, workspace, name):
+        with self._lock:
+            if self.lambdas.pop((workspace, name), None) is None:
+                return 404, {"message": "Lambda not found", "type": "NOTFOUND"}
+        return {"data": {"name": name, "workspace": workspace}}
+
+
+def new_api_key():
+    # Connections share clients by API key; a new key gives a new client.
+    return "test-" + uuid.uuid4().hex
+
+
+def install(fake, api_key):
+    """Make `fake` answer the requests of every connection using `api_key`
+    with the default HTTP settings."""
+    get_client(API_SERVER, api_key).api_client.rest_client.pool_manager = fake
+    return fake
+
+
+def make_app(fake):
+    """Return an aiohttp application serving `fake` over HTTP."""
+    from aiohttp import web
+
+    async def handle(request):
+        body = await request.read()
+        # In a thread, so that the fake's latency does not block the server.
+        status, response, headers = await asyncio.get_running_loop().run_in_executor(
+            None,
+            fake.handle,
+            request.method,
+            request.path,
+            body or None,
+            list(request.query.items()),
+        )
+        return web.Response(
+            status=status,
+            body=response.encode() if isinstance(response, str) else response,
+            headers=dict(headers, **{"Content-Type": "application/json"}),
+        )
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handle)
+    return app
@@ -0,0 +1,255 @@
+import asyncio
+import contextlib
+
+import pytest
+import sqlalchemy as sa
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("greenlet")
+
+from aiohttp import web  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from rockset_sqlalchemy.aio import AsyncConnection  # noqa: E402
+from rockset_sqlalchemy.exceptions import NotSupportedError  # noqa: E402
+from rockset_sqlalchemy.instrumentation import Instrumentation  # noqa: E402
+
+from .fake_rockset import FakeRockset, make_app  # noqa: E402
+
+ROWS = [{"n": i, "name": "row-{}".format(i)} for i in range(25)]
+EXPECTED = [(row["n"], row["name"]) for row in ROWS]
+
+
+@contextlib.asynccontextmanager
+async def serve(fake):
+    """Serve `fake` over HTTP on localhost; yields its API server URL."""
+    runner = web.AppRunner(make_app(fake))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        port = site._server.sockets[0].getsockname()[1]
+        yield "http://127.0.0.1:{}".format(port)
+    finally:
+        await runner.cleanup()
+
+
+def engine_for(api_server, query="", **kwargs):
+    # The dialect talks HTTPS to the URL's host; point it at the stub.
+    return create_async_engine(
+        "rockset+async://key@localhost{}".format(query),
+        connect_args={"api_server": api_server},
+        **kwargs,
+    )
+
+
+def test_query():
+    async def run():
+        fake = FakeRockset(ROWS)
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+            async with engine.connect() as conn:
+                result = await conn.execute(
+                    sa.text("SELECT n, name FROM commons.rows WHERE n < :n"),
+                    {"n": 100},
+                )
+                rows = [tuple(row) for row in result]
+            await engine.dispose()
+        return fake, rows
+
+    fake, rows = asyncio.run(run())
+    assert rows == EXPECTED
+    (query,) = [body for method, path, body in fake.requests if method == "POST"]
+    assert query["sql"]["query"] == "SELECT n, name FROM commons.rows WHERE n < :n"
+    assert query["sql"]["parameters"] == [{"name": "n", "type": "int", "value": "100"}]
+
+
+def test_concurrent_queries():
+    async def run():
+        fake = FakeRockset(latency=0.2)
+        fake.query_handler = lambda sql, body: [
+            {"q": body["sql"]["parameters"][0]["value"]}
+        ]
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+
+            async def query(i):
+                async with engine.connect() as conn:
+                    result = await conn.execute(sa.text("SELECT :q AS q"), {"q": i})
+                    return result.scalar()
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = await asyncio.gather(*(query(i) for i in range(10)))
+            elapsed = loop.time() - start
+            await engine.dispose()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    assert results == [str(i) for i in range(10)]
+    # The stub answers each query after 0.2s: the ten queries only finish in
+    # time if they were in flight together.
+    assert elapsed < 1.0
+
+
+def test_stream():
+    async def run():
+        fake = FakeRockset(ROWS)
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+            async with engine.connect() as conn:
+                result = await conn.stream(
+                    sa.text("SELECT n, name FROM commons.rows"),
+                    execution_options={"yield_per": 10},
+                )
+                rows = [tuple(row) async for row in result]
+            await engine.dispose()
+        return fake, rows
+
+    fake, rows = asyncio.run(run())
+    assert rows == EXPECTED
+    assert fake.requests[0][2]["max_initial_results"] == 10
+    pages = [fields for method, path, fields in fake.requests if method == "GET"]
+    assert [dict(fields)["cursor"] for fields in pages] == ["10", "20"]
+
+
+def test_reflection_needs_sync_driver():
+    async def run():
+        fake = FakeRockset(collections={"commons": {"rows": ROWS[0]}})
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+            try:
+                async with engine.connect() as conn:
+                    columns = await conn.run_sync(
+                        lambda sync_conn: sa.inspect(sync_conn).get_columns(
+                            "rows", schema="commons"
+                        )
+                    )
+                    with pytest.raises(NotSupportedError):
+                        await conn.run_sync(
+                            lambda sync_conn: sa.inspect(sync_conn).get_table_names(
+                                schema="commons"
+                            )
+                        )
+            finally:
+                await engine.dispose()
+        return columns
+
+    columns = asyncio.run(run())
+    assert [column["name"] for column in columns] == ["n", "name"]
+
+
+def test_missing_collection_is_not_a_view():
+    async def run():
+        fake = FakeRockset(collections={"commons": {"rows": ROWS[0]}})
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+            try:
+                async with engine.connect() as conn:
+                    found = await conn.run_sync(
+                        lambda sync_conn: [
+                            sa.inspect(sync_conn).has_table(name, schema="commons")
+                            for name in ("rows", "missing")
+                        ]
+                    )
+                    with pytest.raises(sa.exc.NoSuchTableError):
+                        await conn.run_sync(
+                            lambda sync_conn: sa.inspect(sync_conn).get_columns(
+                                "missing", schema="commons"
+                            )
+                        )
+                    with pytest.raises(NotSupportedError):
+                        await conn.run_sync(
+                            lambda sync_conn: sa.inspect(sync_conn).get_view_names()
+                        )
+                    with pytest.raises(NotSupportedError):
+                        await conn.run_sync(
+                            lambda sync_conn: sa.inspect(sync_conn).get_view_definition(
+                                "rows"
+                            )
+                        )
+            finally:
+                await engine.dispose()
+        return fake, found
+
+    fake, found = asyncio.run(run())
+    assert found == [True, False]
+    assert not [path for method, path, body in fake.requests if "/views" in path]
+
+
+def test_query_lambdas():
+    def run_lambdas(sync_conn):
+        dialect = sync_conn.dialect
+        rows = dialect.execute_query_lambda(sync_conn, "top", {"n": 3}, version="v1")
+        cursor = sync_conn.connection.cursor()
+        try:
+            assert cursor.callproc("sales.top", {"n": 3}) == {"n": 3}
+            return rows, cursor.fetchall()
+        finally:
+            cursor.close()
+
+    async def run():
+        fake = FakeRockset(ROWS[:2])
+        fake.lambdas = {
+            ("commons", "top"): {"sql": "SELECT 1", "version": "v1"},
+            ("sales", "top"): {"sql": "SELECT 1", "version": "v2"},
+        }
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server)
+            async with engine.connect() as conn:
+                results = await conn.run_sync(run_lambdas)
+            await engine.dispose()
+        return fake, results
+
+    fake, (rows, callproc_rows) = asyncio.run(run())
+    assert rows == ROWS[:2]
+    assert callproc_rows == EXPECTED[:2]
+    assert [path for method, path, body in fake.requests] == [
+        "/v1/orgs/self/ws/commons/lambdas/top/versions/v1",
+        "/v1/orgs/self/ws/sales/lambdas/top/tags/latest",
+    ]
+
+
+@pytest.mark.parametrize(
+    "method, args",
+    [("add_documents", ("commons", "rows", [{"n": 1}])), ("poll", ()), ("cancel", ())],
+)
+def test_sync_driver_cursor_methods_are_not_supported(method, args):
+    cursor = AsyncConnection("http://127.0.0.1:1", "key").cursor()
+    with pytest.raises(NotSupportedError):
+        getattr(cursor, method)(*args)
+
+
+def check_sync_driver_options_are_ignored(query, **kwargs):
+    async def run():
+        fake = FakeRockset(ROWS)
+        async with serve(fake) as api_server:
+            engine = engine_for(api_server, query, **kwargs)
+            async with engine.connect() as conn:
+                result = await conn.execute(sa.text("SELECT n, name FROM commons.rows"))
+                rows = [tuple(row) for row in result]
+            await engine.dispose()
+        return rows
+
+    assert asyncio.run(run()) == EXPECTED
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "?bulk_batch_size=10&bulk_workers=2&bulk_wait_for_visibility=true",
+        "?prefetch_pages=2&pool_maxsize=4&cache_all_queries=false",
+        "?prepared_statements=true&prepared_statements_threshold=1",
+        "?async_queries=true",
+        "?slow_query_threshold=1",
+        "?max_retries=2&retry_backoff=0.1&retry_max_backoff=1",
+        "?adaptive_concurrency=true&concurrency_limit=4&max_concurrency=8",
+        "?virtual_instances=a:1,b:2&routing_policy=failover",
+    ],
+)
+def test_sync_driver_options_are_ignored(query):
+    check_sync_driver_options_are_ignored(query)
+
+
+def test_instrumentation_is_ignored():
+    check_sync_driver_options_are_ignored("", instrumentation=Instrumentation())
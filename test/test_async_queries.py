@@ -0,0 +1,130 @@
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.exceptions import OperationalError, ProgrammingError
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n FROM commons.rows"
+ROWS = [{"n": i} for i in range(25)]
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = ROWS
+    fake.running_polls = 2
+    return fake
+
+
+def submit(fake, **kwargs):
+    connection = rockset_sqlalchemy.connect(API_SERVER, fake.api_key, **kwargs)
+    cursor = connection.cursor(async_query=True)
+    cursor.execute(SQL)
+    return cursor
+
+
+def status_checks(fake, query_id):
+    return [
+        method
+        for method, path, body in fake.requests
+        if path.endswith("/queries/" + query_id)
+    ]
+
+
+def test_running_query_completes(fake):
+    cursor = submit(fake)
+    assert cursor.query_id is not None
+    assert fake.requests[0][2]["async"] is True
+    assert cursor.poll() is False
+    assert cursor.poll() is False
+    assert cursor.poll() is True
+    assert cursor.fetchall() == [(row["n"],) for row in ROWS]
+    assert status_checks(fake, cursor.query_id) == ["GET"] * 3
+
+
+def test_fetch_waits_for_running_query(fake):
+    cursor = submit(fake)
+    assert cursor.fetchone() == (0,)
+    assert cursor.fetchall() == [(row["n"],) for row in ROWS[1:]]
+    assert status_checks(fake, cursor.query_id) == ["GET"] * 3
+
+
+def test_results_are_read_a_page_at_a_time(fake):
+    cursor = submit(fake, page_size=10)
+    assert cursor.fetchmany(12) == [(row["n"],) for row in ROWS[:12]]
+    assert cursor.fetchall() == [(row["n"],) for row in ROWS[12:]]
+    pages = [
+        dict(fields).get("cursor")
+        for method, path, fields in fake.requests
+        if path.endswith("/pages")
+    ]
+    assert pages == [None, "10", "20"]
+
+
+def test_finished_query_returns_results_at_once(fake):
+    fake.running_polls = 0
+    cursor = submit(fake)
+    assert cursor.poll() is True
+    assert len(cursor.fetchall()) == len(ROWS)
+    assert status_checks(fake, cursor.query_id) == []
+
+
+def test_cancelled_query(fake):
+    fake.async_status = "CANCELLED"
+    cursor = submit(fake)
+    with pytest.raises(OperationalError, match="was cancelled") as e:
+        cursor.fetchall()
+    assert e.value.args[2] == "QUERY_CANCELLED"
+
+
+def test_failed_query(fake):
+    fake.async_status = "FAILED"
+    cursor = submit(fake)
+    with pytest.raises(ProgrammingError, match="Injected failure"):
+        cursor.fetchall()
+    # The error is reported once; the cursor is no longer waiting.
+    assert cursor.poll() is True
+
+
+def test_cancel(fake):
+    cursor = submit(fake)
+    cursor.cancel()
+    assert status_checks(fake, cursor.query_id) == ["DELETE"]
+    assert cursor.poll() is True
+    # Cancelling a query that is not running sends nothing.
+    cursor.cancel()
+    assert status_checks(fake, cursor.query_id) == ["DELETE"]
+
+
+def test_execute_option(fake):
+    with engine_for(fake).connect() as conn:
+        result = conn.execute(sa.text(SQL), execution_options={"rockset_async": True})
+        assert result.all() == [(row["n"],) for row in ROWS]
+    assert fake.requests[0][2]["async"] is True
+
+
+def test_submit_query(fake):
+    engine = engine_for(fake)
+    with engine.connect() as conn:
+        cursor = engine.dialect.submit_query(
+            conn, sa.text("SELECT n FROM commons.rows WHERE n < :n"), {"n": 5}
+        )
+        assert cursor.poll() is False
+        cursor.cancel()
+        assert status_checks(fake, cursor.query_id) == ["GET", "DELETE"]
+        cursor.close()
+    assert fake.requests[0][2]["sql"]["parameters"] == [
+        {"name": "n", "type": "int", "value": "5"}
+    ]
+
+
+def test_converted_types_of_running_query(fake):
+    fake.rows = [{"n": 1, "at": "2024-01-02T03:04:05.000006"}]
+    fake.column_types = {"at": "datetime"}
+    cursor = submit(fake, convert_types=True, page_size=10)
+    assert [column[1] for column in cursor.description] == ["int", "datetime"]
+    assert cursor.fetchall() == [(1, datetime.datetime(2024, 1, 2, 3, 4, 5, 6))]
@@ -0,0 +1,79 @@
+import datetime
+import decimal
+import enum
+
+import pytest
+
+from rockset_sqlalchemy.binding import bind_parameters
+
+UTC_PLUS_2 = datetime.timezone(datetime.timedelta(hours=2))
+
+
+class Color(str, enum.Enum):
+    RED = "red"
+
+
+@pytest.mark.parametrize(
+    "value, rockset_type, serialized",
+    [
+        (1, "int", "1"),
+        (-12345678901234567890, "int", "-12345678901234567890"),
+        (1.5, "float", "1.5"),
+        (0.1, "float", "0.1"),
+        (True, "bool", "true"),
+        (False, "bool", "false"),
+        ("it's", "string", "it's"),
+        ("", "string", ""),
+        (None, "null", "null"),
+        (datetime.datetime(2024, 1, 2, 3, 4, 5), "datetime", "2024-01-02T03:04:05"),
+        (
+            datetime.datetime(2024, 1, 2, 3, 4, 5, 6),
+            "datetime",
+            "2024-01-02T03:04:05.000006",
+        ),
+        # Aware datetimes are sent in UTC.
+        (
+            datetime.datetime(2024, 1, 2, 5, 4, 5, tzinfo=UTC_PLUS_2),
+            "datetime",
+            "2024-01-02T03:04:05",
+        ),
+        (datetime.date(2024, 1, 2), "date", "2024-01-02"),
+        (datetime.time(3, 4, 5), "time", "03:04:05"),
+        ([1, "a", None], "array", '[1, "a", null]'),
+        ((1, 2), "array", "[1, 2]"),
+        ({"a": {"b": [1]}}, "object", '{"a": {"b": [1]}}'),
+        ({"at": datetime.date(2024, 1, 2)}, "object", '{"at": "2024-01-02"}'),
+        # Subclasses are bound like their base class.
+        (Color.RED, "string", Color.RED),
+    ],
+)
+def test_bind(value, rockset_type, serialized):
+    assert bind_parameters({"p": value}) == [
+        {"name": "p", "type": rockset_type, "value": serialized}
+    ]
+
+
+def test_bind_several_parameters_in_order():
+    parameters = {"b": 1, "a": "x", "c": None}
+    assert bind_parameters(parameters) == [
+        {"name": "b", "type": "int", "value": "1"},
+        {"name": "a", "type": "string", "value": "x"},
+        {"name": "c", "type": "null", "value": "null"},
+    ]
+
+
+def test_signature_is_resolved_per_type():
+    # The same names with other value types bind with the new types.
+    assert bind_parameters({"p": 1})[0]["type"] == "int"
+    assert bind_parameters({"p": "1"})[0]["type"] == "string"
+    assert bind_parameters({"p": 1})[0]["type"] == "int"
+
+
+def test_no_parameters():
+    assert bind_parameters({}) == []
+    assert bind_parameters(None) == []
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError, match="not supported"):
+        bind_parameters({"p": decimal.Decimal("1.5")})
@@ -0,0 +1,148 @@
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy import cache
+from rockset_sqlalchemy.cache import CachedResult, ResultCache
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n, at FROM commons.rows"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1, "at": "2024-01-02T03:04:05.000006"}]
+    fake.column_types = {"at": "datetime"}
+    return fake
+
+
+def connect(fake, result_cache, **kwargs):
+    return rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, result_cache=result_cache, **kwargs
+    )
+
+
+def entry(rows):
+    return CachedResult(["n"], rows, len(rows), None)
+
+
+def test_repeated_query_is_served_from_cache(fake):
+    result_cache = ResultCache()
+    cursor = connect(fake, result_cache).cursor()
+    for _ in range(3):
+        cursor.execute(SQL)
+        assert cursor.fetchall() == [(1, "2024-01-02T03:04:05.000006")]
+    assert fake.queries() == [SQL]
+    assert result_cache.stats() == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 0,
+        "entries": 1,
+        "bytes": result_cache.stats()["bytes"],
+    }
+
+
+def test_parameters_are_part_of_the_key(fake):
+    cursor = connect(fake, ResultCache()).cursor()
+    cursor.execute("SELECT n FROM commons.rows WHERE n = :n", {"n": 1})
+    cursor.execute("SELECT n FROM commons.rows WHERE n = :n", {"n": 2})
+    cursor.execute("SELECT n FROM commons.rows WHERE n = :n", {"n": 1})
+    assert len(fake.queries()) == 2
+
+
+def test_writes_are_not_cached(fake):
+    result_cache = ResultCache()
+    cursor = connect(fake, result_cache).cursor()
+    cursor.execute("INSERT INTO commons.rows SELECT 1 AS n")
+    cursor.execute("INSERT INTO commons.rows SELECT 1 AS n")
+    assert len(fake.queries()) == 2
+    assert len(result_cache) == 0
+
+
+def test_entries_expire_after_ttl(fake, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    result_cache = ResultCache(ttl=10)
+    cursor = connect(fake, result_cache).cursor()
+    cursor.execute(SQL)
+    now[0] += 9
+    cursor.execute(SQL)
+    assert len(fake.queries()) == 1
+    now[0] += 2
+    cursor.execute(SQL)
+    assert len(fake.queries()) == 2
+    assert result_cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    result_cache = ResultCache(max_entries=2)
+    result_cache.put("a", entry([(1,)]))
+    result_cache.put("b", entry([(2,)]))
+    assert result_cache.get("a") is not None
+    result_cache.put("c", entry([(3,)]))
+    assert result_cache.get("b") is None
+    assert result_cache.get("a") is not None
+    assert result_cache.get("c") is not None
+    assert result_cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_beyond_max_bytes():
+    size = entry([(1,)]).size
+    result_cache = ResultCache(max_bytes=2 * size)
+    for key in "abc":
+        result_cache.put(key, entry([(1,)]))
+    assert result_cache.get("a") is None
+    assert result_cache.stats()["evictions"] == 1
+    assert result_cache.stats()["bytes"] == 2 * size
+
+    # Results larger than the whole cache are not stored.
+    result_cache.put("d", entry([(i,) for i in range(100)]))
+    assert result_cache.get("d") is None
+    assert len(result_cache) == 2
+
+
+def test_statements_opt_out_of_cache(fake):
+    engine = engine_for(fake, "?result_cache_ttl=60")
+    with engine.connect() as conn:
+        for _ in range(2):
+            conn.execute(
+                sa.text(SQL), execution_options={"rockset_result_cache": False}
+            )
+        for _ in range(2):
+            conn.execute(sa.text(SQL))
+    assert len(fake.queries()) == 3
+
+
+def test_statements_opt_in_to_cache(fake):
+    engine = engine_for(fake, "?result_cache_ttl=60&cache_all_queries=false")
+    with engine.connect() as conn:
+        for _ in range(2):
+            conn.execute(sa.text(SQL))
+        for _ in range(2):
+            conn.execute(sa.text(SQL), execution_options={"rockset_result_cache": True})
+    assert len(fake.queries()) == 3
+
+
+def test_hit_is_described_like_miss(fake):
+    cursor = connect(fake, ResultCache(), convert_types=True).cursor()
+    cursor.execute(SQL)
+    miss = (cursor.description, cursor.rowcount, cursor.fetchall())
+    cursor.execute(SQL)
+    hit = (cursor.description, cursor.rowcount, cursor.fetchall())
+    assert len(fake.queries()) == 1
+    assert hit == miss
+    assert [column[1] for column in hit[0]] == ["int", "datetime"]
+    assert hit[2] == [(1, datetime.datetime(2024, 1, 2, 3, 4, 5, 6))]
+    assert cursor._fetch_columns()[1] == {"n": "int", "at": "datetime"}
+
+
+def test_engine_hit_returns_converted_values(fake):
+    engine = engine_for(fake, "?result_cache_ttl=60")
+    with engine.connect() as conn:
+        results = [conn.execute(sa.text(SQL)).all() for _ in range(2)]
+    assert len(fake.queries()) == 1
+    assert results[0] == results[1] == [(1, datetime.datetime(2024, 1, 2, 3, 4, 5, 6))]
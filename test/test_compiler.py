@@ -0,0 +1,44 @@
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from rockset_sqlalchemy.sqlalchemy import RocksetDialect
+
+TABLE = sa.Table(
+    "rows",
+    sa.MetaData(),
+    sa.Column("n", sa.Integer),
+    sa.Column("name", sa.String),
+    sa.Column("at", sa.DateTime),
+    schema="commons",
+)
+
+
+def compile(statement, **kw):
+    return statement.compile(dialect=RocksetDialect(), **kw)
+
+
+@pytest.mark.parametrize("column", [TABLE.c.n, TABLE.c.name])
+def test_in_list_is_one_array_parameter(column):
+    compiled = compile(sa.select(column).where(column.in_([1, 2, 3])))
+    assert "WHERE ARRAY_CONTAINS(:{}_1, ".format(column.name) in str(compiled)
+    assert list(compiled.construct_params().values()) == [[1, 2, 3]]
+
+
+def test_not_in_list():
+    compiled = compile(sa.select(TABLE.c.n).where(TABLE.c.n.not_in([1, 2])))
+    assert "WHERE NOT ARRAY_CONTAINS(:n_1, " in str(compiled)
+
+
+def test_in_list_of_dates_is_expanded():
+    values = [datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2)]
+    compiled = compile(sa.select(TABLE.c.at).where(TABLE.c.at.in_(values)))
+    assert "ARRAY_CONTAINS" not in str(compiled)
+    assert "IN (__[POSTCOMPILE_at_1])" in str(compiled)
+
+
+def test_in_list_with_literal_binds():
+    statement = sa.select(TABLE.c.n).where(TABLE.c.n.in_([1, 2]))
+    sql = str(compile(statement, compile_kwargs={"literal_binds": True}))
+    assert "IN (1, 2)" in sql
@@ -0,0 +1,107 @@
+import functools
+
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy import cursor, documents
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1}]
+    return fake
+
+
+def test_connect_sends_no_requests(fake):
+    connection = rockset_sqlalchemy.connect(API_SERVER, fake.api_key)
+    connection.cursor()
+    assert fake.requests == []
+
+
+def test_validate_on_connect_pings_once(fake):
+    rockset_sqlalchemy.connect(API_SERVER, fake.api_key, validate_on_connect=True)
+    assert fake.queries() == ["SELECT 1"]
+
+
+def test_engine_connect_sends_no_requests(fake):
+    with engine_for(fake).connect():
+        pass
+    assert fake.requests == []
+
+
+def test_engine_validate_on_connect(fake):
+    engine = engine_for(fake, "?validate_on_connect=true")
+    with engine.connect():
+        pass
+    with engine.connect():
+        pass
+    # The pooled connection is validated once, when it is created.
+    assert fake.queries() == ["SELECT 1"]
+
+
+def test_pool_pre_ping_pings_each_checkout(fake):
+    engine = engine_for(fake, pool_pre_ping=True)
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(sa.text("SELECT n FROM commons.rows")).all()
+    # The first checkout creates the connection, which is not pinged.
+    assert (
+        fake.queries()
+        == ["SELECT n FROM commons.rows"]
+        + [
+            "SELECT 1",
+            "SELECT n FROM commons.rows",
+        ]
+        * 2
+    )
+
+
+def test_failed_ping_invalidates_connection(fake):
+    engine = engine_for(fake, pool_pre_ping=True)
+    with engine.connect() as conn:
+        first = conn.connection.dbapi_connection
+    fake.disconnect()
+    with engine.connect() as conn:
+        assert conn.connection.dbapi_connection is not first
+        assert conn.execute(sa.text("SELECT n FROM commons.rows")).all() == [(1,)]
+    assert fake.queries() == ["SELECT 1", "SELECT n FROM commons.rows"]
+
+
+def test_lost_connection_invalidates_connection(fake):
+    fake.disconnect()
+    with engine_for(fake).connect() as conn:
+        with pytest.raises(sa.exc.OperationalError) as e:
+            conn.execute(sa.text("SELECT n FROM commons.rows"))
+        assert e.value.connection_invalidated
+
+
+def test_cancelled_query_keeps_connection(fake):
+    fake.running_polls = 1
+    fake.async_status = "CANCELLED"
+    with engine_for(fake).connect() as conn:
+        with pytest.raises(sa.exc.OperationalError, match="was cancelled") as e:
+            conn.execute(
+                sa.text("SELECT n FROM commons.rows"),
+                execution_options={"rockset_async": True},
+            )
+        assert not e.value.connection_invalidated
+        assert conn.execute(sa.text("SELECT n FROM commons.rows")).all() == [(1,)]
+
+
+def test_visibility_timeout_keeps_connection(fake, monkeypatch):
+    monkeypatch.setattr(
+        cursor,
+        "add_documents",
+        functools.partial(documents.add_documents, visibility_timeout=0),
+    )
+    fake.offsets_visible = False
+    table = sa.table("rows", sa.column("_id"), sa.column("n"), schema="commons")
+    with engine_for(fake, "?bulk_wait_for_visibility=true").connect() as conn:
+        with pytest.raises(sa.exc.OperationalError, match="Timed out") as e:
+            conn.execute(table.insert(), [{"_id": "1", "n": 1}])
+        assert not e.value.connection_invalidated
+        assert conn.execute(sa.text("SELECT n FROM commons.rows")).all() == [(1,)]
@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+
+from rockset_sqlalchemy import conversion
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (
+            "2024-01-02T03:04:05.123456Z",
+            datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, UTC),
+        ),
+        ("2024-01-02T03:04:05", datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)),
+        (
+            "2024-01-02T05:04:05+02:00",
+            datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+        ),
+        (
+            {"__rockset_type": "timestamp", "value": "2024-01-02T03:04:05Z"},
+            datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+        ),
+        (None, None),
+    ],
+)
+def test_timestamps_are_aware_utc(value, expected):
+    (convert,) = [
+        convert
+        for _, convert in conversion.column_converters(["t"], {"t": "timestamp"})
+    ]
+    # The column converter (fast path) and the per-value parser agree.
+    for parsed in [conversion.parse_timestamp(value), convert([value])[0]]:
+        assert parsed == expected
+        if expected is not None:
+            assert parsed.tzinfo is UTC
@@ -0,0 +1,79 @@
+import sqlalchemy as sa
+
+from rockset_sqlalchemy.cache import ResultCache
+from rockset_sqlalchemy.prepared import PreparedStatements
+from rockset_sqlalchemy.routing import VirtualInstanceRouter
+from rockset_sqlalchemy.sqlalchemy import RocksetDialect
+
+
+def connect_args(query, **kwargs):
+    dialect = RocksetDialect(**kwargs)
+    url = sa.engine.make_url("rockset://key@api.usw2a1.rockset.com/vi{}".format(query))
+    args, kwargs = dialect.create_connect_args(url)
+    assert args == []
+    return dialect, kwargs
+
+
+def test_defaults():
+    _, kwargs = connect_args("")
+    assert kwargs == {
+        "api_server": "https://api.usw2a1.rockset.com",
+        "api_key": "key",
+        "virtual_instance": "vi",
+        "convert_types": True,
+    }
+
+
+def test_connection_options():
+    _, kwargs = connect_args(
+        "?stream_results=true&page_size=10&json_decoder=json&max_retries=0&unknown=1"
+    )
+    assert kwargs["stream_results"] is True
+    assert kwargs["page_size"] == 10
+    assert kwargs["json_decoder"] == "json"
+    assert kwargs["max_retries"] == 0
+    assert "unknown" not in kwargs
+
+
+def test_dialect_options(tmp_path):
+    dialect, _ = connect_args(
+        "?reflection_workers=2&metadata_cache={}&metadata_cache_ttl=60".format(
+            tmp_path / "m.sqlite"
+        )
+    )
+    assert dialect.reflection_workers == 2
+    assert dialect.metadata_cache.ttl == 60
+
+
+def test_result_cache():
+    _, kwargs = connect_args("?result_cache_ttl=5&result_cache_max_entries=10")
+    assert isinstance(kwargs["result_cache"], ResultCache)
+    assert kwargs["result_cache"].ttl == 5
+
+
+def test_prepared_statements():
+    assert "prepared_statements" not in connect_args("")[1]
+    _, kwargs = connect_args("?prepared_statements=true")
+    assert isinstance(kwargs["prepared_statements"], PreparedStatements)
+    _, kwargs = connect_args("?prepared_statements_threshold=2")
+    assert isinstance(kwargs["prepared_statements"], PreparedStatements)
+    _, kwargs = connect_args(
+        "?prepared_statements=false&prepared_statements_threshold=2"
+    )
+    assert "prepared_statements" not in kwargs
+
+
+def test_router():
+    assert "router" not in connect_args("?routing_policy=failover")[1]
+    _, kwargs = connect_args("?virtual_instances=a:1,2&routing_policy=failover")
+    router = kwargs["router"]
+    assert isinstance(router, VirtualInstanceRouter)
+    assert router.policy == "failover"
+    assert router.resolve("a") == "1"
+    assert router.resolve("2") == "2"
+
+
+def test_slow_query_threshold():
+    dialect, kwargs = connect_args("?slow_query_threshold=0.5")
+    assert kwargs["instrumentation"] is dialect.instrumentation
+    assert dialect.instrumentation.slow_query_threshold == 0.5
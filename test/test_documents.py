@@ -0,0 +1,48 @@
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.exceptions import DocumentsError
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+TABLE = sa.Table(
+    "rows",
+    sa.MetaData(),
+    sa.Column("_id", sa.String),
+    sa.Column("n", sa.Integer),
+    sa.Column("at", sa.DateTime),
+    schema="commons",
+)
+
+
+def test_insert_writes_documents_in_batches(fake):
+    with engine_for(fake, "?bulk_batch_size=10").connect() as conn:
+        result = conn.execute(
+            TABLE.insert(), [{"_id": str(i), "n": i} for i in range(25)]
+        )
+        assert result.rowcount == 25
+    assert fake.queries() == []
+    assert sorted(doc["n"] for doc in fake.documents) == list(range(25))
+    batches = [body for method, path, body in fake.requests if path.endswith("/docs")]
+    assert sorted(len(batch["data"]) for batch in batches) == [5, 10, 10]
+
+
+def test_insert_with_sql_expression_runs_as_sql(fake):
+    with engine_for(fake).connect() as conn:
+        conn.execute(TABLE.insert().values(_id="3", n=1, at=sa.func.now()))
+    assert fake.documents == []
+    (query,) = fake.queries()
+    assert query.startswith("INSERT INTO")
+    assert "now()" in query
+
+
+def test_rejected_documents(fake):
+    fake.reject_ids = {"2"}
+    connection = rockset_sqlalchemy.connect(API_SERVER, fake.api_key)
+    cursor = connection.cursor()
+    with pytest.raises(DocumentsError) as e:
+        cursor.add_documents("commons", "rows", [{"_id": str(i)} for i in range(4)])
+    assert e.value.failures == [(2, "2", "Rejected")]
+    assert [doc["_id"] for doc in fake.documents] == ["0", "1", "3"]
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.client import clear_clients
+
+from .fake_rockset import API_SERVER, FakeRockset, install, new_api_key
+
+
+class InFlight(object):
+    """A query handler recording the order of the queries and how many were
+    in flight at once."""
+
+    def __init__(self):
+        self.values = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql, body):
+        with self._lock:
+            self.values.append(body["sql"]["parameters"][0]["value"])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return [{"n": 1}]
+
+
+@pytest.fixture
+def connection():
+    api_key = new_api_key()
+    fake = install(FakeRockset(), api_key)
+    fake.query_handler = InFlight()
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, api_key, cache_all_queries=False, executemany_workers=4
+    )
+    connection.handler = fake.query_handler
+    yield connection
+    clear_clients()
+
+
+def test_reads_run_concurrently(connection):
+    cursor = connection.cursor()
+    cursor.executemany("SELECT :n AS n", [{"n": i} for i in range(8)])
+    assert sorted(connection.handler.values, key=int) == [str(i) for i in range(8)]
+    assert connection.handler.max_in_flight > 1
+
+
+def test_writes_run_in_order(connection):
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO commons.rows SELECT :n AS n", [{"n": i} for i in range(8)]
+    )
+    assert connection.handler.values == [str(i) for i in range(8)]
+    assert connection.handler.max_in_flight == 1
@@ -0,0 +1,181 @@
+import logging
+
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.instrumentation import (
+    Histogram,
+    Instrumentation,
+    MetricsRegistry,
+    QueryEvent,
+)
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n FROM commons.rows"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": i} for i in range(3)]
+    return fake
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def instrumentation(events):
+    return Instrumentation(listeners=[events.append])
+
+
+def connect(fake, instrumentation, **kwargs):
+    return rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, instrumentation=instrumentation, **kwargs
+    )
+
+
+def test_event_is_recorded_once_result_is_consumed(fake, instrumentation, events):
+    cursor = connect(fake, instrumentation).cursor()
+    cursor.execute(SQL)
+    assert cursor.fetchmany(2) == [(0,), (1,)]
+    assert events == []
+    cursor.fetchall()
+    cursor.fetchall()
+    cursor.close()
+    [event] = events
+    assert event.sql == SQL
+    assert event.query_id == cursor.query_id
+    assert event.rows == 3
+    assert event.error is None
+    assert event.server_stats["elapsed_time_ms"] == 1
+    assert {"bind", "http", "build"} <= set(event.phases)
+    assert event.elapsed == pytest.approx(sum(event.phases.values()))
+
+
+def test_decode_phase_with_json_decoder(fake, instrumentation, events):
+    cursor = connect(fake, instrumentation, json_decoder="json").cursor()
+    cursor.execute(SQL)
+    cursor.fetchall()
+    [event] = events
+    assert "decode" in event.phases
+    assert event.response_bytes > 0
+
+
+def test_event_is_recorded_on_reexecute_and_close(fake, instrumentation, events):
+    cursor = connect(fake, instrumentation).cursor()
+    cursor.execute(SQL)
+    cursor.fetchone()
+    cursor.execute("SELECT n FROM commons.rows LIMIT 1")
+    assert [event.sql for event in events] == [SQL]
+    assert events[0].rows == 1
+    cursor.close()
+    assert len(events) == 2
+
+
+def test_failed_query_is_recorded(fake, instrumentation, events):
+    fake.fail(400)
+    cursor = connect(fake, instrumentation).cursor()
+    with pytest.raises(rockset_sqlalchemy.Error) as e:
+        cursor.execute(SQL)
+    [event] = events
+    assert event.error is e.value
+    cursor.close()
+    assert len(events) == 1
+    assert instrumentation.metrics.snapshot()["counters"]["errors"] == 1
+
+
+def test_slow_query_is_logged(fake, caplog):
+    instrumentation = Instrumentation(slow_query_threshold=0)
+    cursor = connect(fake, instrumentation).cursor()
+    with caplog.at_level(logging.WARNING, logger="rockset_sqlalchemy.slow_query"):
+        cursor.execute(SQL)
+        cursor.fetchall()
+    [record] = caplog.records
+    assert record.name == "rockset_sqlalchemy.slow_query"
+    assert record.levelno == logging.WARNING
+    assert record.getMessage().startswith("Slow query " + cursor.query_id)
+    assert record.getMessage().endswith(SQL)
+
+
+def test_fast_query_is_not_logged(fake, caplog):
+    instrumentation = Instrumentation(slow_query_threshold=60)
+    cursor = connect(fake, instrumentation).cursor()
+    with caplog.at_level(logging.WARNING, logger="rockset_sqlalchemy.slow_query"):
+        cursor.execute(SQL)
+        cursor.fetchall()
+    assert caplog.records == []
+
+
+def test_failing_listener_is_logged(fake, caplog, events):
+    def fail(event):
+        raise ValueError("listener")
+
+    instrumentation = Instrumentation(listeners=[fail, events.append])
+    cursor = connect(fake, instrumentation).cursor()
+    cursor.execute(SQL)
+    cursor.fetchall()
+    assert len(events) == 1
+    assert "listener failed" in caplog.text
+
+
+def test_metrics(fake):
+    instrumentation = Instrumentation()
+    cursor = connect(fake, instrumentation).cursor()
+    for _ in range(2):
+        cursor.execute(SQL)
+        cursor.fetchall()
+    snapshot = instrumentation.metrics.snapshot()
+    assert snapshot["counters"] == {"queries": 2, "rows": 6}
+    assert snapshot["histograms"]["query_seconds"]["count"] == 2
+    assert snapshot["histograms"]["http_seconds"]["count"] == 2
+    assert snapshot["histograms"]["server_elapsed_seconds"]["sum"] == 0.002
+    assert snapshot["histograms"]["server_throttled_seconds"]["max"] == 0
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.snapshot() == {
+        "count": 4,
+        "sum": 2.65,
+        "max": 2.0,
+        "buckets": {0.1: 2, 1.0: 3, float("inf"): 4},
+    }
+
+
+def test_registry_records_event_phases():
+    metrics = MetricsRegistry(buckets=(1.0,))
+    event = QueryEvent(SQL, {})
+    event.add_time("http", 0.5)
+    event.add_time("http", 1.0)
+    event.add_time("build", 0.25)
+    event.retries = 2
+    event.throttled = 1
+    metrics.record_query(event)
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {
+        "queries": 1,
+        "rows": 0,
+        "retries": 2,
+        "throttled": 1,
+    }
+    assert snapshot["histograms"]["http_seconds"]["buckets"] == {
+        1.0: 0,
+        float("inf"): 1,
+    }
+    assert snapshot["histograms"]["query_seconds"]["sum"] == 1.75
+
+
+def test_engine_slow_query_threshold(fake, caplog):
+    engine = engine_for(fake, "?slow_query_threshold=0")
+    with caplog.at_level(logging.WARNING, logger="rockset_sqlalchemy.slow_query"):
+        with engine.connect() as conn:
+            conn.execute(sa.text(SQL)).all()
+    assert len(caplog.records) == 1
+    assert engine.dialect.instrumentation.metrics.snapshot()["counters"]["rows"] == 3
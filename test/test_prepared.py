@@ -0,0 +1,157 @@
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.prepared import LAMBDA_PREFIX, PreparedStatements
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n FROM commons.rows WHERE n = :n"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1}]
+    return fake
+
+
+def connect(fake, prepared):
+    return rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, prepared_statements=prepared
+    )
+
+
+def lambda_name(sql):
+    return LAMBDA_PREFIX + PreparedStatements.make_key(sql)
+
+
+def lambda_runs(fake):
+    return [
+        path
+        for method, path, body in fake.requests
+        if method == "POST" and "/lambdas/" in path
+    ]
+
+
+def execute(cursor, sql=SQL, times=1):
+    for _ in range(times):
+        cursor.execute(sql, {"n": 1})
+        assert cursor.fetchall() == [(1,)]
+
+
+def test_statement_runs_as_text_below_threshold(fake):
+    prepared = PreparedStatements(threshold=3)
+    execute(connect(fake, prepared).cursor(), times=2)
+    assert fake.lambdas == {}
+    assert fake.queries() == [SQL] * 2
+    assert prepared.stats()["prepared"] == 0
+
+
+def test_lambda_is_created_at_threshold(fake):
+    prepared = PreparedStatements(threshold=3)
+    execute(connect(fake, prepared).cursor(), times=5)
+    assert list(fake.lambdas) == [("commons", lambda_name(SQL))]
+    assert fake.lambdas["commons", lambda_name(SQL)]["sql"] == SQL
+    # Two executions as text, then three of the lambda's version.
+    assert fake.queries() == [SQL] * 2
+    version = fake.lambdas["commons", lambda_name(SQL)]["version"]
+    assert (
+        lambda_runs(fake)
+        == [
+            "{}/v1/orgs/self/ws/commons/lambdas/{}/versions/{}".format(
+                API_SERVER, lambda_name(SQL), version
+            )
+        ]
+        * 3
+    )
+    assert prepared.stats() == {
+        "hits": 2,
+        "prepared": 1,
+        "evictions": 0,
+        "entries": 1,
+    }
+
+
+def test_writes_are_not_prepared(fake):
+    prepared = PreparedStatements(threshold=1)
+    cursor = connect(fake, prepared).cursor()
+    for _ in range(2):
+        cursor.execute("INSERT INTO commons.rows SELECT 1 AS n")
+    assert fake.lambdas == {}
+
+
+def test_existing_lambda_is_adopted(fake):
+    fake.lambdas["commons", lambda_name(SQL)] = {"sql": SQL, "version": "v1"}
+    prepared = PreparedStatements(threshold=1)
+    execute(connect(fake, prepared).cursor(), times=2)
+    assert fake.queries() == []
+    assert lambda_runs(fake)[-1].endswith("/versions/v1")
+    # The lambda was created elsewhere and is left in place.
+    prepared.clear()
+    assert ("commons", lambda_name(SQL)) in fake.lambdas
+
+
+def test_least_recently_used_lambda_is_deleted(fake):
+    other = "SELECT n FROM commons.rows WHERE n > :n"
+    prepared = PreparedStatements(threshold=1, max_entries=1)
+    cursor = connect(fake, prepared).cursor()
+    execute(cursor)
+    cursor.execute(other, {"n": 0})
+    assert list(fake.lambdas) == [("commons", lambda_name(other))]
+    assert prepared.stats()["evictions"] == 1
+
+
+def test_clear_deletes_lambdas(fake):
+    prepared = PreparedStatements(threshold=1)
+    execute(connect(fake, prepared).cursor())
+    assert len(fake.lambdas) == 1
+    prepared.clear()
+    assert fake.lambdas == {}
+    assert len(prepared) == 0
+
+
+def test_deleted_lambda_falls_back_to_text(fake):
+    prepared = PreparedStatements(threshold=1)
+    cursor = connect(fake, prepared).cursor()
+    execute(cursor)
+    fake.lambdas.clear()
+    execute(cursor)
+    assert fake.queries() == [SQL]
+    # The statement is prepared again on its next execution.
+    execute(cursor)
+    assert list(fake.lambdas) == [("commons", lambda_name(SQL))]
+    assert fake.queries() == [SQL]
+
+
+def test_failing_lambda_falls_back_to_text_for_good(fake):
+    prepared = PreparedStatements(threshold=1)
+    cursor = connect(fake, prepared).cursor()
+    execute(cursor)
+    fake.fail(400, path="/versions/")
+    execute(cursor, times=3)
+    assert fake.queries() == [SQL] * 3
+    assert len(lambda_runs(fake)) == 2
+    assert len(prepared) == 0
+
+
+def test_lambda_that_cannot_be_created_falls_back_to_text(fake):
+    fake.fail(400, path="/lambdas")
+    prepared = PreparedStatements(threshold=1)
+    execute(connect(fake, prepared).cursor(), times=2)
+    assert fake.lambdas == {}
+    assert fake.queries() == [SQL] * 2
+
+
+def test_statements_opt_out_of_preparing(fake):
+    engine = engine_for(
+        fake, "?prepared_statements=true&prepared_statements_threshold=1"
+    )
+    with engine.connect() as conn:
+        for _ in range(2):
+            conn.execute(
+                sa.text(SQL), {"n": 1}, execution_options={"rockset_prepare": False}
+            )
+        assert fake.lambdas == {}
+        conn.execute(sa.text(SQL), {"n": 1})
+    assert list(fake.lambdas) == [("commons", lambda_name(SQL))]
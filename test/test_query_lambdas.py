@@ -0,0 +1,59 @@
+import pytest
+
+import rockset_sqlalchemy
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n FROM sales.rows WHERE n < :n"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1}, {"n": 2}]
+    fake.lambdas = {
+        ("sales", "top"): {"sql": SQL, "version": "v2"},
+        ("commons", "top"): {"sql": SQL, "version": "v1"},
+    }
+    return fake
+
+
+def lambda_requests(fake):
+    return [
+        (path.split("/lambdas/")[1], body["parameters"])
+        for method, path, body in fake.requests
+        if "/lambdas/" in path
+    ]
+
+
+def test_execute_query_lambda(fake):
+    engine = engine_for(fake)
+    with engine.connect() as conn:
+        rows = engine.dialect.execute_query_lambda(
+            conn, "top", {"n": 3}, version="v2", schema="sales"
+        )
+        assert rows == [{"n": 1}, {"n": 2}]
+        engine.dialect.execute_query_lambda(conn, "top", tag="stable")
+    assert lambda_requests(fake) == [
+        ("top/versions/v2", [{"name": "n", "type": "int", "value": "3"}]),
+        ("top/tags/stable", []),
+    ]
+
+
+def test_callproc(fake):
+    cursor = rockset_sqlalchemy.connect(API_SERVER, fake.api_key).cursor()
+    assert cursor.callproc("sales.top:v2", {"n": 3}) == {"n": 3}
+    assert cursor.fetchall() == [(1,), (2,)]
+    cursor.callproc("top")
+    assert lambda_requests(fake) == [
+        ("top/versions/v2", [{"name": "n", "type": "int", "value": "3"}]),
+        ("top/tags/latest", []),
+    ]
+    assert fake.requests[-1][1].split("/ws/")[1].startswith("commons/")
+
+
+def test_get_query_lambda_names(fake):
+    engine = engine_for(fake)
+    with engine.connect() as conn:
+        assert engine.dialect.get_query_lambda_names(conn) == ["top", "top"]
+        assert engine.dialect.get_query_lambda_names(conn, "sales") == ["top"]
@@ -0,0 +1,96 @@
+import pytest
+import sqlalchemy as sa
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+COLLECTIONS = 300
+SAMPLE = {"_id": "1", "n": 1, "name": "x", "address": {"city": "Berlin"}}
+
+
+@pytest.fixture
+def fake(fake):
+    names = ["events_{:03d}".format(i) for i in range(COLLECTIONS)]
+    fake.collections = {"commons": {name: SAMPLE for name in names}}
+    return fake
+
+
+def describes(fake):
+    return [sql for sql in fake.queries() if sql.startswith("DESCRIBE")]
+
+
+def listings(fake):
+    return [
+        path for method, path, body in fake.requests if path.endswith("/collections")
+    ]
+
+
+def test_reflect_workspace(fake):
+    metadata = sa.MetaData()
+    metadata.reflect(engine_for(fake), schema="commons")
+    assert len(metadata.tables) == COLLECTIONS
+    table = metadata.tables["commons.events_000"]
+    assert [column.name for column in table.columns] == [
+        "_id",
+        "n",
+        "name",
+        "address",
+    ]
+    assert len(listings(fake)) == 1
+    assert len(describes(fake)) == COLLECTIONS
+
+
+def test_metadata_cache_survives_restarts(fake, tmp_path):
+    query = "?metadata_cache={}".format(tmp_path / "metadata.sqlite")
+    sa.MetaData().reflect(engine_for(fake, query), schema="commons")
+    assert len(describes(fake)) == COLLECTIONS
+
+    # A new engine, as after a restart, reflects from the cache.
+    fake.requests.clear()
+    metadata = sa.MetaData()
+    metadata.reflect(engine_for(fake, query), schema="commons")
+    assert len(metadata.tables) == COLLECTIONS
+    assert fake.requests == []
+
+
+def test_get_columns_records_fingerprint(fake, tmp_path):
+    engine = engine_for(fake, "?metadata_cache={}".format(tmp_path / "m.sqlite"))
+    sa.inspect(engine).get_columns("events_000", schema="commons")
+    cache = engine.dialect.metadata_cache
+    args = (API_SERVER, "commons", "events_000")
+    assert cache.get_columns(*args, fingerprint="2024-01-01T00:00:00Z") is not None
+
+    # The collection is dropped and re-created with other fields; once the
+    # listing is refreshed, its columns are reflected again.
+    fake.collections["commons"]["events_000"] = {"_id": "1", "m": 1.5}
+    fake.created_at["events_000"] = "2024-06-01T00:00:00Z"
+    cache.set_collections(API_SERVER, "commons", {"events_000": "2024-06-01T00:00:00Z"})
+    assert cache.get_columns(*args) is None
+    table = sa.Table(
+        "events_000", sa.MetaData(), schema="commons", autoload_with=engine
+    )
+    assert [column.name for column in table.columns] == ["_id", "m"]
+
+
+def test_views(fake):
+    fake.views = {"commons": {"recent": "SELECT * FROM commons.events_000"}}
+    fake.rows = [{"n": 1, "name": "x"}, {"n": None, "name": "y"}]
+    inspector = sa.inspect(engine_for(fake))
+    assert inspector.get_view_names(schema="commons") == ["recent"]
+    assert inspector.get_view_names(schema="other") == []
+    assert (
+        inspector.get_view_definition("recent", schema="commons")
+        == "SELECT * FROM commons.events_000"
+    )
+    with pytest.raises(sa.exc.NoSuchTableError):
+        inspector.get_view_definition("missing", schema="commons")
+
+    columns = inspector.get_columns("recent", schema="commons")
+    assert [(c["name"], c["nullable"]) for c in columns] == [
+        ("n", True),
+        ("name", False),
+    ]
+    assert inspector.has_table("recent", schema="commons")
+    assert not inspector.has_table("missing", schema="commons")
+    with pytest.raises(sa.exc.NoSuchTableError):
+        inspector.get_columns("missing", schema="commons")
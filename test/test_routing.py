@@ -0,0 +1,175 @@
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy import routing
+from rockset_sqlalchemy.exceptions import ProgrammingError, TransportError
+from rockset_sqlalchemy.routing import VirtualInstanceRouter
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+SQL = "SELECT n FROM commons.rows"
+INSERT = "INSERT INTO commons.rows SELECT 1 AS n"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1}]
+    return fake
+
+
+def connect(fake, router):
+    return rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, router=router, max_retries=0
+    )
+
+
+def vi_path(vi):
+    return "/virtualinstances/{}/queries".format(vi)
+
+
+def query_vis(fake):
+    """Return the virtual instance of each query request."""
+    return [
+        path.split("/virtualinstances/")[1].split("/")[0]
+        for method, path, body in fake.requests
+        if path.endswith("/queries") and method == "POST"
+    ]
+
+
+def test_round_robin():
+    router = VirtualInstanceRouter(["a", "b", "c"])
+    assert [router.candidates()[0] for _ in range(4)] == ["a", "b", "c", "a"]
+    assert router.candidates() == ["b", "c", "a"]
+
+
+def test_least_outstanding():
+    router = VirtualInstanceRouter(["a", "b", "c"], policy="least_outstanding")
+    router.start("a")
+    router.start("c")
+    assert router.candidates() == ["b", "a", "c"]
+    router.start("b")
+    router.start("b")
+    assert router.candidates()[0] in ("a", "c")
+    router.finish("b")
+    router.finish("b")
+    router.finish("c")
+    assert sorted(router.candidates()[:2]) == ["b", "c"]
+
+
+def test_failover_prefers_first_healthy():
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    assert [router.candidates() for _ in range(2)] == [["a", "b"]] * 2
+
+
+def test_unknown_policy_and_name():
+    with pytest.raises(ProgrammingError, match="Unknown routing policy"):
+        VirtualInstanceRouter(["a"], policy="random")
+    with pytest.raises(ProgrammingError, match="Unknown virtual instance"):
+        VirtualInstanceRouter({"dashboards": "a"}).resolve("batch")
+
+
+def test_unavailable_errors():
+    assert routing.is_unavailable(ProgrammingError("Throttled", 429, "RATE"))
+    assert routing.is_unavailable(ProgrammingError("Failed", 503, "INTERNAL"))
+    assert routing.is_unavailable(TransportError("Connection aborted."))
+    assert not routing.is_unavailable(ProgrammingError("Bad SQL", 400, "QUERY"))
+
+
+def test_unhealthy_instance_is_tried_last_until_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: now[0])
+    router = VirtualInstanceRouter(
+        ["a", "b"], policy="failover", failure_threshold=2, cooldown=30
+    )
+    for _ in range(2):
+        router.start("a")
+        router.finish("a", failed=True)
+    assert router.candidates() == ["b", "a"]
+    assert not router.stats()["a"]["healthy"]
+    now[0] += 31
+    assert router.candidates() == ["a", "b"]
+    # A success resets the failure count.
+    router.start("a")
+    router.finish("a")
+    assert router.stats()["a"]["failures"] == 0
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_read_fails_over(fake, status):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    fake.fail(status, path=vi_path("a"))
+    cursor = connect(fake, router).cursor()
+    cursor.execute(SQL)
+    assert cursor.fetchall() == [(1,)]
+    assert query_vis(fake) == ["a", "b"]
+    assert router.stats()["a"]["failures"] == 1
+
+
+def test_read_fails_over_on_lost_connection(fake):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    fake.disconnect(path=vi_path("a"))
+    cursor = connect(fake, router).cursor()
+    cursor.execute(SQL)
+    assert cursor.fetchall() == [(1,)]
+    assert query_vis(fake) == ["a", "b"]
+
+
+def test_last_instance_error_is_raised(fake):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    fake.fail(503, times=2)
+    with pytest.raises(rockset_sqlalchemy.Error):
+        connect(fake, router).cursor().execute(SQL)
+    assert query_vis(fake) == ["a", "b"]
+
+
+def test_bad_request_does_not_fail_over(fake):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    fake.fail(400, path=vi_path("a"))
+    with pytest.raises(rockset_sqlalchemy.Error):
+        connect(fake, router).cursor().execute(SQL)
+    assert query_vis(fake) == ["a"]
+    assert router.stats()["a"]["failures"] == 0
+
+
+def test_write_does_not_fail_over(fake):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover")
+    fake.fail(503, path=vi_path("a"))
+    with pytest.raises(rockset_sqlalchemy.Error):
+        connect(fake, router).cursor().execute(INSERT)
+    assert query_vis(fake) == ["a"]
+
+
+def test_unhealthy_instance_is_skipped(fake):
+    router = VirtualInstanceRouter(["a", "b"], policy="failover", failure_threshold=1)
+    fake.fail(503, path=vi_path("a"))
+    cursor = connect(fake, router).cursor()
+    for _ in range(3):
+        cursor.execute(SQL)
+    assert query_vis(fake) == ["a", "b", "b", "b"]
+
+
+def test_pinned_query_does_not_fail_over(fake):
+    router = VirtualInstanceRouter({"dashboards": "a", "batch": "b"})
+    fake.fail(503, path=vi_path("b"))
+    cursor = connect(fake, router).cursor()
+    cursor.virtual_instance = "batch"
+    with pytest.raises(rockset_sqlalchemy.Error):
+        cursor.execute(SQL)
+    cursor.execute(SQL)
+    cursor.virtual_instance = "a"
+    cursor.execute(SQL)
+    assert query_vis(fake) == ["b", "b", "a"]
+
+
+def test_engine_routes_and_pins(fake):
+    engine = engine_for(
+        fake, "?virtual_instances=dashboards:a,batch:b&routing_policy=round_robin"
+    )
+    with engine.connect() as conn:
+        for _ in range(2):
+            conn.execute(sa.text(SQL))
+        for _ in range(2):
+            conn.execute(sa.text(SQL), execution_options={"rockset_vi": "batch"})
+    assert query_vis(fake) == ["a", "b", "b", "b"]
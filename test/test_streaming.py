@@ -0,0 +1,112 @@
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER
+
+ROWS = [{"n": i, "name": "row-{}".format(i)} for i in range(25)]
+EXPECTED = [(row["n"], row["name"]) for row in ROWS]
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = ROWS
+    return fake
+
+
+def page_requests(fake):
+    return [fields for method, path, fields in fake.requests if path.endswith("/pages")]
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+def test_fetchall_across_pages(fake, prefetch_pages):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER,
+        fake.api_key,
+        stream_results=True,
+        page_size=10,
+        prefetch_pages=prefetch_pages,
+    )
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    assert cursor.fetchall() == EXPECTED
+    assert cursor.fetchall() == []
+    assert fake.queries() == ["SELECT n, name FROM commons.rows"]
+    assert fake.requests[0][2]["max_initial_results"] == 10
+    assert [dict(fields)["cursor"] for fields in page_requests(fake)] == ["10", "20"]
+
+
+def test_fetchone_across_pages(fake):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, stream_results=True, page_size=10, prefetch_pages=0
+    )
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    rows = []
+    row = cursor.fetchone()
+    while row is not None:
+        rows.append(row)
+        # Pages are requested as they are reached.
+        assert len(page_requests(fake)) == max(0, (len(rows) - 1) // 10)
+        row = cursor.fetchone()
+    assert rows == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 7, 10, 30])
+def test_fetchmany_across_pages(fake, size):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, stream_results=True, page_size=10
+    )
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    rows = []
+    batch = cursor.fetchmany(size)
+    while batch:
+        assert len(batch) <= size
+        rows.extend(batch)
+        batch = cursor.fetchmany(size)
+    assert rows == EXPECTED
+
+
+def test_iteration_across_pages(fake):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, stream_results=True, page_size=10
+    )
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    assert list(cursor) == EXPECTED
+
+
+def test_page_size_larger_than_result(fake):
+    connection = rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, stream_results=True, page_size=100
+    )
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    assert cursor.fetchall() == EXPECTED
+    assert page_requests(fake) == []
+
+
+def test_without_streaming_fetches_whole_result(fake):
+    connection = rockset_sqlalchemy.connect(API_SERVER, fake.api_key)
+    cursor = connection.cursor()
+    cursor.execute("SELECT n, name FROM commons.rows")
+    assert cursor.fetchall() == EXPECTED
+    assert "max_initial_results" not in fake.requests[0][2]
+    assert page_requests(fake) == []
+
+
+def test_yield_per(fake):
+    engine = engine_for(fake)
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=10).execute(
+            sa.text("SELECT n, name FROM commons.rows")
+        )
+        assert result.cursor.page_size == 10
+        partitions = [list(map(tuple, rows)) for rows in result.partitions(10)]
+    assert partitions == [EXPECTED[0:10], EXPECTED[10:20], EXPECTED[20:25]]
+    assert fake.requests[0][2]["max_initial_results"] == 10
+    assert len(page_requests(fake)) == 2
+    assert all(dict(fields)["docs"] == 10 for fields in page_requests(fake))
@@ -0,0 +1,128 @@
+import time
+import warnings
+
+import pytest
+import sqlalchemy as sa
+
+import rockset_sqlalchemy
+from rockset_sqlalchemy.exceptions import Error, OperationalError
+
+from .conftest import engine_for
+from .fake_rockset import API_SERVER, new_api_key
+
+THROTTLED = '{"message": "Rate limit exceeded", "type": "RATELIMITEXCEEDED"}'
+
+
+@pytest.fixture
+def fake(fake):
+    fake.rows = [{"n": 1}]
+    return fake
+
+
+def connect(fake, **kwargs):
+    kwargs.setdefault("retry_backoff", 0.001)
+    return rockset_sqlalchemy.connect(
+        API_SERVER, fake.api_key, cache_all_queries=False, **kwargs
+    )
+
+
+def test_retry_then_success(fake):
+    fake.fail(429, times=2, body=THROTTLED)
+    cursor = connect(fake).cursor()
+    cursor.execute("SELECT n FROM commons.rows")
+    assert cursor.fetchall() == [(1,)]
+    assert len(fake.queries()) == 3
+
+
+def test_retry_after_is_honoured(fake):
+    fake.fail(429, body=THROTTLED, headers={"Retry-After": "0.3"})
+    cursor = connect(fake).cursor()
+    started = time.monotonic()
+    cursor.execute("SELECT n FROM commons.rows")
+    assert time.monotonic() - started >= 0.3
+    assert len(fake.queries()) == 2
+
+
+def test_retries_exhausted(fake):
+    fake.fail(429, times=10, body=THROTTLED)
+    cursor = connect(fake, max_retries=2).cursor()
+    with pytest.raises(OperationalError) as e:
+        cursor.execute("SELECT n FROM commons.rows")
+    assert e.value.args[:2] == ("Rate limit exceeded", 429)
+    assert len(fake.queries()) == 3
+
+
+def test_retries_exhausted_with_html_body(fake):
+    fake.fail(502, times=10, body="<html><body>Bad Gateway</body></html>")
+    cursor = connect(fake, max_retries=1).cursor()
+    with pytest.raises(Error) as e:
+        cursor.execute("SELECT n FROM commons.rows")
+    assert e.value.args[:2] == ("<html><body>Bad Gateway</body></html>", 502)
+    assert len(fake.queries()) == 2
+
+
+def test_retry_after_is_capped_at_max_backoff(fake):
+    fake.fail(429, body=THROTTLED, headers={"Retry-After": "30"})
+    cursor = connect(fake, retry_max_backoff=0.2).cursor()
+    started = time.monotonic()
+    cursor.execute("SELECT n FROM commons.rows")
+    assert 0.2 <= time.monotonic() - started < 1
+    assert len(fake.queries()) == 2
+
+
+def test_writes_are_not_retried(fake):
+    fake.fail(429, body=THROTTLED)
+    cursor = connect(fake).cursor()
+    with pytest.raises(OperationalError):
+        cursor.execute("INSERT INTO commons.rows SELECT 1 AS n")
+    assert len(fake.queries()) == 1
+
+
+def test_throttled_read_keeps_connection(fake):
+    engine = engine_for(fake, "?max_retries=0")
+    fake.fail(429, body=THROTTLED)
+    with engine.connect() as conn:
+        with pytest.raises(sa.exc.OperationalError) as e:
+            conn.execute(sa.text("SELECT n FROM commons.rows"))
+        assert not e.value.connection_invalidated
+        assert conn.execute(sa.text("SELECT n FROM commons.rows")).all() == [(1,)]
+
+
+def test_adaptive_concurrency_limit(fake):
+    # Limiters are shared per virtual instance; use one of this test's own.
+    connection = connect(
+        fake,
+        virtual_instance=new_api_key(),
+        adaptive_concurrency=True,
+        concurrency_limit=8,
+    )
+    limiter = connection.limiter
+    cursor = connection.cursor()
+
+    fake.fail(429, body=THROTTLED)
+    cursor.execute("SELECT n FROM commons.rows")
+    assert limiter.stats()["limit"] == 4
+    assert limiter.stats()["throttled"] == 1
+
+    # The limit grows by one for each limit's worth of successful requests.
+    for _ in range(9):
+        cursor.execute("SELECT n FROM commons.rows")
+    assert limiter.stats()["limit"] == 6
+
+
+def test_limiter_settings_of_later_connections_are_ignored(fake):
+    vi = new_api_key()
+    first = connect(fake, virtual_instance=vi, adaptive_concurrency=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        same = connect(fake, virtual_instance=vi, adaptive_concurrency=True)
+    with pytest.warns(UserWarning, match="initial_limit=4, max_limit=8"):
+        other = connect(
+            fake,
+            virtual_instance=vi,
+            adaptive_concurrency=True,
+            concurrency_limit=4,
+            max_concurrency=8,
+        )
+    assert first.limiter is same.limiter is other.limiter
+    assert first.limiter.stats()["limit"] == 16